@@ -1,3 +1,80 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import (
+    AnalysisJob,
+    MessageRollup,
+    QuestionResponse,
+    TermFrequency,
+    UserMediaStats,
+    UserStats,
+)
+
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    list_display = [
+        "message",
+        "status",
+        "attempts",
+        "available_at",
+        "locked_at",
+        "updated_at",
+    ]
+    list_filter = ["status", "created_at"]
+    search_fields = ["message__text", "last_error"]
+    ordering = ["-updated_at"]
+    raw_id_fields = ["message"]
+
+
+@admin.register(MessageRollup)
+class MessageRollupAdmin(admin.ModelAdmin):
+    list_display = [
+        "group",
+        "granularity",
+        "bucket_start",
+        "media_type",
+        "message_count",
+        "edited_count",
+        "deleted_count",
+    ]
+    list_filter = ["granularity", "media_type"]
+    ordering = ["-bucket_start"]
+    raw_id_fields = ["group"]
+
+
+@admin.register(TermFrequency)
+class TermFrequencyAdmin(admin.ModelAdmin):
+    list_display = ["term", "source", "group", "day", "count"]
+    list_filter = ["source"]
+    search_fields = ["term"]
+    ordering = ["-day", "-count"]
+    raw_id_fields = ["group"]
+
+
+@admin.register(QuestionResponse)
+class QuestionResponseAdmin(admin.ModelAdmin):
+    list_display = ["question", "group", "asker", "responder", "asked_at", "latency"]
+    list_filter = ["day"]
+    ordering = ["-asked_at"]
+    raw_id_fields = ["question", "group", "asker", "first_reply", "responder"]
+
+
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = [
+        "user",
+        "message_count",
+        "question_count",
+        "first_seen_at",
+        "last_seen_at",
+    ]
+    ordering = ["-message_count"]
+    raw_id_fields = ["user"]
+
+
+@admin.register(UserMediaStats)
+class UserMediaStatsAdmin(admin.ModelAdmin):
+    list_display = ["user", "media_type", "message_count"]
+    list_filter = ["media_type"]
+    ordering = ["-message_count"]
+    raw_id_fields = ["user"]
@@ -0,0 +1,288 @@
+"""
+Result cache for Gemini message analysis.
+
+Support groups repeat the same short texts constantly, so analysis results are
+cached by a hash of the normalized text, the prompt version and the model name.
+Lookups go through an in-process LRU tier first and a persistent database tier
+(AnalysisCacheEntry) second. The database tier has a TTL and is trimmed to
+ANALYSIS_CACHE_MAX_ENTRIES by least-recent use.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+# How often (in DB writes) expired/overflowing entries are evicted
+EVICTION_INTERVAL = 500
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text for cache keys (case and whitespace insensitive).
+
+    Args:
+        text: Raw message text
+
+    Returns:
+        str: Lowercased text with collapsed whitespace
+    """
+    return " ".join(text.lower().split())
+
+
+class AnalysisCache:
+    """Two-tier (LRU + database) cache for analysis results."""
+
+    def __init__(self, maxsize: Optional[int] = None):
+        self._maxsize = maxsize
+        self._lru: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.lru_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    # ------------------------------------------
+    # Keys and settings
+    # ------------------------------------------
+
+    @staticmethod
+    def make_key(kind: str, text: str, prompt_version: str, model_name: str) -> str:
+        """
+        Build the cache key for a text.
+
+        Args:
+            kind: Analysis kind ('batch', 'sentiment', 'intent', 'topics')
+            text: Raw message text
+            prompt_version: Version of the prompt that produced the result
+            model_name: Gemini model name
+
+        Returns:
+            str: sha256 hex digest
+        """
+        raw = f"{kind}|{prompt_version}|{model_name}|{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @property
+    def maxsize(self) -> int:
+        if self._maxsize is None:
+            from django.conf import settings
+
+            self._maxsize = settings.ANALYSIS_CACHE_LRU_SIZE
+        return self._maxsize
+
+    # ------------------------------------------
+    # LRU tier
+    # ------------------------------------------
+
+    def _lru_get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key not in self._lru:
+                return None
+            self._lru.move_to_end(key)
+            return self._lru[key]
+
+    def _lru_set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.maxsize:
+                self._lru.popitem(last=False)
+
+    # ------------------------------------------
+    # Public API
+    # ------------------------------------------
+
+    def get_many(
+        self, kind: str, texts: Iterable[str], prompt_version: str, model_name: str
+    ) -> Dict[str, Any]:
+        """
+        Look up cached results for several texts.
+
+        Args:
+            kind: Analysis kind
+            texts: Raw texts to look up
+            prompt_version: Prompt version
+            model_name: Gemini model name
+
+        Returns:
+            Dict[str, Any]: Cached results keyed by the original text
+        """
+        found: Dict[str, Any] = {}
+        db_lookup: Dict[str, List[str]] = {}
+
+        for text in texts:
+            key = self.make_key(kind, text, prompt_version, model_name)
+            value = self._lru_get(key)
+            if value is not None:
+                found[text] = value
+                self.lru_hits += 1
+            else:
+                db_lookup.setdefault(key, []).append(text)
+
+        if db_lookup:
+            for key, value in self._db_get_many(list(db_lookup)).items():
+                self._lru_set(key, value)
+                for text in db_lookup.pop(key):
+                    found[text] = value
+                    self.db_hits += 1
+
+        self.misses += sum(len(pending) for pending in db_lookup.values())
+        return found
+
+    def get(
+        self, kind: str, text: str, prompt_version: str, model_name: str
+    ) -> Optional[Any]:
+        """Look up a single cached result (see get_many)."""
+        return self.get_many(kind, [text], prompt_version, model_name).get(text)
+
+    def set_many(
+        self, kind: str, results: Dict[str, Any], prompt_version: str, model_name: str
+    ) -> None:
+        """
+        Store results in both tiers.
+
+        Args:
+            kind: Analysis kind
+            results: Results keyed by the original text
+            prompt_version: Prompt version
+            model_name: Gemini model name
+        """
+        entries = {}
+        for text, value in results.items():
+            key = self.make_key(kind, text, prompt_version, model_name)
+            self._lru_set(key, value)
+            entries[key] = value
+
+        if entries:
+            self._db_set_many(kind, entries, prompt_version, model_name)
+
+    def set(
+        self, kind: str, text: str, value: Any, prompt_version: str, model_name: str
+    ) -> None:
+        """Store a single result (see set_many)."""
+        self.set_many(kind, {text: value}, prompt_version, model_name)
+
+    def clear(self) -> None:
+        """Drop the in-process tier and reset counters."""
+        with self._lock:
+            self._lru.clear()
+        self.lru_hits = self.db_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters for this process.
+
+        Returns:
+            Dict[str, Any]: lru_hits, db_hits, misses, hit_rate and lru_size
+        """
+        hits = self.lru_hits + self.db_hits
+        total = hits + self.misses
+        return {
+            "lru_hits": self.lru_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+            "lru_size": len(self._lru),
+            "lru_maxsize": self.maxsize,
+        }
+
+    # ------------------------------------------
+    # Database tier
+    # ------------------------------------------
+
+    def _db_get_many(self, keys: List[str]) -> Dict[str, Any]:
+        from django.db.models import F
+        from django.utils import timezone
+
+        from analytics.models import AnalysisCacheEntry
+
+        try:
+            now = timezone.now()
+            rows = dict(
+                AnalysisCacheEntry.objects.filter(
+                    key__in=keys, expires_at__gt=now
+                ).values_list("key", "result")
+            )
+            if rows:
+                AnalysisCacheEntry.objects.filter(key__in=list(rows)).update(
+                    hits=F("hits") + 1, last_used_at=now
+                )
+            return rows
+        except Exception as e:
+            print(f"❌ Analysis cache read error: {e}")
+            return {}
+
+    def _db_set_many(
+        self,
+        kind: str,
+        entries: Dict[str, Any],
+        prompt_version: str,
+        model_name: str,
+    ) -> None:
+        from django.conf import settings
+        from django.utils import timezone
+
+        from analytics.models import AnalysisCacheEntry
+
+        try:
+            now = timezone.now()
+            expires_at = now + timedelta(days=settings.ANALYSIS_CACHE_TTL_DAYS)
+            AnalysisCacheEntry.objects.bulk_create(
+                [
+                    AnalysisCacheEntry(
+                        key=key,
+                        kind=kind,
+                        model_name=model_name,
+                        prompt_version=prompt_version,
+                        result=value,
+                        last_used_at=now,
+                        expires_at=expires_at,
+                    )
+                    for key, value in entries.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["key"],
+                update_fields=["result", "last_used_at", "expires_at"],
+            )
+
+            self._writes += len(entries)
+            if self._writes >= EVICTION_INTERVAL:
+                self._writes = 0
+                self.evict()
+        except Exception as e:
+            print(f"❌ Analysis cache write error: {e}")
+
+    def evict(self) -> int:
+        """
+        Remove expired entries and trim the table to ANALYSIS_CACHE_MAX_ENTRIES.
+
+        Returns:
+            int: Number of deleted rows
+        """
+        from django.conf import settings
+        from django.utils import timezone
+
+        from analytics.models import AnalysisCacheEntry
+
+        deleted, _ = AnalysisCacheEntry.objects.filter(
+            expires_at__lte=timezone.now()
+        ).delete()
+
+        max_entries = settings.ANALYSIS_CACHE_MAX_ENTRIES
+        overflow = list(
+            AnalysisCacheEntry.objects.order_by("-last_used_at").values_list(
+                "last_used_at", flat=True
+            )[max_entries : max_entries + 1]
+        )
+        if overflow:
+            trimmed, _ = AnalysisCacheEntry.objects.filter(
+                last_used_at__lte=overflow[0]
+            ).delete()
+            deleted += trimmed
+
+        return deleted
+
+
+analysis_cache = AnalysisCache()
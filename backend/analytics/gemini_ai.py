@@ -6,12 +6,19 @@ It includes sentiment analysis, intent classification, topic extraction, and com
 message analysis capabilities.
 """
 
+import asyncio
 import json
 import os
+import random
+import threading
 import time
-from functools import lru_cache
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from typing import Any, Dict, List, Optional
 
+from django.conf import settings
+
+from analytics.ai_cache import analysis_cache, normalize_text
+
 # Constants
 MODEL_NAME = "gemini-2.5-flash"
 DEFAULT_TEMPERATURE = 0.7
@@ -20,6 +27,14 @@ DEFAULT_TOP_K = 40
 DEFAULT_MAX_OUTPUT_TOKENS = 2048
 ENV_API_KEY = "GEMINI_API_KEY"
 
+# Bump a prompt's version whenever its wording changes so cached results are not reused
+PROMPT_VERSIONS = {
+    "sentiment": "1",
+    "intent": "1",
+    "topics": "1",
+    "batch": "1",
+}
+
 # Try to import Gemini
 try:
     import google.generativeai as genai
@@ -53,6 +68,284 @@ if GEMINI_AVAILABLE:
         print(f"⚠️ {ENV_API_KEY} not found in environment")
 
 
+# ==========================================
+# RESULT CACHE
+# ==========================================
+
+
+def _cache_get_many(kind: str, texts: List[str]) -> Dict[str, Any]:
+    """
+    Look up cached analysis results for the current model and prompt version.
+
+    Args:
+        kind: Analysis kind; an optional ':suffix' narrows the key (e.g. 'topics:3')
+        texts: Texts to look up
+
+    Returns:
+        Dict[str, Any]: Cached results keyed by text
+    """
+    prompt_version = PROMPT_VERSIONS[kind.split(":")[0]]
+    return analysis_cache.get_many(kind, texts, prompt_version, MODEL_NAME)
+
+
+def _cache_get(kind: str, text: str) -> Optional[Any]:
+    """Look up a single cached analysis result."""
+    return _cache_get_many(kind, [text]).get(text)
+
+
+def _cache_set_many(kind: str, results: Dict[str, Any]) -> None:
+    """Store analysis results keyed by text."""
+    prompt_version = PROMPT_VERSIONS[kind.split(":")[0]]
+    analysis_cache.set_many(kind, results, prompt_version, MODEL_NAME)
+
+
+def _cache_set(kind: str, text: str, value: Any) -> None:
+    """Store a single analysis result."""
+    _cache_set_many(kind, {text: value})
+
+
+# ==========================================
+# ASYNC CLIENT (CONCURRENCY + RATE LIMITS)
+# ==========================================
+
+# Client constants (limits and timeouts: GEMINI_* settings)
+CHARS_PER_TOKEN = 4
+ESTIMATED_OUTPUT_TOKENS = 256
+MAX_API_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {
+    "ResourceExhausted",
+    "TooManyRequests",
+    "InternalServerError",
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "BadGateway",
+    "GatewayTimeout",
+}
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: int):
+        self.capacity = max(1, rate_per_minute)
+        self.rate_per_second = self.capacity / 60.0
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate_per_second)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1) -> float:
+        """
+        Wait until `amount` tokens are available and take them.
+
+        Args:
+            amount: Tokens to take (capped at the bucket capacity)
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return waited
+
+            delay = (amount - self.tokens) / self.rate_per_second
+            waited += delay
+            await asyncio.sleep(delay)
+
+
+class AsyncGeminiClient:
+    """
+    Asyncio client for Gemini with bounded concurrency and rate limiting.
+
+    Requests wait on a requests-per-minute and a tokens-per-minute bucket,
+    at most `max_concurrency` requests are in flight at once, and 429/5xx
+    errors and requests exceeding `request_timeout` seconds are retried
+    with exponential backoff and jitter.
+
+    `call_timeout` bounds each request across all of its attempts and
+    backoff. Time spent waiting for the rate limits or a concurrency slot
+    does not count, so a large workload throttled by the quota still
+    completes request by request.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        request_timeout: float,
+        call_timeout: Optional[float] = None,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.request_timeout = request_timeout
+        self.call_timeout = call_timeout
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.api_calls = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+
+    @staticmethod
+    def estimate_tokens(prompt: str) -> int:
+        """Rough token estimate for a prompt plus its expected response."""
+        return len(prompt) // CHARS_PER_TOKEN + ESTIMATED_OUTPUT_TOKENS
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """Whether an API error is a rate limit (429) or server (5xx) error."""
+        code = getattr(error, "code", None)
+        try:
+            if int(code) in RETRYABLE_STATUS_CODES:
+                return True
+        except (TypeError, ValueError):
+            pass
+        return (
+            isinstance(error, asyncio.TimeoutError)
+            or type(error).__name__ in RETRYABLE_ERROR_NAMES
+        )
+
+    async def generate(self, prompt: str) -> Any:
+        """
+        Call model.generate_content_async under the limits.
+
+        Args:
+            prompt: Prompt text
+
+        Returns:
+            Any: Gemini response object
+
+        Raises:
+            asyncio.TimeoutError: The request used up `call_timeout`
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        loop = asyncio.get_running_loop()
+        tokens = self.estimate_tokens(prompt)
+        started_at = loop.time()
+        waited = 0.0
+
+        for attempt in range(MAX_API_RETRIES + 1):
+            throttled = await self.request_bucket.acquire(1)
+            throttled += await self.token_bucket.acquire(tokens)
+            self.throttled_seconds += throttled
+            waited += throttled
+
+            queued_at = loop.time()
+            async with self._semaphore:
+                waited += loop.time() - queued_at
+                timeout = self.request_timeout
+                if self.call_timeout is not None:
+                    spent = loop.time() - started_at - waited
+                    if spent >= self.call_timeout:
+                        raise asyncio.TimeoutError(
+                            f"Gemini request did not finish in {self.call_timeout:g}s"
+                        )
+                    timeout = min(timeout, self.call_timeout - spent)
+
+                try:
+                    self.api_calls += 1
+                    return await asyncio.wait_for(
+                        model.generate_content_async(prompt), timeout
+                    )
+                except Exception as e:
+                    if attempt == MAX_API_RETRIES or not self.is_retryable(e):
+                        raise
+                    print(f"⚠️ Gemini API error (attempt {attempt + 1}), retrying: {e}")
+
+            self.retries += 1
+            delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt)
+            await asyncio.sleep(delay * (0.5 + random.random()))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Client counters for this process.
+
+        Returns:
+            Dict[str, Any]: API calls, retries, throttled time and limits
+        """
+        return {
+            "api_calls": self.api_calls,
+            "retries": self.retries,
+            "throttled_seconds": round(self.throttled_seconds, 2),
+            "max_concurrency": self.max_concurrency,
+            "requests_per_minute": self.request_bucket.capacity,
+            "tokens_per_minute": self.token_bucket.capacity,
+        }
+
+
+gemini_client = AsyncGeminiClient(
+    max_concurrency=settings.GEMINI_MAX_CONCURRENCY,
+    requests_per_minute=settings.GEMINI_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.GEMINI_TOKENS_PER_MINUTE,
+    request_timeout=settings.GEMINI_REQUEST_TIMEOUT,
+    call_timeout=settings.GEMINI_CALL_TIMEOUT,
+)
+
+# The client's event loop runs on its own thread so the semaphore, the buckets
+# and the gRPC channel all stay on one loop across calls from sync code.
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_client_loop_lock = threading.Lock()
+
+
+def _get_client_loop() -> asyncio.AbstractEventLoop:
+    """Start (once) and return the background event loop for Gemini calls."""
+    global _client_loop
+
+    with _client_loop_lock:
+        if _client_loop is None:
+            _client_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_client_loop.run_forever, name="gemini-client", daemon=True
+            ).start()
+        return _client_loop
+
+
+def _run_async(coro: Any, timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the client loop and wait for its result.
+
+    Every request the client sends is bounded by `call_timeout`, so by
+    default the caller waits for the whole coroutine however long the rate
+    limits keep it queued. With `timeout` the coroutine is cancelled if it
+    does not finish in time.
+
+    Args:
+        coro: Coroutine that only talks to the API (no Django ORM access)
+        timeout: Optional seconds to wait for the whole coroutine
+
+    Returns:
+        Any: The coroutine's result
+
+    Raises:
+        TimeoutError: The coroutine did not finish within `timeout`
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _get_client_loop())
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise TimeoutError(f"Gemini call did not finish in {timeout:g}s")
+
+
+def _generate(prompt: str) -> Any:
+    """Synchronous generate_content through the shared async client."""
+    return _run_async(gemini_client.generate(prompt))
+
+
 # ==========================================
 # SENTIMENT ANALYSIS (MAIN FEATURE)
 # ==========================================
@@ -79,30 +372,60 @@ def analyze_sentiment(text: str) -> str:
     if not GEMINI_AVAILABLE or not text or len(text.strip()) < MIN_TEXT_LENGTH:
         return SENTIMENT_NEUTRAL
 
+    cached = _cache_get("sentiment", text)
+    if cached is not None:
+        return cached
+
     try:
-        prompt = f"""Analyze the sentiment of this message and respond with ONLY ONE WORD: positive, negative, or neutral.
+        response = _generate(_build_sentiment_prompt(text))
+
+        if response and hasattr(response, "text"):
+            sentiment = _parse_sentiment_response(response.text)
+            _cache_set("sentiment", text, sentiment)
+            return sentiment
+        else:
+            return SENTIMENT_NEUTRAL
+
+    except Exception as e:
+        print(f"❌ Sentiment analysis error: {e}")
+        return SENTIMENT_NEUTRAL
+
+
+def _build_sentiment_prompt(text: str) -> str:
+    """
+    Build the single-message sentiment prompt.
+
+    Args:
+        text: The text to analyze
+
+    Returns:
+        str: Prompt text
+    """
+    return f"""Analyze the sentiment of this message and respond with ONLY ONE WORD: positive, negative, or neutral.
 
 Message: "{text[:MAX_TEXT_LENGTH]}"
 
 Response (one word only):"""
 
-        response = model.generate_content(prompt)
 
-        if response and hasattr(response, "text"):
-            sentiment = response.text.lower().strip()
+def _parse_sentiment_response(response_text: str) -> str:
+    """
+    Map a one-word model response to a sentiment value.
 
-            # Clean response
-            if SENTIMENT_POSITIVE in sentiment:
-                return SENTIMENT_POSITIVE
-            elif SENTIMENT_NEGATIVE in sentiment:
-                return SENTIMENT_NEGATIVE
-            else:
-                return SENTIMENT_NEUTRAL
-        else:
-            return SENTIMENT_NEUTRAL
+    Args:
+        response_text: Raw response text
 
-    except Exception as e:
-        print(f"❌ Sentiment analysis error: {e}")
+    Returns:
+        str: One of 'positive', 'negative', or 'neutral'
+    """
+    sentiment = response_text.lower().strip()
+
+    # Clean response
+    if SENTIMENT_POSITIVE in sentiment:
+        return SENTIMENT_POSITIVE
+    elif SENTIMENT_NEGATIVE in sentiment:
+        return SENTIMENT_NEGATIVE
+    else:
         return SENTIMENT_NEUTRAL
 
 
@@ -112,6 +435,9 @@ def analyze_sentiment_batch(
     """
     Analyze sentiment for multiple messages in batches.
 
+    Batches are sent concurrently through the async client, so throughput is
+    bounded by the configured quota rather than by one request at a time.
+
     Args:
         messages: List of message dicts with 'text' field
         batch_size: Number of messages to process in one API call
@@ -126,18 +452,11 @@ def analyze_sentiment_batch(
         return messages
 
     try:
-        results = []
-        # Process in batches to avoid rate limits
-        for i in range(0, len(messages), batch_size):
-            batch = messages[i : i + batch_size]
-            batch_results = _process_sentiment_batch(batch)
-            results.extend(batch_results)
-
-            # Rate limit protection
-            if i + batch_size < len(messages):
-                time.sleep(1)  # Wait 1 second between batches
-
-        return results
+        batches = [
+            messages[i : i + batch_size] for i in range(0, len(messages), batch_size)
+        ]
+        results = _run_async(_process_sentiment_batches(batches))
+        return [msg for batch in results for msg in batch]
 
     except Exception as e:
         print(f"❌ Batch sentiment analysis error: {e}")
@@ -146,7 +465,24 @@ def analyze_sentiment_batch(
         return messages
 
 
-def _process_sentiment_batch(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+async def _process_sentiment_batches(
+    batches: List[List[Dict[str, Any]]],
+) -> List[List[Dict[str, Any]]]:
+    """
+    Process all sentiment batches concurrently.
+
+    Args:
+        batches: Batches of messages to analyze
+
+    Returns:
+        List[List[Dict[str, Any]]]: The batches with sentiment added
+    """
+    return await asyncio.gather(*(_process_sentiment_batch(batch) for batch in batches))
+
+
+async def _process_sentiment_batch(
+    batch: List[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
     """
     Process a single batch of messages for sentiment analysis.
 
@@ -178,7 +514,7 @@ Respond with JSON array like: ["positive", "neutral", "negative", ...]
 Only use: positive, negative, or neutral
 JSON array only, no explanation:"""
 
-    response = model.generate_content(prompt)
+    response = await gemini_client.generate(prompt)
 
     if response and hasattr(response, "text"):
         # Try to parse JSON response
@@ -187,9 +523,12 @@ JSON array only, no explanation:"""
             sentiments = json.loads(response_text)
             _assign_sentiments_to_messages(batch, sentiments)
         except json.JSONDecodeError:
-            # Fallback: analyze individually
-            for msg in batch:
-                msg["sentiment"] = analyze_sentiment(msg.get("text", ""))
+            # Fallback: analyze individually (concurrently)
+            sentiments = await asyncio.gather(
+                *(_analyze_sentiment_async(msg.get("text", "")) for msg in batch)
+            )
+            for msg, sentiment in zip(batch, sentiments):
+                msg["sentiment"] = sentiment
     else:
         # Default to neutral if no valid response
         for msg in batch:
@@ -198,6 +537,29 @@ JSON array only, no explanation:"""
     return batch
 
 
+async def _analyze_sentiment_async(text: str) -> str:
+    """
+    Async single-message sentiment without the result cache (no DB access).
+
+    Args:
+        text: The text to analyze
+
+    Returns:
+        str: One of 'positive', 'negative', or 'neutral'
+    """
+    if not text or len(text.strip()) < MIN_TEXT_LENGTH:
+        return SENTIMENT_NEUTRAL
+
+    try:
+        response = await gemini_client.generate(_build_sentiment_prompt(text))
+        if response and hasattr(response, "text"):
+            return _parse_sentiment_response(response.text)
+    except Exception as e:
+        print(f"❌ Sentiment analysis error: {e}")
+
+    return SENTIMENT_NEUTRAL
+
+
 def _clean_response_text(response_text: str) -> str:
     """
     Clean response text by removing markdown code blocks.
@@ -269,6 +631,10 @@ def classify_intent(text: str) -> str:
     if not GEMINI_AVAILABLE or not text:
         return INTENT_GENERAL
 
+    cached = _cache_get("intent", text)
+    if cached is not None:
+        return cached
+
     try:
         valid_intents = [
             INTENT_QUESTION,
@@ -287,18 +653,18 @@ Message: "{text[:INTENT_MAX_TEXT_LENGTH]}"
 
 Intent (one word):"""
 
-        response = model.generate_content(prompt)
+        response = _generate(prompt)
 
         if response and hasattr(response, "text"):
             intent = response.text.lower().strip()
 
-            # Find matching intent
-            for valid_intent in valid_intents:
-                if valid_intent in intent:
-                    return valid_intent
+            # Find matching intent, default to general if no match found
+            intent = next(
+                (valid for valid in valid_intents if valid in intent), INTENT_GENERAL
+            )
 
-            # Default to general if no match found
-            return INTENT_GENERAL
+            _cache_set("intent", text, intent)
+            return intent
         else:
             return INTENT_GENERAL
 
@@ -332,6 +698,11 @@ def extract_topics(text: str, max_topics: int = DEFAULT_MAX_TOPICS) -> List[str]
     if not GEMINI_AVAILABLE or not text:
         return []
 
+    cache_kind = f"topics:{max_topics}"
+    cached = _cache_get(cache_kind, text)
+    if cached is not None:
+        return list(cached)
+
     try:
         prompt = f"""Extract {max_topics} main topics from this text. Respond with ONLY a comma-separated list.
 
@@ -339,7 +710,7 @@ Text: "{text[:TOPIC_MAX_TEXT_LENGTH]}"
 
 Topics (comma-separated, {max_topics} max):"""
 
-        response = model.generate_content(prompt)
+        response = _generate(prompt)
 
         if response and hasattr(response, "text"):
             # Process and filter topics
@@ -347,6 +718,7 @@ Topics (comma-separated, {max_topics} max):"""
             valid_topics = [
                 t for t in topics[:max_topics] if t and len(t) > MIN_TOPIC_LENGTH
             ]
+            _cache_set(cache_kind, text, valid_topics)
             return valid_topics
         else:
             return []
@@ -430,7 +802,7 @@ Provide JSON with these fields:
 
 JSON only, no explanation:"""
 
-    response = model.generate_content(prompt)
+    response = _generate(prompt)
 
     if response and hasattr(response, "text"):
         try:
@@ -482,6 +854,260 @@ def _apply_analysis_to_message(
     return message
 
 
+# ==========================================
+# BATCHED MESSAGE ANALYSIS
+# ==========================================
+
+# Batch analysis constants
+DEFAULT_ANALYSIS_BATCH_SIZE = 20
+BATCH_ANALYSIS_MAX_TEXT_LENGTH = 300
+MAX_BATCH_RETRIES = 2
+VALID_SENTIMENTS = [SENTIMENT_POSITIVE, SENTIMENT_NEGATIVE, SENTIMENT_NEUTRAL]
+VALID_INTENTS = [
+    INTENT_QUESTION,
+    INTENT_COMPLAINT,
+    INTENT_FEEDBACK,
+    INTENT_REQUEST,
+    INTENT_GREETING,
+    INTENT_GENERAL,
+]
+VALID_URGENCIES = [URGENCY_HIGH, URGENCY_MEDIUM, URGENCY_LOW]
+
+
+def default_analysis() -> Dict[str, Any]:
+    """
+    Default analysis result for texts too short to analyze.
+
+    Returns:
+        Dict[str, Any]: Neutral analysis with all batch fields
+    """
+    return {
+        "sentiment": SENTIMENT_NEUTRAL,
+        "intent": INTENT_GENERAL,
+        "topics": [],
+        "urgency": URGENCY_LOW,
+        "is_question": False,
+    }
+
+
+def analyze_messages_batch(
+    texts: List[str], batch_size: int = DEFAULT_ANALYSIS_BATCH_SIZE
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Analyze many messages with one prompt per batch.
+
+    Each batch returns a JSON array of {sentiment, intent, topics, urgency,
+    is_question} objects. Elements that fail validation are re-sent on their
+    own (up to MAX_BATCH_RETRIES times) instead of re-running the whole batch.
+    Cached texts and duplicates within the input are never sent to the API.
+
+    Texts too short to analyze get `default_analysis()`. Texts the API could
+    not analyze (Gemini unavailable, request error, invalid response after
+    all retries) get None, so callers can retry them instead of storing a
+    made-up neutral result.
+
+    Args:
+        texts: Message texts to analyze
+        batch_size: Number of messages to send in one API call
+
+    Returns:
+        List[Optional[Dict[str, Any]]]: One analysis dict (or None if it
+        failed) per input text, in input order
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+
+    analyzable = []
+    for idx, text in enumerate(texts):
+        if not text or len(text.strip()) < MIN_TEXT_LENGTH:
+            results[idx] = default_analysis()
+        elif GEMINI_AVAILABLE:
+            analyzable.append(idx)
+
+    # Serve cached texts and collapse duplicates before calling the API
+    cached = _cache_get_many("batch", [texts[idx] for idx in analyzable])
+    to_request = []
+    duplicates = {}
+    first_by_text = {}
+
+    for idx in analyzable:
+        text = texts[idx]
+        normalized = normalize_text(text)
+        if text in cached:
+            results[idx] = dict(cached[text])
+        elif normalized in first_by_text:
+            duplicates[idx] = first_by_text[normalized]
+        else:
+            first_by_text[normalized] = idx
+            to_request.append(idx)
+
+    batches = [
+        to_request[i : i + batch_size] for i in range(0, len(to_request), batch_size)
+    ]
+    _run_async(_analyze_batches(texts, batches, results))
+
+    _cache_set_many(
+        "batch",
+        {texts[idx]: results[idx] for idx in to_request if results[idx] is not None},
+    )
+
+    for idx, source_idx in duplicates.items():
+        if results[source_idx] is not None:
+            results[idx] = dict(results[source_idx])
+
+    return results
+
+
+async def _analyze_batches(
+    texts: List[str],
+    batches: List[List[int]],
+    results: List[Optional[Dict[str, Any]]],
+) -> None:
+    """
+    Analyze all batches concurrently through the async client.
+
+    Args:
+        texts: All input texts
+        batches: Lists of text indices, one per API call
+        results: Output list, filled in place
+    """
+    await asyncio.gather(
+        *(_analyze_batch_with_retries(texts, indices, results) for indices in batches)
+    )
+
+
+async def _analyze_batch_with_retries(
+    texts: List[str], indices: List[int], results: List[Optional[Dict[str, Any]]]
+) -> None:
+    """
+    Analyze one batch, retrying only the elements that failed to parse.
+
+    Elements that are still invalid after all retries are left as None.
+
+    Args:
+        texts: All input texts
+        indices: Indices of texts belonging to this batch
+        results: Output list, filled in place
+    """
+    remaining = indices
+
+    for _ in range(MAX_BATCH_RETRIES + 1):
+        if not remaining:
+            return
+
+        try:
+            items = await _request_batch_analysis([texts[idx] for idx in remaining])
+        except Exception as e:
+            print(f"❌ Batch analysis error: {e}")
+            items = {}
+
+        failed = []
+        for position, idx in enumerate(remaining, start=1):
+            analysis = _validate_analysis_item(items.get(position))
+            if analysis is None:
+                failed.append(idx)
+            else:
+                results[idx] = analysis
+
+        remaining = failed
+
+
+async def _request_batch_analysis(texts: List[str]) -> Dict[int, Any]:
+    """
+    Send one prompt for a batch of texts.
+
+    Args:
+        texts: Texts to analyze
+
+    Returns:
+        Dict[int, Any]: Raw response elements keyed by 1-based message number
+    """
+    numbered = "\n".join(
+        f"{idx}. {json.dumps(text[:BATCH_ANALYSIS_MAX_TEXT_LENGTH], ensure_ascii=False)}"
+        for idx, text in enumerate(texts, start=1)
+    )
+
+    prompt = f"""Analyze each message below and respond with ONLY a JSON array.
+
+Messages:
+{numbered}
+
+Return one object per message, in the same order, with these fields:
+- id: the message number
+- sentiment: "positive", "negative", or "neutral"
+- intent: "question", "complaint", "feedback", "request", "greeting", or "general"
+- topics: array of 1-3 main topics (strings)
+- urgency: "high", "medium", or "low"
+- is_question: true or false
+
+JSON array only, no explanation:"""
+
+    response = await gemini_client.generate(prompt)
+
+    if not response or not hasattr(response, "text"):
+        return {}
+
+    try:
+        items = json.loads(_clean_response_text(response.text))
+    except json.JSONDecodeError:
+        return {}
+
+    if not isinstance(items, list):
+        return {}
+
+    parsed = {}
+    for position, item in enumerate(items, start=1):
+        item_id = item.get("id") if isinstance(item, dict) else None
+        key = item_id if isinstance(item_id, int) else position
+        parsed.setdefault(key, item)
+
+    return parsed
+
+
+def _validate_analysis_item(item: Any) -> Optional[Dict[str, Any]]:
+    """
+    Validate and normalize one element of a batch response.
+
+    Args:
+        item: Raw element from the model's JSON array
+
+    Returns:
+        Optional[Dict[str, Any]]: Normalized analysis, or None if invalid
+    """
+    if not isinstance(item, dict):
+        return None
+
+    sentiment = str(item.get("sentiment", "")).lower().strip()
+    intent = str(item.get("intent", "")).lower().strip()
+
+    if sentiment not in VALID_SENTIMENTS or intent not in VALID_INTENTS:
+        return None
+
+    topics = item.get("topics", [])
+    if isinstance(topics, str):
+        topics = topics.split(",")
+    if not isinstance(topics, list):
+        return None
+    topics = [
+        str(t).strip() for t in topics if t and len(str(t).strip()) > MIN_TOPIC_LENGTH
+    ][:DEFAULT_MAX_TOPICS]
+
+    urgency = str(item.get("urgency", URGENCY_LOW)).lower().strip()
+    if urgency not in VALID_URGENCIES:
+        urgency = URGENCY_LOW
+
+    is_question = item.get("is_question")
+    if not isinstance(is_question, bool):
+        is_question = intent == INTENT_QUESTION
+
+    return {
+        "sentiment": sentiment,
+        "intent": intent,
+        "topics": topics,
+        "urgency": urgency,
+        "is_question": is_question,
+    }
+
+
 # ==========================================
 # GROUP ANALYTICS
 # ==========================================
@@ -610,7 +1236,7 @@ Quyidagi formatda javob bering (Uzbek tilida):
 
 Faqat matn, JSON emas!"""
 
-    response = model.generate_content(prompt)
+    response = _generate(prompt)
 
     if response and hasattr(response, "text"):
         return response.text.strip()
@@ -814,7 +1440,7 @@ Formatda javob bering:
 
 Faqat matn!"""
 
-    response = model.generate_content(prompt)
+    response = _generate(prompt)
 
     if response and hasattr(response, "text"):
         return response.text.strip()
@@ -903,9 +1529,13 @@ def get_api_status() -> Dict[str, Any]:
             - available: Whether Gemini AI is available
             - api_key_configured: Whether API key is configured
             - model: The model name if available, None otherwise
+            - cache: Analysis cache hit/miss counters for this process
+            - client: API call, retry and throttling counters for this process
     """
     return {
         "available": GEMINI_AVAILABLE,
         "api_key_configured": bool(os.getenv(ENV_API_KEY)),
         "model": MODEL_NAME if GEMINI_AVAILABLE else None,
+        "cache": analysis_cache.stats(),
+        "client": gemini_client.stats(),
     }
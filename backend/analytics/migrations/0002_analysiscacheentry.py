@@ -0,0 +1,55 @@
+# Generated by Django 6.0 on 2026-10-17 00:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnalysisCacheEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        help_text="sha256(kind | prompt version | model | normalized text)",
+                        max_length=64,
+                        unique=True,
+                    ),
+                ),
+                ("kind", models.CharField(db_index=True, max_length=20)),
+                ("model_name", models.CharField(max_length=100)),
+                ("prompt_version", models.CharField(max_length=20)),
+                ("result", models.JSONField()),
+                ("hits", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "last_used_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+                ("expires_at", models.DateTimeField(db_index=True)),
+            ],
+            options={
+                "verbose_name": "Analysis Cache Entry",
+                "verbose_name_plural": "Analysis Cache Entries",
+                "db_table": "analysis_cache",
+                "ordering": ["-last_used_at"],
+            },
+        ),
+    ]
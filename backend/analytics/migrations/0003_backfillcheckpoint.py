@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-17 00:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0002_analysiscacheentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BackfillCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, unique=True)),
+                (
+                    "last_pk",
+                    models.BigIntegerField(
+                        default=0, help_text="Highest primary key already processed"
+                    ),
+                ),
+                ("processed", models.BigIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Backfill Checkpoint",
+                "verbose_name_plural": "Backfill Checkpoints",
+                "db_table": "backfill_checkpoints",
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 6.0 on 2026-10-17 00:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0003_backfillcheckpoint"),
+        ("core", "0008_mediablob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MessageRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[("hour", "Hour"), ("day", "Day")], max_length=10
+                    ),
+                ),
+                (
+                    "bucket_start",
+                    models.DateTimeField(
+                        help_text="Start of the hour/day (local time)"
+                    ),
+                ),
+                ("media_type", models.CharField(max_length=20)),
+                ("message_count", models.IntegerField(db_default=0, default=0)),
+                ("edited_count", models.IntegerField(db_default=0, default=0)),
+                ("deleted_count", models.IntegerField(db_default=0, default=0)),
+                ("positive_count", models.IntegerField(db_default=0, default=0)),
+                ("negative_count", models.IntegerField(db_default=0, default=0)),
+                ("neutral_count", models.IntegerField(db_default=0, default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "group",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rollups",
+                        to="core.telegramgroup",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Message Rollup",
+                "verbose_name_plural": "Message Rollups",
+                "db_table": "message_rollups",
+                "ordering": ["bucket_start"],
+                "indexes": [
+                    models.Index(
+                        fields=["granularity", "bucket_start"],
+                        name="message_rol_granula_f1f101_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("group", "granularity", "bucket_start", "media_type"),
+                        name="unique_rollup_bucket",
+                    )
+                ],
+            },
+        ),
+    ]
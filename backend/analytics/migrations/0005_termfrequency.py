@@ -0,0 +1,68 @@
+# Generated by Django 6.0 on 2026-10-17 00:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0004_messagerollup"),
+        ("core", "0008_mediablob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TermFrequency",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("term", models.CharField(max_length=100)),
+                (
+                    "day",
+                    models.DateField(help_text="Local (TIME_ZONE) day of the message"),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[("text", "Message text"), ("keyword", "AI keyword")],
+                        max_length=10,
+                    ),
+                ),
+                ("count", models.IntegerField(db_default=0, default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "group",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="term_frequencies",
+                        to="core.telegramgroup",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Term Frequency",
+                "verbose_name_plural": "Term Frequencies",
+                "db_table": "term_frequencies",
+                "ordering": ["-count"],
+                "indexes": [
+                    models.Index(
+                        fields=["source", "day"], name="term_freque_source_4f919a_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("term", "group", "day", "source"),
+                        name="unique_term_frequency",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 6.0 on 2026-10-17 00:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0005_termfrequency"),
+        ("core", "0009_message_reply_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QuestionResponse",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "asked_at",
+                    models.DateTimeField(help_text="Question's telegram_created_at"),
+                ),
+                (
+                    "day",
+                    models.DateField(help_text="Local (TIME_ZONE) day of the question"),
+                ),
+                ("first_reply_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "latency",
+                    models.DurationField(
+                        blank=True, help_text="first_reply_at - asked_at", null=True
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "asker",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="questions_asked",
+                        to="core.telegramuser",
+                    ),
+                ),
+                (
+                    "first_reply",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="answered_questions",
+                        to="core.message",
+                    ),
+                ),
+                (
+                    "group",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="question_responses",
+                        to="core.telegramgroup",
+                    ),
+                ),
+                (
+                    "question",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="question_response",
+                        to="core.message",
+                    ),
+                ),
+                (
+                    "responder",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="questions_answered",
+                        to="core.telegramuser",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Question Response",
+                "verbose_name_plural": "Question Responses",
+                "db_table": "question_responses",
+                "ordering": ["-asked_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["group", "day"], name="question_re_group_i_411d8f_idx"
+                    ),
+                    models.Index(fields=["day"], name="question_re_day_7ea331_idx"),
+                    models.Index(
+                        fields=["responder", "day"],
+                        name="question_re_respond_cf0b36_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 6.0 on 2026-10-17 00:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0006_questionresponse"),
+        ("core", "0012_identity_search_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserMediaStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("media_type", models.CharField(max_length=20)),
+                ("message_count", models.IntegerField(db_default=0, default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="media_stats",
+                        to="core.telegramuser",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "User Media Stats",
+                "verbose_name_plural": "User Media Stats",
+                "db_table": "user_media_stats",
+                "ordering": ["-message_count"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "media_type"), name="unique_user_media_stats"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="UserStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("message_count", models.IntegerField(db_default=0, default=0)),
+                (
+                    "question_count",
+                    models.IntegerField(
+                        db_default=0, default=0, help_text="AI-detected questions"
+                    ),
+                ),
+                ("positive_count", models.IntegerField(db_default=0, default=0)),
+                ("negative_count", models.IntegerField(db_default=0, default=0)),
+                ("neutral_count", models.IntegerField(db_default=0, default=0)),
+                (
+                    "first_seen_at",
+                    models.DateTimeField(
+                        blank=True, help_text="Earliest telegram_created_at", null=True
+                    ),
+                ),
+                (
+                    "last_seen_at",
+                    models.DateTimeField(
+                        blank=True, help_text="Latest telegram_created_at", null=True
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stats",
+                        to="core.telegramuser",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "User Stats",
+                "verbose_name_plural": "User Stats",
+                "db_table": "user_stats",
+                "ordering": ["-message_count"],
+                "indexes": [
+                    models.Index(
+                        fields=["-message_count"], name="user_stats_message_4e5d98_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,3 +1,307 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+from core.models import Message, TelegramGroup, TelegramUser
+
+
+class AnalysisJob(models.Model):
+    """AI tahlil navbati (post_save signal faqat navbatga qo'shadi)"""
+
+    STATUS_PENDING = "pending"
+    STATUS_PROCESSING = "processing"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Pending"),
+        (STATUS_PROCESSING, "Processing"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    )
+
+    message = models.OneToOneField(
+        Message, on_delete=models.CASCADE, related_name="analysis_job"
+    )
+
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+
+    available_at = models.DateTimeField(
+        default=timezone.now, help_text="Job can be claimed after this time"
+    )
+    locked_at = models.DateTimeField(
+        null=True, blank=True, help_text="When a worker claimed this job"
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "analysis_jobs"
+        ordering = ["available_at"]
+        verbose_name = "Analysis Job"
+        verbose_name_plural = "Analysis Jobs"
+        indexes = [
+            models.Index(fields=["status", "available_at"]),
+        ]
+
+    def __str__(self):
+        return f"AnalysisJob {self.message_id} ({self.status})"
+
+
+class AnalysisCacheEntry(models.Model):
+    """Gemini tahlil natijalari keshi (normallashtirilgan matn hash'i bo'yicha)"""
+
+    key = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="sha256(kind | prompt version | model | normalized text)",
+    )
+    kind = models.CharField(max_length=20, db_index=True)
+    model_name = models.CharField(max_length=100)
+    prompt_version = models.CharField(max_length=20)
+
+    result = models.JSONField()
+    hits = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = "analysis_cache"
+        ordering = ["-last_used_at"]
+        verbose_name = "Analysis Cache Entry"
+        verbose_name_plural = "Analysis Cache Entries"
+
+    def __str__(self):
+        return f"{self.kind}:{self.key[:12]}"
+
+
+class BackfillCheckpoint(models.Model):
+    """Uzoq davom etadigan backfill buyruqlari uchun checkpoint (keyset pk)"""
+
+    name = models.CharField(max_length=100, unique=True)
+    last_pk = models.BigIntegerField(
+        default=0, help_text="Highest primary key already processed"
+    )
+    processed = models.BigIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "backfill_checkpoints"
+        verbose_name = "Backfill Checkpoint"
+        verbose_name_plural = "Backfill Checkpoints"
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_pk}"
+
+
+class MessageRollup(models.Model):
+    """Oldindan yig'ilgan xabar statistikasi (guruh, vaqt oralig'i, media turi)"""
+
+    GRANULARITY_HOUR = "hour"
+    GRANULARITY_DAY = "day"
+
+    GRANULARITY_CHOICES = (
+        (GRANULARITY_HOUR, "Hour"),
+        (GRANULARITY_DAY, "Day"),
+    )
+
+    group = models.ForeignKey(
+        TelegramGroup, on_delete=models.CASCADE, related_name="rollups"
+    )
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField(help_text="Start of the hour/day (local time)")
+    media_type = models.CharField(max_length=20)
+
+    message_count = models.IntegerField(default=0, db_default=0)
+    edited_count = models.IntegerField(default=0, db_default=0)
+    deleted_count = models.IntegerField(default=0, db_default=0)
+    positive_count = models.IntegerField(default=0, db_default=0)
+    negative_count = models.IntegerField(default=0, db_default=0)
+    neutral_count = models.IntegerField(default=0, db_default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "message_rollups"
+        ordering = ["bucket_start"]
+        verbose_name = "Message Rollup"
+        verbose_name_plural = "Message Rollups"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["group", "granularity", "bucket_start", "media_type"],
+                name="unique_rollup_bucket",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["granularity", "bucket_start"]),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.group_id} {self.granularity} {self.bucket_start} {self.media_type}"
+        )
+
+
+class TermFrequency(models.Model):
+    """So'z/keyword chastotasi (guruh va kun bo'yicha, oldindan yig'ilgan)"""
+
+    SOURCE_TEXT = "text"
+    SOURCE_KEYWORD = "keyword"
+
+    SOURCE_CHOICES = (
+        (SOURCE_TEXT, "Message text"),
+        (SOURCE_KEYWORD, "AI keyword"),
+    )
+
+    term = models.CharField(max_length=100)
+    group = models.ForeignKey(
+        TelegramGroup, on_delete=models.CASCADE, related_name="term_frequencies"
+    )
+    day = models.DateField(help_text="Local (TIME_ZONE) day of the message")
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+
+    count = models.IntegerField(default=0, db_default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "term_frequencies"
+        ordering = ["-count"]
+        verbose_name = "Term Frequency"
+        verbose_name_plural = "Term Frequencies"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["term", "group", "day", "source"],
+                name="unique_term_frequency",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["source", "day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.term} ({self.source}) {self.group_id} {self.day}: {self.count}"
+
+
+class QuestionResponse(models.Model):
+    """Savol xabari va unga (boshqa user'dan) birinchi javob kechikishi"""
+
+    question = models.OneToOneField(
+        Message, on_delete=models.CASCADE, related_name="question_response"
+    )
+    group = models.ForeignKey(
+        TelegramGroup, on_delete=models.CASCADE, related_name="question_responses"
+    )
+    asker = models.ForeignKey(
+        TelegramUser, on_delete=models.CASCADE, related_name="questions_asked"
+    )
+    asked_at = models.DateTimeField(help_text="Question's telegram_created_at")
+    day = models.DateField(help_text="Local (TIME_ZONE) day of the question")
+
+    first_reply = models.ForeignKey(
+        Message,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="answered_questions",
+    )
+    responder = models.ForeignKey(
+        TelegramUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="questions_answered",
+    )
+    first_reply_at = models.DateTimeField(null=True, blank=True)
+    latency = models.DurationField(
+        null=True, blank=True, help_text="first_reply_at - asked_at"
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "question_responses"
+        ordering = ["-asked_at"]
+        verbose_name = "Question Response"
+        verbose_name_plural = "Question Responses"
+        indexes = [
+            models.Index(fields=["group", "day"]),
+            models.Index(fields=["day"]),
+            models.Index(fields=["responder", "day"]),
+        ]
+
+    def __str__(self):
+        return f"Question {self.question_id} -> {self.first_reply_id}"
+
+
+class UserStats(models.Model):
+    """Foydalanuvchi statistikasi (ingest va AI tahlil vaqtida yangilanadi)"""
+
+    user = models.OneToOneField(
+        TelegramUser, on_delete=models.CASCADE, related_name="stats"
+    )
+
+    message_count = models.IntegerField(default=0, db_default=0)
+    question_count = models.IntegerField(
+        default=0, db_default=0, help_text="AI-detected questions"
+    )
+    positive_count = models.IntegerField(default=0, db_default=0)
+    negative_count = models.IntegerField(default=0, db_default=0)
+    neutral_count = models.IntegerField(default=0, db_default=0)
+
+    first_seen_at = models.DateTimeField(
+        null=True, blank=True, help_text="Earliest telegram_created_at"
+    )
+    last_seen_at = models.DateTimeField(
+        null=True, blank=True, help_text="Latest telegram_created_at"
+    )
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "user_stats"
+        ordering = ["-message_count"]
+        verbose_name = "User Stats"
+        verbose_name_plural = "User Stats"
+        indexes = [
+            models.Index(fields=["-message_count"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.message_count} messages"
+
+
+class UserMediaStats(models.Model):
+    """Foydalanuvchi xabarlari soni media turi bo'yicha"""
+
+    user = models.ForeignKey(
+        TelegramUser, on_delete=models.CASCADE, related_name="media_stats"
+    )
+    media_type = models.CharField(max_length=20)
+
+    message_count = models.IntegerField(default=0, db_default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "user_media_stats"
+        ordering = ["-message_count"]
+        verbose_name = "User Media Stats"
+        verbose_name_plural = "User Media Stats"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "media_type"], name="unique_user_media_stats"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.media_type}: {self.message_count}"
@@ -0,0 +1,144 @@
+"""
+Headline dashboard statistics.
+
+All message figures come from one conditional-aggregation pass over the
+messages table (plus a per-group count and a users count). The result is
+kept as a snapshot in Django's cache: ingest (new messages, edits and
+media type changes) and delete marks bump it in place with the deltas they
+already know, and hard deletes invalidate it, so a dashboard load is
+normally a single cache read.
+
+Bumps only reach the cache of the process that wrote. With the default
+per-process LocMemCache every other worker keeps its own snapshot, which
+lags behind until it expires after STATS_OVERVIEW_CACHE_TTL seconds; a
+shared cache backend (Redis, Memcached) keeps all workers current.
+Updates that bypass ingest (admin edits, raw SQL) are also only picked up
+on expiry.
+"""
+
+import threading
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from core.models import Message, TelegramUser
+
+OVERVIEW_CACHE_KEY = "analytics:overview:v1"
+
+# overview_stats counts only groups with at least this many messages
+ACTIVE_GROUP_MIN_MESSAGES = 5
+
+_bump_lock = threading.Lock()
+
+
+def compute_overview() -> dict:
+    """
+    Compute the overview snapshot from the database.
+
+    Returns:
+        dict: total_messages, deleted_messages, edited_messages, total_users,
+        media_counts {media_type: count}, group_counts {group pk: count}
+    """
+    media_types = [value for value, _ in Message.MEDIA_TYPES]
+
+    figures = Message.objects.aggregate(
+        total_messages=Count("id"),
+        deleted_messages=Count("id", filter=Q(is_deleted=True)),
+        edited_messages=Count("id", filter=Q(is_edited=True)),
+        **{
+            f"media_{media_type}": Count("id", filter=Q(media_type=media_type))
+            for media_type in media_types
+        },
+    )
+
+    group_counts = dict(
+        Message.objects.values("group_id")
+        .annotate(count=Count("id"))
+        .order_by()
+        .values_list("group_id", "count")
+    )
+
+    return {
+        "total_messages": figures["total_messages"],
+        "deleted_messages": figures["deleted_messages"],
+        "edited_messages": figures["edited_messages"],
+        "total_users": TelegramUser.objects.count(),
+        "media_counts": {
+            media_type: figures[f"media_{media_type}"]
+            for media_type in media_types
+            if figures[f"media_{media_type}"]
+        },
+        "group_counts": group_counts,
+    }
+
+
+def get_overview() -> dict:
+    """Cached overview snapshot (computed on a miss)."""
+    snapshot = cache.get(OVERVIEW_CACHE_KEY)
+    if snapshot is None:
+        snapshot = compute_overview()
+        cache.set(OVERVIEW_CACHE_KEY, snapshot, settings.STATS_OVERVIEW_CACHE_TTL)
+    return snapshot
+
+
+def bump_overview(
+    messages: int = 0,
+    deleted: int = 0,
+    edited: int = 0,
+    users: int = 0,
+    media_counts: Optional[Dict[str, int]] = None,
+    group_counts: Optional[Dict[int, int]] = None,
+) -> None:
+    """
+    Apply known deltas to the cached snapshot (no-op if nothing is cached).
+
+    Call after the writing transaction commits.
+    """
+    with _bump_lock:
+        snapshot = cache.get(OVERVIEW_CACHE_KEY)
+        if snapshot is None:
+            return
+
+        snapshot["total_messages"] += messages
+        snapshot["deleted_messages"] += deleted
+        snapshot["edited_messages"] += edited
+        snapshot["total_users"] += users
+        _bump_counts(snapshot["media_counts"], media_counts)
+        _bump_counts(snapshot["group_counts"], group_counts)
+
+        cache.set(OVERVIEW_CACHE_KEY, snapshot, settings.STATS_OVERVIEW_CACHE_TTL)
+
+
+def _bump_counts(counts: dict, deltas: Optional[dict]) -> None:
+    """Add deltas; keys that drop to zero are removed like compute_overview."""
+    for key, delta in (deltas or {}).items():
+        value = counts.get(key, 0) + delta
+        if value:
+            counts[key] = value
+        else:
+            counts.pop(key, None)
+
+
+def invalidate_overview() -> None:
+    """Drop the snapshot; the next read recomputes it."""
+    cache.delete(OVERVIEW_CACHE_KEY)
+
+
+def media_breakdown(snapshot: dict) -> list:
+    """[{"media_type", "count"}] from a snapshot, largest first."""
+    return [
+        {"media_type": media_type, "count": count}
+        for media_type, count in sorted(
+            snapshot["media_counts"].items(), key=lambda item: -item[1]
+        )
+        if count > 0
+    ]
+
+
+def total_groups(snapshot: dict, min_messages: int = 1) -> int:
+    """Number of groups with at least `min_messages` messages."""
+    return sum(
+        1 for count in snapshot["group_counts"].values() if count >= min_messages
+    )
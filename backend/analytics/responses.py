@@ -0,0 +1,245 @@
+"""
+Question response latency.
+
+Every question message gets a QuestionResponse row holding its first reply
+from another user, the responder and the latency (first_reply_at -
+asked_at). A message is a question if its MessageAnalysis says so; until
+it is analyzed, the `analytics.utils.is_question` heuristic decides. Rows
+are maintained where their inputs change: ingest (new questions and new
+or relinked replies), AI analysis (is_question) and hard deletes of
+replies. First replies are recomputed in SQL for the affected questions
+only. Rebuild from scratch with `python manage.py rebuild_question_responses`.
+
+Percentiles are computed in the database with window functions
+(nearest-rank over ROW_NUMBER() / COUNT() per partition).
+"""
+
+from datetime import date
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import (
+    Avg,
+    Count,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    Q,
+    Subquery,
+    Window,
+)
+from django.db.models.functions import RowNumber
+
+from analytics.models import QuestionResponse
+from analytics.terms import message_day
+from analytics.utils import is_question
+from core.models import Message, first_reply_subquery
+
+PERCENTILES = (50, 90, 99)
+
+# ?by= -> (partition column, label columns)
+DIMENSIONS = {
+    "group": ("group_id", ["group__telegram_id", "group__title"]),
+    "day": ("day", ["day"]),
+    "responder": (
+        "responder_id",
+        ["responder__telegram_id", "responder__username", "responder__first_name"],
+    ),
+}
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def register_questions(messages: Iterable[Message]) -> list:
+    """
+    Create QuestionResponse rows for question messages (existing rows kept).
+
+    Returns:
+        list: Message pks of the questions
+    """
+    rows = [
+        QuestionResponse(
+            question_id=message.pk,
+            group_id=message.group_id,
+            asker_id=message.user_id,
+            asked_at=message.telegram_created_at,
+            day=message_day(message),
+        )
+        for message in messages
+    ]
+    if rows:
+        QuestionResponse.objects.bulk_create(rows, ignore_conflicts=True)
+    return [row.question_id for row in rows]
+
+
+def drop_questions(message_ids: Iterable[int]) -> None:
+    """Delete rows of messages that turned out not to be questions."""
+    message_ids = list(message_ids)
+    if message_ids:
+        QuestionResponse.objects.filter(question_id__in=message_ids).delete()
+
+
+def refresh_first_replies(message_ids: Iterable[int]) -> None:
+    """
+    Recompute first reply, responder and latency for the given messages.
+
+    Ids that are not questions are ignored, so callers can pass every
+    reply target they touched.
+    """
+    message_ids = set(message_ids)
+    if not message_ids:
+        return
+
+    first_reply = first_reply_subquery(Message, "question_id", "asker_id")
+    responses = QuestionResponse.objects.filter(question_id__in=message_ids)
+
+    with transaction.atomic():
+        responses.update(
+            first_reply_id=Subquery(first_reply.values("id")[:1]),
+            responder_id=Subquery(first_reply.values("user_id")[:1]),
+            first_reply_at=Subquery(first_reply.values("telegram_created_at")[:1]),
+        )
+        responses.update(
+            latency=ExpressionWrapper(
+                F("first_reply_at") - F("asked_at"), output_field=DurationField()
+            )
+        )
+
+
+def update_question_responses(
+    new_questions: Iterable[Message], reply_targets: Iterable[int]
+) -> None:
+    """Register new questions and refresh questions whose replies changed."""
+    question_ids = register_questions(new_questions)
+    refresh_first_replies([*question_ids, *reply_targets])
+
+
+def latency_percentiles(
+    by: str = "group",
+    group_id: Optional[int] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+) -> list:
+    """
+    First-reply latency percentiles per group, day or responder.
+
+    Args:
+        by: "group", "day" or "responder"
+        group_id: Optional Telegram group id filter
+        since: Optional first day (inclusive)
+        until: Optional last day (inclusive)
+
+    Returns:
+        list: [{<labels>, questions, answered, avg_seconds, p50_seconds,
+        p90_seconds, p99_seconds}] most questions first. Questions without
+        a reply have no responder, so `by="responder"` only covers answered
+        ones.
+    """
+    partition, labels = DIMENSIONS[by]
+
+    responses = QuestionResponse.objects.all()
+    if group_id is not None:
+        responses = responses.filter(group__telegram_id=group_id)
+    if since is not None:
+        responses = responses.filter(day__gte=since)
+    if until is not None:
+        responses = responses.filter(day__lte=until)
+    if by == "responder":
+        responses = responses.filter(responder__isnull=False)
+
+    summary = (
+        responses.values(partition, *labels)
+        .annotate(
+            questions=Count("id"),
+            answered=Count("latency"),
+            avg_latency=Avg("latency"),
+        )
+        .order_by("-questions", partition)
+    )
+
+    # Nearest-rank: p-percentile = row ceil(p * n / 100) by latency
+    ranked = (
+        responses.filter(latency__isnull=False)
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=[F(partition)],
+                order_by=[F("latency").asc(), F("id").asc()],
+            ),
+            answered=Window(Count("id"), partition_by=[F(partition)]),
+        )
+        .filter(
+            Q(position=(F("answered") * PERCENTILES[0] + 99) / 100)
+            | Q(position=(F("answered") * PERCENTILES[1] + 99) / 100)
+            | Q(position=(F("answered") * PERCENTILES[2] + 99) / 100)
+        )
+        .values(partition, "position", "answered", "latency")
+    )
+
+    percentiles = {}
+    for row in ranked:
+        values = percentiles.setdefault(row[partition], {})
+        for percentile in PERCENTILES:
+            if row["position"] == (row["answered"] * percentile + 99) // 100:
+                values[percentile] = row["latency"].total_seconds()
+
+    result = []
+    for row in summary:
+        values = percentiles.get(row[partition], {})
+        item = {label: row[label] for label in labels}
+        item.update(
+            {
+                "questions": row["questions"],
+                "answered": row["answered"],
+                "avg_seconds": (
+                    round(row["avg_latency"].total_seconds(), 1)
+                    if row["avg_latency"] is not None
+                    else None
+                ),
+            }
+        )
+        for percentile in PERCENTILES:
+            item[f"p{percentile}_seconds"] = values.get(percentile)
+        result.append(item)
+
+    return result
+
+
+def rebuild_question_responses() -> int:
+    """
+    Recompute all question rows from messages and analyses.
+
+    Returns:
+        int: Number of QuestionResponse rows
+    """
+    with transaction.atomic():
+        QuestionResponse.objects.all().delete()
+
+        messages = (
+            Message.objects.only(
+                "id", "group_id", "user_id", "text", "telegram_created_at"
+            )
+            .annotate(ai_question=F("analysis__is_question"))
+            .order_by("id")
+        )
+
+        batch = []
+        for message in messages.iterator(chunk_size=REBUILD_BATCH_SIZE):
+            if message.ai_question is None:
+                question = is_question(message.text)
+            else:
+                question = message.ai_question
+            if question:
+                batch.append(message)
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                register_questions(batch)
+                batch = []
+        register_questions(batch)
+
+        question_ids = list(
+            QuestionResponse.objects.values_list("question_id", flat=True)
+        )
+        for start in range(0, len(question_ids), REBUILD_BATCH_SIZE):
+            refresh_first_replies(question_ids[start : start + REBUILD_BATCH_SIZE])
+
+    return len(question_ids)
@@ -0,0 +1,192 @@
+"""
+Hourly/daily message rollups.
+
+MessageRollup rows hold per (group, granularity, bucket_start, media_type)
+counts of messages, edits, deletes and sentiments. They are maintained
+incrementally where messages change (ingest, AI analysis, delete marks,
+hard deletes) and can be rebuilt from scratch with
+`python manage.py rebuild_rollups`. Buckets start at local (TIME_ZONE)
+hour/day boundaries, matching TruncHour/TruncDay.
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from analytics.counters import CounterBatch
+from analytics.models import MessageRollup
+from core.models import Message
+
+ROLLUP_KEY_FIELDS = ["group", "granularity", "bucket_start", "media_type"]
+
+SENTIMENT_COUNTERS = {
+    "positive": "positive_count",
+    "negative": "negative_count",
+    "neutral": "neutral_count",
+}
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def bucket_starts(dt: datetime) -> Dict[str, datetime]:
+    """
+    Local hour and day buckets for a timestamp.
+
+    Returns:
+        Dict[str, datetime]: {granularity: bucket start (aware)}
+    """
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    hour = timezone.localtime(dt).replace(minute=0, second=0, microsecond=0)
+    return {
+        MessageRollup.GRANULARITY_HOUR: hour,
+        MessageRollup.GRANULARITY_DAY: hour.replace(hour=0),
+    }
+
+
+class RollupBatch(CounterBatch):
+    """Collects rollup deltas for a set of messages and applies them at once."""
+
+    def __init__(self):
+        super().__init__(MessageRollup, ROLLUP_KEY_FIELDS)
+
+    def add_message(self, message: Message, **deltas: int) -> None:
+        """Add deltas to every bucket the message falls in."""
+        for granularity, start in bucket_starts(message.telegram_created_at).items():
+            self.add(
+                (message.group_id, granularity, start, message.media_type or "text"),
+                **deltas,
+            )
+
+    def add_sentiment_change(
+        self, message: Message, old: Optional[str], new: Optional[str]
+    ) -> None:
+        """Move the message from the `old` sentiment counter to `new`."""
+        if old == new:
+            return
+        deltas = {}
+        if old in SENTIMENT_COUNTERS:
+            deltas[SENTIMENT_COUNTERS[old]] = -1
+        if new in SENTIMENT_COUNTERS:
+            deltas[SENTIMENT_COUNTERS[new]] = 1
+        if deltas:
+            self.add_message(message, **deltas)
+
+    def remove_message(self, message: Message) -> None:
+        """Undo every counter the message contributed (hard delete)."""
+        self.add_message(message, **message_counters(message, sign=-1))
+
+    def move_media_type(self, message: Message, old_media_type: Optional[str]) -> None:
+        """
+        Move every counter of the message from `old_media_type` buckets to
+        its current media type (an edit replaced the media).
+        """
+        old_media_type = old_media_type or "text"
+        if old_media_type == (message.media_type or "text"):
+            return
+        removed = message_counters(message, sign=-1)
+        for granularity, start in bucket_starts(message.telegram_created_at).items():
+            self.add((message.group_id, granularity, start, old_media_type), **removed)
+        self.add_message(message, **message_counters(message))
+
+
+def message_counters(message: Message, sign: int = 1) -> Dict[str, int]:
+    """Counters a message contributes to its buckets (sign=-1 to undo)."""
+    deltas = {"message_count": sign}
+    if message.is_edited:
+        deltas["edited_count"] = sign
+    if message.is_deleted:
+        deltas["deleted_count"] = sign
+    if message.sentiment in SENTIMENT_COUNTERS:
+        deltas[SENTIMENT_COUNTERS[message.sentiment]] = sign
+    return deltas
+
+
+def message_series(
+    granularity: str, since: datetime, group_id: Optional[int] = None
+) -> list:
+    """
+    Message counts per bucket from `since` on.
+
+    Args:
+        granularity: MessageRollup.GRANULARITY_HOUR or GRANULARITY_DAY
+        since: First bucket start to include
+        group_id: Optional Telegram group id filter
+
+    Returns:
+        list: [{"bucket_start": datetime, "count": int}] ordered by time
+    """
+    rollups = MessageRollup.objects.filter(
+        granularity=granularity, bucket_start__gte=since
+    )
+    if group_id is not None:
+        rollups = rollups.filter(group__telegram_id=group_id)
+
+    return list(
+        rollups.values("bucket_start")
+        .annotate(count=Sum("message_count"))
+        .filter(count__gt=0)
+        .order_by("bucket_start")
+    )
+
+
+def rebuild_rollups() -> int:
+    """
+    Recompute all rollups from the messages table.
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    written = 0
+
+    with transaction.atomic():
+        MessageRollup.objects.all().delete()
+
+        for granularity, trunc in (
+            (MessageRollup.GRANULARITY_HOUR, TruncHour),
+            (MessageRollup.GRANULARITY_DAY, TruncDay),
+        ):
+            aggregates = (
+                Message.objects.annotate(bucket=trunc("telegram_created_at"))
+                .values("group_id", "bucket", "media_type")
+                .annotate(
+                    message_count=Count("id"),
+                    edited_count=Count("id", filter=Q(is_edited=True)),
+                    deleted_count=Count("id", filter=Q(is_deleted=True)),
+                    positive_count=Count("id", filter=Q(sentiment="positive")),
+                    negative_count=Count("id", filter=Q(sentiment="negative")),
+                    neutral_count=Count("id", filter=Q(sentiment="neutral")),
+                )
+                .order_by()
+            )
+
+            batch = []
+            for row in aggregates.iterator():
+                batch.append(
+                    MessageRollup(
+                        group_id=row["group_id"],
+                        granularity=granularity,
+                        bucket_start=row["bucket"],
+                        media_type=row["media_type"],
+                        message_count=row["message_count"],
+                        edited_count=row["edited_count"],
+                        deleted_count=row["deleted_count"],
+                        positive_count=row["positive_count"],
+                        negative_count=row["negative_count"],
+                        neutral_count=row["neutral_count"],
+                    )
+                )
+                if len(batch) >= REBUILD_BATCH_SIZE:
+                    MessageRollup.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+
+            if batch:
+                MessageRollup.objects.bulk_create(batch)
+                written += len(batch)
+
+    return written
@@ -3,13 +3,18 @@
 
 import logging
 
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.utils import timezone
 
-from analytics.gemini_ai import (analyze_sentiment, classify_intent,
-                                 extract_topics)
-from core.models import Message, MessageAnalysis, TelegramUser
+from analytics.gemini_ai import analyze_sentiment, classify_intent, extract_topics
+from analytics.overview import invalidate_overview
+from analytics.responses import refresh_first_replies
+from analytics.rollups import RollupBatch
+from analytics.tasks import enqueue_analysis
+from analytics.terms import TermBatch, counts_text
+from analytics.user_stats import UserStatsBatch
+from core.models import Message, MessageAnalysis
 
 logger = logging.getLogger(__name__)
 
@@ -17,96 +22,26 @@ logger = logging.getLogger(__name__)
 @receiver(post_save, sender=Message)
 def auto_analyze_message(sender, instance, created, **kwargs):
     """
-    Yangi xabar yaratilganda avtomatik AI tahlil qilish
+    Yangi xabar yaratilganda AI tahlil navbatiga qo'shish
 
-    IMPORTANT: Bu sizning model strukturangizga moslashtirilgan
-    - TelegramUser.is_bot tekshiradi
-    - MessageAnalysis yaratadi
-    - Message.sentiment/topics yangilaydi
+    Gemini chaqiruvlari bu yerda bajarilmaydi - webhook javobi LLM'ga
+    bog'liq bo'lmasligi uchun xabar faqat AnalysisJob navbatiga tushadi.
+    Navbatni `python manage.py process_analysis_queue` worker'i bajaradi.
     """
 
     # Only analyze new messages
     if not created:
         return
 
-    # Skip if no text or text too short
-    if not instance.text or len(instance.text) < 3:
-        logger.debug(f"⏭️ Skipping message {instance.message_id} - no text or too short")
-        return
-
-    # Skip bot messages
-    if instance.user and instance.user.is_bot:
-        logger.debug(f"⏭️ Skipping message {instance.message_id} - from bot")
-        return
-
-    try:
-        logger.info(
-            f"🤖 Auto-analyzing message {instance.message_id} from {instance.user}"
-        )
-
-        # ========================================
-        # ✅ AI ANALYSIS
-        # ========================================
-
-        # 1. Sentiment Analysis
-        sentiment = analyze_sentiment(instance.text)
-        sentiment_score = get_sentiment_score(sentiment)
-        logger.info(f"  ✅ Sentiment: {sentiment} ({sentiment_score})")
-
-        # 2. Topic Extraction
-        topics = extract_topics(instance.text)
-        topic = topics[0] if topics else "general"
-        logger.info(f"  ✅ Topics: {topics}")
-
-        # 3. Intent Classification
-        intent = classify_intent(instance.text)
-        is_question = intent == "question"
-        logger.info(f"  ✅ Intent: {intent}")
-
-        # ========================================
-        # SAVE TO MESSAGEANALYSIS
-        # ========================================
-
-        MessageAnalysis.objects.create(
-            message=instance,
-            topic=topic,
-            sentiment=sentiment,
-            sentiment_score=sentiment_score,
-            intent=intent,
-            keywords=topics,  # List of keywords
-            is_question=is_question,
-        )
-
-        # ========================================
-        # UPDATE MESSAGE WITH AI FIELDS
-        # ========================================
-
-        instance.sentiment = sentiment
-        instance.topics = topics
-        instance.ai_processed = True
-        instance.ai_processed_at = timezone.now()
-        instance.save(
-            update_fields=["sentiment", "topics", "ai_processed", "ai_processed_at"]
-        )
-
-        logger.info(f"✅ Message {instance.message_id} analyzed successfully")
-
-    except Exception as e:
-        logger.error(
-            f"❌ Auto-analysis error for message {instance.message_id}: {e}",
-            exc_info=True,
-        )
-
-        # Save error to message
-        instance.ai_error = str(e)
-        instance.ai_processed = False
-        instance.save(update_fields=["ai_error", "ai_processed"])
+    enqueue_analysis(instance)
 
 
 @receiver(post_save, sender=Message)
-def auto_reanalyze_edited_message(sender, instance, created, **kwargs):
+def auto_reanalyze_edited_message(
+    sender, instance, created, update_fields=None, **kwargs
+):
     """
-    Tahrirlangan xabarni qayta tahlil qilish
+    Tahrirlangan xabarni qayta tahlil navbatiga qo'shish
     """
 
     # Skip newly created messages
@@ -117,82 +52,67 @@ def auto_reanalyze_edited_message(sender, instance, created, **kwargs):
     if not instance.is_edited or not instance.text:
         return
 
-    # Skip if already processed very recently (avoid loops)
-    if instance.ai_processed_at:
-        from datetime import timedelta
+    # Skip partial saves that don't touch the text (avoid loops)
+    if update_fields is not None and "text" not in update_fields:
+        return
 
-        if timezone.now() - instance.ai_processed_at < timedelta(seconds=5):
-            logger.debug(f"⏭️ Skipping re-analysis - processed recently")
-            return
+    logger.info(f"🔄 Re-queueing edited message {instance.message_id}")
+    enqueue_analysis(instance)
 
-    try:
-        logger.info(f"🔄 Re-analyzing edited message {instance.message_id}")
-
-        # AI Analysis
-        sentiment = analyze_sentiment(instance.text)
-        sentiment_score = get_sentiment_score(sentiment)
-        topics = extract_topics(instance.text)
-        topic = topics[0] if topics else "general"
-        intent = classify_intent(instance.text)
-        is_question = intent == "question"
-
-        # Update or create MessageAnalysis
-        analysis, created = MessageAnalysis.objects.update_or_create(
-            message=instance,
-            defaults={
-                "topic": topic,
-                "sentiment": sentiment,
-                "sentiment_score": sentiment_score,
-                "intent": intent,
-                "keywords": topics,
-                "is_question": is_question,
-            },
-        )
-
-        # Update Message fields
-        instance.sentiment = sentiment
-        instance.topics = topics
-        instance.ai_processed = True
-        instance.ai_processed_at = timezone.now()
-        instance.ai_error = None  # Clear any previous errors
-        instance.save(
-            update_fields=[
-                "sentiment",
-                "topics",
-                "ai_processed",
-                "ai_processed_at",
-                "ai_error",
-            ]
-        )
-
-        logger.info(f"✅ Edited message {instance.message_id} re-analyzed")
 
-    except Exception as e:
-        logger.error(
-            f"❌ Re-analysis error for message {instance.message_id}: {e}",
-            exc_info=True,
-        )
-        instance.ai_error = str(e)
-        instance.save(update_fields=["ai_error"])
+@receiver(post_delete, sender=Message)
+def remove_message_from_rollups(sender, instance, **kwargs):
+    """
+    Bazadan o'chirilgan xabarni rollup'lar, so'z chastotasi va user
+    statistikasidan ayirish, overview snapshot'ini bekor qilish, reply
+    bo'lsa savolning birinchi javobini qayta hisoblash
+    """
+    rollups = RollupBatch()
+    rollups.remove_message(instance)
+    rollups.flush()
+    user_stats = UserStatsBatch()
+    user_stats.add_message(instance, sign=-1)
+    user_stats.flush()
+    transaction.on_commit(invalidate_overview)
 
+    if counts_text(instance.media_type):
+        terms = TermBatch()
+        terms.add_text_change(instance, instance.text, None)
+        terms.flush()
+
+    if instance.reply_to_id:
+        refresh_first_replies([instance.reply_to_id])
 
-def get_sentiment_score(sentiment):
-    """
-    Convert sentiment to numeric score
 
-    Args:
-        sentiment (str): 'positive', 'negative', or 'neutral'
+@receiver(post_delete, sender=MessageAnalysis)
+def remove_analysis_counters(sender, instance, **kwargs):
+    """
+    O'chirilgan tahlil keyword'larini chastota jadvalidan, savolini user
+    statistikasidan ayirish
 
-    Returns:
-        float: Score between -1.0 and 1.0
+    Xabar bilan birga (CASCADE) o'chirilganda ham xabar qatori hali
+    bazada bo'ladi - bog'liq qatorlar birinchi o'chiriladi.
     """
-    sentiment_map = {
-        "positive": 0.8,
-        "neutral": 0.0,
-        "negative": -0.8,
-        "question": 0.0,  # For backward compatibility
-    }
-    return sentiment_map.get(sentiment, 0.0)
+    if not instance.keywords and not instance.is_question:
+        return
+
+    message = (
+        Message.objects.filter(pk=instance.message_id)
+        .only("id", "group_id", "user_id", "telegram_created_at")
+        .first()
+    )
+    if message is None:
+        return
+
+    if instance.keywords:
+        terms = TermBatch()
+        terms.add_keyword_change(message, instance.keywords, None)
+        terms.flush()
+
+    if instance.is_question:
+        user_stats = UserStatsBatch()
+        user_stats.add_question_change(message, True, False)
+        user_stats.flush()
 
 
 # ========================================
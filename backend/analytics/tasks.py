@@ -0,0 +1,353 @@
+# backend/analytics/tasks.py
+# DB-BACKED AI ANALYSIS QUEUE
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from analytics.gemini_ai import analyze_messages_batch
+from analytics.models import AnalysisJob
+from analytics.responses import drop_questions, update_question_responses
+from analytics.rollups import RollupBatch
+from analytics.terms import TermBatch
+from analytics.user_stats import UserStatsBatch
+from core.models import Message, MessageAnalysis
+
+logger = logging.getLogger(__name__)
+
+MIN_ANALYSIS_TEXT_LENGTH = 3
+
+
+def get_sentiment_score(sentiment):
+    """
+    Convert sentiment to numeric score
+
+    Args:
+        sentiment (str): 'positive', 'negative', or 'neutral'
+
+    Returns:
+        float: Score between -1.0 and 1.0
+    """
+    sentiment_map = {
+        "positive": 0.8,
+        "neutral": 0.0,
+        "negative": -0.8,
+        "question": 0.0,  # For backward compatibility
+    }
+    return sentiment_map.get(sentiment, 0.0)
+
+
+def should_analyze(message):
+    """Xabar AI tahliliga muhtojmi?"""
+    if not message.text or len(message.text) < MIN_ANALYSIS_TEXT_LENGTH:
+        return False
+    if message.user and message.user.is_bot:
+        return False
+    return True
+
+
+def enqueue_analysis(message):
+    """
+    Xabarni AI tahlil navbatiga qo'shish
+
+    Faqat bitta INSERT/UPDATE - Gemini chaqiruvlari worker'da bajariladi.
+    Qayta navbatga qo'yilgan job (masalan, tahrirdan keyin) pending holatiga qaytadi.
+    """
+    if not should_analyze(message):
+        logger.debug(f"⏭️ Skipping message {message.message_id} - not analyzable")
+        return None
+
+    job, _ = AnalysisJob.objects.update_or_create(
+        message=message,
+        defaults={
+            "status": AnalysisJob.STATUS_PENDING,
+            "attempts": 0,
+            "last_error": None,
+            "available_at": timezone.now(),
+            "locked_at": None,
+        },
+    )
+    logger.debug(f"📥 Message {message.message_id} queued for analysis")
+    return job
+
+
+def enqueue_analyses(messages):
+    """
+    Bir nechta xabarni bitta INSERT ... ON CONFLICT UPDATE bilan navbatga qo'shish
+
+    Bulk ingest post_save signal'larini chaqirmaydi, shuning uchun yangi va
+    tahrirlangan xabarlar shu yerda navbatga qo'yiladi. Xabarlarda pk va
+    `user` (is_bot uchun) bo'lishi kerak.
+    """
+    now = timezone.now()
+    jobs = [
+        AnalysisJob(
+            message=message,
+            status=AnalysisJob.STATUS_PENDING,
+            attempts=0,
+            last_error=None,
+            available_at=now,
+            locked_at=None,
+        )
+        for message in messages
+        if should_analyze(message)
+    ]
+
+    if jobs:
+        AnalysisJob.objects.bulk_create(
+            jobs,
+            update_conflicts=True,
+            unique_fields=["message"],
+            update_fields=[
+                "status",
+                "attempts",
+                "last_error",
+                "available_at",
+                "locked_at",
+                "updated_at",
+            ],
+        )
+        logger.debug(f"📥 {len(jobs)} messages queued for analysis")
+
+    return len(jobs)
+
+
+def claim_jobs(limit=None):
+    """
+    Navbatdan bajarilishi kerak bo'lgan job'larni olish
+
+    Postgres'da SELECT ... FOR UPDATE SKIP LOCKED ishlatiladi, shuning uchun
+    bir nechta worker bir vaqtda ishlashi mumkin. Muddati o'tgan (worker
+    yiqilgan) processing job'lar ham qayta olinadi.
+    """
+    limit = limit or settings.ANALYSIS_QUEUE_BATCH_SIZE
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=settings.ANALYSIS_QUEUE_LOCK_TIMEOUT)
+
+    with transaction.atomic():
+        jobs = list(
+            AnalysisJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=AnalysisJob.STATUS_PENDING, available_at__lte=now)
+                | Q(status=AnalysisJob.STATUS_PROCESSING, locked_at__lt=stale_before)
+            )
+            .order_by("available_at")[:limit]
+        )
+
+        for job in jobs:
+            job.status = AnalysisJob.STATUS_PROCESSING
+            job.locked_at = now
+            job.attempts += 1
+            job.updated_at = now
+
+        AnalysisJob.objects.bulk_update(
+            jobs, ["status", "locked_at", "attempts", "updated_at"]
+        )
+
+    job_ids = [job.id for job in jobs]
+    return list(
+        AnalysisJob.objects.filter(id__in=job_ids)
+        .select_related("message", "message__user")
+        .order_by("available_at")
+    )
+
+
+def apply_analyses(messages, analyses):
+    """
+    Tahlil natijalarini MessageAnalysis va Message maydonlariga yozish (bulk)
+
+    Bitta tranzaksiyada: MessageAnalysis uchun INSERT ... ON CONFLICT UPDATE,
+    Message uchun bulk_update, sentiment rollup'lari, keyword chastotasi va
+    user statistikasi uchun counter increment, AI is_question bo'yicha
+    QuestionResponse qatorlari.
+    Xabarlarda group_id, user_id, telegram_created_at, media_type va sentiment
+    yuklangan bo'lishi kerak. Signal'lar ishga tushmaydi - xabar qayta
+    navbatga tushmaydi.
+    """
+    now = timezone.now()
+    analysis_rows = []
+    rollups = RollupBatch()
+    terms = TermBatch()
+    user_stats = UserStatsBatch()
+
+    old_analyses = {
+        message_id: (keywords, is_question)
+        for message_id, keywords, is_question in MessageAnalysis.objects.filter(
+            message_id__in=[message.pk for message in messages]
+        ).values_list("message_id", "keywords", "is_question")
+    }
+
+    for message, analysis in zip(messages, analyses):
+        sentiment = analysis["sentiment"]
+        topics = analysis.get("topics") or []
+        intent = analysis["intent"]
+
+        analysis_rows.append(
+            MessageAnalysis(
+                message=message,
+                topic=topics[0] if topics else "general",
+                sentiment=sentiment,
+                sentiment_score=get_sentiment_score(sentiment),
+                intent=intent,
+                keywords=topics,
+                is_question=analysis.get("is_question", intent == "question"),
+            )
+        )
+
+        old_keywords, old_question = old_analyses.get(message.pk, (None, False))
+        rollups.add_sentiment_change(message, message.sentiment, sentiment)
+        terms.add_keyword_change(message, old_keywords, topics)
+        user_stats.add_sentiment_change(message, message.sentiment, sentiment)
+        user_stats.add_question_change(
+            message, old_question, bool(analysis_rows[-1].is_question)
+        )
+        message.sentiment = sentiment
+        message.topics = topics
+        message.ai_processed = True
+        message.ai_processed_at = now
+        message.ai_error = None
+
+    with transaction.atomic():
+        MessageAnalysis.objects.bulk_create(
+            analysis_rows,
+            update_conflicts=True,
+            unique_fields=["message"],
+            update_fields=[
+                "topic",
+                "sentiment",
+                "sentiment_score",
+                "intent",
+                "keywords",
+                "is_question",
+            ],
+        )
+        Message.objects.bulk_update(
+            messages,
+            ["sentiment", "topics", "ai_processed", "ai_processed_at", "ai_error"],
+        )
+        rollups.flush()
+        terms.flush()
+        user_stats.flush()
+
+        questions = {
+            message.pk: bool(
+                analysis.get("is_question", analysis["intent"] == "question")
+            )
+            for message, analysis in zip(messages, analyses)
+        }
+        drop_questions([pk for pk, question in questions.items() if not question])
+        update_question_responses(
+            [message for message in messages if questions[message.pk]], []
+        )
+
+
+def apply_analysis(message, analysis):
+    """Bitta xabar uchun tahlil natijasini yozish"""
+    apply_analyses([message], [analysis])
+
+
+def process_jobs(jobs):
+    """
+    Job'larni bitta batch prompt orqali bajarish
+
+    AI tahlil qila olmagan xabarlar (API xatosi, kalit yo'q, noto'g'ri javob)
+    default natija bilan yozilmaydi - ularning job'lari backoff bilan qayta
+    urinishga qo'yiladi. Status faqat shu claim'ga tegishli job'lar uchun
+    o'zgaradi: ishlov paytida qayta navbatga qo'yilgan (tahrir qilingan)
+    xabar pending holatida qoladi.
+
+    Returns:
+        tuple: (processed, failed)
+    """
+    if not jobs:
+        return 0, 0
+
+    try:
+        analyses = analyze_messages_batch([job.message.text for job in jobs])
+        done = [(job, a) for job, a in zip(jobs, analyses) if a is not None]
+        if done:
+            apply_analyses([job.message for job, _ in done], [a for _, a in done])
+    except Exception as e:
+        logger.error(f"❌ Batch analysis error: {e}", exc_info=True)
+        for job in jobs:
+            _mark_failed(job, e)
+        return 0, len(jobs)
+
+    failed = [job for job, analysis in zip(jobs, analyses) if analysis is None]
+    for job in failed:
+        _mark_failed(job, "AI analysis failed")
+
+    now = timezone.now()
+    for locked_at, job_ids in _claims([job for job, _ in done]).items():
+        AnalysisJob.objects.filter(
+            id__in=job_ids, status=AnalysisJob.STATUS_PROCESSING, locked_at=locked_at
+        ).update(
+            status=AnalysisJob.STATUS_DONE,
+            last_error=None,
+            locked_at=None,
+            updated_at=now,
+        )
+
+    if done:
+        logger.info(f"✅ {len(done)} messages analyzed successfully")
+    if failed:
+        logger.warning(f"⚠️ {len(failed)} messages could not be analyzed")
+    return len(done), len(failed)
+
+
+def _claims(jobs):
+    """Job id'lari claim vaqti (locked_at) bo'yicha"""
+    claims = {}
+    for job in jobs:
+        claims.setdefault(job.locked_at, []).append(job.id)
+    return claims
+
+
+def _mark_failed(job, error):
+    """
+    Xatoni saqlash va exponential backoff bilan qayta urinishni rejalash
+
+    Job shu claim'dan beri qayta navbatga qo'yilgan bo'lsa, hech narsa
+    o'zgarmaydi (yangi pending holati saqlanadi).
+    """
+    now = timezone.now()
+    updates = {
+        "last_error": str(error),
+        "locked_at": None,
+        "updated_at": now,
+    }
+
+    if job.attempts >= settings.ANALYSIS_QUEUE_MAX_ATTEMPTS:
+        updates["status"] = AnalysisJob.STATUS_FAILED
+    else:
+        updates["status"] = AnalysisJob.STATUS_PENDING
+        updates["available_at"] = now + timedelta(
+            seconds=settings.ANALYSIS_QUEUE_RETRY_DELAY * 2 ** (job.attempts - 1)
+        )
+
+    updated = AnalysisJob.objects.filter(
+        pk=job.pk, status=AnalysisJob.STATUS_PROCESSING, locked_at=job.locked_at
+    ).update(**updates)
+    if not updated:
+        return
+
+    for field, value in updates.items():
+        setattr(job, field, value)
+
+    Message.objects.filter(pk=job.message_id).update(
+        ai_error=str(error), ai_processed=False
+    )
+
+
+def run_pending_jobs(limit=None):
+    """
+    Navbatdagi job'larni bir marta bajarish
+
+    Returns:
+        tuple: (processed, failed)
+    """
+    return process_jobs(claim_jobs(limit))
@@ -0,0 +1,224 @@
+"""
+Incremental word/keyword frequency index.
+
+TermFrequency rows hold per (term, group, day, source) counts. Text terms
+come from text messages (lowercased words, stop words and words of two
+characters or less dropped); keyword terms come from
+MessageAnalysis.keywords. Counts are maintained where the inputs change:
+ingest (new messages and text edits), AI analysis (keyword changes) and
+hard deletes. Soft-deleted messages keep their terms, as they did when the
+counts were computed on every request. Rebuild from scratch with
+`python manage.py rebuild_term_frequencies`.
+"""
+
+import re
+from collections import Counter
+from datetime import date
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from analytics.counters import CounterBatch
+from analytics.models import TermFrequency
+from core.models import Message, MessageAnalysis
+
+TERM_KEY_FIELDS = ["term", "group", "day", "source"]
+
+TERM_MAX_LENGTH = 100
+MIN_WORD_LENGTH = 3
+
+STOP_WORDS = {
+    "va",
+    "yoki",
+    "lekin",
+    "uchun",
+    "and",
+    "or",
+    "but",
+    "the",
+    "is",
+    "in",
+    "to",
+    "a",
+    "of",
+    "for",
+    "на",
+    "в",
+    "и",
+    "с",
+    "по",
+    "что",
+    "это",
+    "bu",
+    "u",
+    "ham",
+    "bilan",
+    "dan",
+    "ga",
+    "ni",
+    "ни",
+    "да",
+    "нет",
+}
+
+WORD_RE = re.compile(r"\b\w+\b")
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def text_terms(text: Optional[str]) -> Counter:
+    """Word counts of a message text."""
+    if not text:
+        return Counter()
+    return Counter(
+        word[:TERM_MAX_LENGTH]
+        for word in WORD_RE.findall(text.lower())
+        if word not in STOP_WORDS and len(word) >= MIN_WORD_LENGTH
+    )
+
+
+def keyword_terms(keywords) -> Counter:
+    """Keyword counts of MessageAnalysis.keywords (list or comma-separated)."""
+    if isinstance(keywords, str):
+        keywords = keywords.split(",")
+    elif not isinstance(keywords, list):
+        return Counter()
+    return Counter(
+        str(keyword).strip()[:TERM_MAX_LENGTH]
+        for keyword in keywords
+        if keyword and str(keyword).strip()
+    )
+
+
+def counts_text(media_type: Optional[str]) -> bool:
+    """Only text messages contribute text terms."""
+    return media_type == "text"
+
+
+def message_day(message: Message) -> date:
+    """Local day a message's terms are counted under."""
+    created_at = message.telegram_created_at
+    if timezone.is_naive(created_at):
+        created_at = timezone.make_aware(created_at)
+    return timezone.localdate(created_at)
+
+
+class TermBatch(CounterBatch):
+    """Collects term count deltas and applies them at once."""
+
+    def __init__(self):
+        super().__init__(TermFrequency, TERM_KEY_FIELDS)
+
+    def add_terms(
+        self, message: Message, source: str, terms: Counter, sign: int = 1
+    ) -> None:
+        day = message_day(message)
+        for term, count in terms.items():
+            self.add((term, message.group_id, day, source), count=sign * count)
+
+    def add_text_change(
+        self,
+        message: Message,
+        old_text: Optional[str],
+        new_text: Optional[str],
+    ) -> None:
+        """Replace the text terms of `old_text` with those of `new_text`."""
+        if old_text == new_text:
+            return
+        delta = text_terms(new_text)
+        delta.subtract(text_terms(old_text))
+        self.add_terms(message, TermFrequency.SOURCE_TEXT, delta)
+
+    def add_keyword_change(self, message: Message, old, new) -> None:
+        """Replace the keyword terms of `old` with those of `new`."""
+        delta = keyword_terms(new)
+        delta.subtract(keyword_terms(old))
+        self.add_terms(message, TermFrequency.SOURCE_KEYWORD, delta)
+
+
+def top_terms(
+    source: str,
+    limit: int = 20,
+    group_id: Optional[int] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+) -> list:
+    """
+    Most frequent terms.
+
+    Args:
+        source: TermFrequency.SOURCE_TEXT or SOURCE_KEYWORD
+        limit: Number of terms
+        group_id: Optional Telegram group id filter
+        since: Optional first day (inclusive)
+        until: Optional last day (inclusive)
+
+    Returns:
+        list: [{"word": str, "count": int}] most frequent first
+    """
+    terms = TermFrequency.objects.filter(source=source)
+    if group_id is not None:
+        terms = terms.filter(group__telegram_id=group_id)
+    if since is not None:
+        terms = terms.filter(day__gte=since)
+    if until is not None:
+        terms = terms.filter(day__lte=until)
+
+    rows = (
+        terms.values("term")
+        .annotate(total=Sum("count"))
+        .filter(total__gt=0)
+        .order_by("-total", "term")[:limit]
+    )
+    return [{"word": row["term"], "count": row["total"]} for row in rows]
+
+
+def rebuild_term_frequencies() -> int:
+    """
+    Recompute all term counts from messages and analyses.
+
+    Returns:
+        int: Number of TermFrequency rows written
+    """
+    with transaction.atomic():
+        TermFrequency.objects.all().delete()
+
+        batch = TermBatch()
+
+        messages = (
+            Message.objects.filter(media_type="text", text__isnull=False)
+            .only("id", "group_id", "telegram_created_at", "text")
+            .order_by("id")
+        )
+        for message in messages.iterator(chunk_size=REBUILD_BATCH_SIZE):
+            batch.add_terms(
+                message, TermFrequency.SOURCE_TEXT, text_terms(message.text)
+            )
+            if len(batch.rows) >= REBUILD_BATCH_SIZE:
+                batch.flush()
+
+        analyses = (
+            MessageAnalysis.objects.filter(keywords__isnull=False)
+            .select_related("message")
+            .only(
+                "keywords",
+                "message__id",
+                "message__group_id",
+                "message__telegram_created_at",
+            )
+            .order_by("id")
+        )
+        for analysis in analyses.iterator(chunk_size=REBUILD_BATCH_SIZE):
+            batch.add_terms(
+                analysis.message,
+                TermFrequency.SOURCE_KEYWORD,
+                keyword_terms(analysis.keywords),
+            )
+            if len(batch.rows) >= REBUILD_BATCH_SIZE:
+                batch.flush()
+
+        batch.flush()
+
+    return TermFrequency.objects.count()
@@ -1,3 +1,924 @@
-from django.test import TestCase
+import asyncio
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db.models import Subquery
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from analytics.ai_cache import AnalysisCache, analysis_cache
+from analytics.gemini_ai import (
+    BACKOFF_MAX_SECONDS,
+    MAX_API_RETRIES,
+    MAX_BATCH_RETRIES,
+    AsyncGeminiClient,
+    TokenBucket,
+    _validate_analysis_item,
+    analyze_messages_batch,
+    default_analysis,
+)
+from analytics.models import (
+    AnalysisCacheEntry,
+    AnalysisJob,
+    MessageRollup,
+    TermFrequency,
+    UserMediaStats,
+    UserStats,
+)
+from analytics.overview import compute_overview, get_overview
+from analytics.responses import latency_percentiles, update_question_responses
+from analytics.rollups import rebuild_rollups
+from analytics.tasks import (
+    claim_jobs,
+    enqueue_analyses,
+    enqueue_analysis,
+    process_jobs,
+    run_pending_jobs,
+)
+from analytics.terms import rebuild_term_frequencies
+from analytics.user_stats import rebuild_user_stats
+from core.models import (
+    Message,
+    MessageAnalysis,
+    TelegramGroup,
+    TelegramUser,
+    first_reply_subquery,
+)
+from telegram_bot.identity_cache import group_identity_cache, user_identity_cache
+from telegram_bot.ingest import ingest_messages, mark_deleted
+
+POSITIVE = {
+    "sentiment": "positive",
+    "intent": "feedback",
+    "topics": ["yetkazib berish"],
+    "urgency": "low",
+    "is_question": False,
+}
+
+
+@override_settings(
+    ANALYSIS_QUEUE_BATCH_SIZE=20,
+    ANALYSIS_QUEUE_MAX_ATTEMPTS=3,
+    ANALYSIS_QUEUE_RETRY_DELAY=30,
+    ANALYSIS_QUEUE_LOCK_TIMEOUT=300,
+)
+class AnalysisQueueTests(TestCase):
+    """AnalysisJob navbati: claim, bajarish, xato/backoff, qayta navbat"""
+
+    def setUp(self):
+        self.user = TelegramUser.objects.create(telegram_id=1, first_name="Ali")
+        self.group = TelegramGroup.objects.create(telegram_id=-100, title="Test")
+        self.next_message_id = 1
+
+    def create_message(self, text="Yetkazib berish juda tez bo'ldi", user=None):
+        message = Message.objects.create(
+            message_id=self.next_message_id,
+            user=user or self.user,
+            group=self.group,
+            text=text,
+            telegram_created_at=timezone.now(),
+        )
+        self.next_message_id += 1
+        return message
+
+    def analyze(self, *results):
+        """analyze_messages_batch natijalarini almashtirish"""
+        return mock.patch(
+            "analytics.tasks.analyze_messages_batch", return_value=list(results)
+        )
+
+    def job(self, message):
+        return AnalysisJob.objects.get(message=message)
+
+    def test_new_message_is_queued(self):
+        message = self.create_message()
+
+        job = self.job(message)
+        self.assertEqual(job.status, AnalysisJob.STATUS_PENDING)
+        self.assertEqual(job.attempts, 0)
+
+    def test_short_and_bot_messages_are_not_queued(self):
+        bot = TelegramUser.objects.create(telegram_id=2, first_name="Bot", is_bot=True)
+        short = self.create_message(text="ok")
+        from_bot = self.create_message(user=bot)
+
+        self.assertIsNone(enqueue_analysis(short))
+        self.assertEqual(enqueue_analyses([short, from_bot]), 0)
+        self.assertFalse(AnalysisJob.objects.exists())
+
+    def test_claim_marks_processing(self):
+        message = self.create_message()
+
+        jobs = claim_jobs()
+
+        self.assertEqual([job.message_id for job in jobs], [message.pk])
+        job = self.job(message)
+        self.assertEqual(job.status, AnalysisJob.STATUS_PROCESSING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.locked_at)
+        self.assertEqual(claim_jobs(), [])
+
+    def test_claim_respects_limit_and_available_at(self):
+        first = self.create_message()
+        second = self.create_message()
+        later = self.create_message()
+        AnalysisJob.objects.filter(message=later).update(
+            available_at=timezone.now() + timedelta(minutes=5)
+        )
+
+        self.assertEqual([job.message_id for job in claim_jobs(limit=1)], [first.pk])
+        self.assertEqual([job.message_id for job in claim_jobs()], [second.pk])
+
+    def test_stale_lock_is_reclaimed(self):
+        message = self.create_message()
+        claim_jobs()
+        AnalysisJob.objects.filter(message=message).update(
+            locked_at=timezone.now() - timedelta(seconds=301)
+        )
+
+        jobs = claim_jobs()
+
+        self.assertEqual([job.message_id for job in jobs], [message.pk])
+        self.assertEqual(self.job(message).attempts, 2)
+
+    def test_process_writes_analysis(self):
+        message = self.create_message()
+
+        with self.analyze(POSITIVE):
+            self.assertEqual(run_pending_jobs(), (1, 0))
+
+        job = self.job(message)
+        self.assertEqual(job.status, AnalysisJob.STATUS_DONE)
+        self.assertIsNone(job.locked_at)
+        message.refresh_from_db()
+        self.assertTrue(message.ai_processed)
+        self.assertEqual(message.sentiment, "positive")
+        analysis = MessageAnalysis.objects.get(message=message)
+        self.assertEqual(analysis.intent, "feedback")
+        self.assertEqual(analysis.keywords, ["yetkazib berish"])
+
+    def test_failed_analysis_is_retried_with_backoff(self):
+        ok = self.create_message()
+        failed = self.create_message(text="Buyurtma qayerda?")
+
+        with self.analyze(POSITIVE, None):
+            self.assertEqual(run_pending_jobs(), (1, 1))
+
+        self.assertEqual(self.job(ok).status, AnalysisJob.STATUS_DONE)
+        job = self.job(failed)
+        self.assertEqual(job.status, AnalysisJob.STATUS_PENDING)
+        self.assertIsNone(job.locked_at)
+        self.assertIsNotNone(job.last_error)
+        self.assertGreater(job.available_at, timezone.now() + timedelta(seconds=25))
+        failed.refresh_from_db()
+        self.assertFalse(failed.ai_processed)
+        self.assertIsNone(failed.sentiment)
+        self.assertFalse(MessageAnalysis.objects.filter(message=failed).exists())
+
+    def test_backoff_doubles_per_attempt(self):
+        message = self.create_message()
+        AnalysisJob.objects.filter(message=message).update(attempts=1)
+
+        before = timezone.now()
+        with self.analyze(None):
+            run_pending_jobs()
+
+        delay = self.job(message).available_at - before
+        self.assertGreaterEqual(delay, timedelta(seconds=60))
+        self.assertLess(delay, timedelta(seconds=90))
+
+    def test_api_exception_fails_whole_batch(self):
+        first = self.create_message()
+        second = self.create_message()
+
+        with mock.patch(
+            "analytics.tasks.analyze_messages_batch", side_effect=RuntimeError("503")
+        ), self.assertLogs("analytics.tasks", "ERROR"):
+            self.assertEqual(run_pending_jobs(), (0, 2))
+
+        for message in (first, second):
+            job = self.job(message)
+            self.assertEqual(job.status, AnalysisJob.STATUS_PENDING)
+            self.assertEqual(job.last_error, "503")
+            message.refresh_from_db()
+            self.assertEqual(message.ai_error, "503")
+
+    def test_max_attempts_marks_failed(self):
+        message = self.create_message()
+        AnalysisJob.objects.filter(message=message).update(attempts=2)
+
+        with self.analyze(None):
+            self.assertEqual(run_pending_jobs(), (0, 1))
+
+        job = self.job(message)
+        self.assertEqual(job.status, AnalysisJob.STATUS_FAILED)
+        self.assertEqual(job.attempts, 3)
+        self.assertEqual(claim_jobs(), [])
+
+    def test_reenqueue_during_processing_stays_pending(self):
+        done = self.create_message()
+        failed = self.create_message()
+        jobs = claim_jobs()
+
+        # Edits arrive while the batch is being analyzed
+        enqueue_analysis(done)
+        enqueue_analyses([failed])
+
+        with self.analyze(POSITIVE, None):
+            process_jobs(jobs)
+
+        for message in (done, failed):
+            job = self.job(message)
+            self.assertEqual(job.status, AnalysisJob.STATUS_PENDING)
+            self.assertEqual(job.attempts, 0)
+            self.assertIsNone(job.last_error)
+        failed.refresh_from_db()
+        self.assertIsNone(failed.ai_error)
+
+    def test_reenqueue_resets_failed_job(self):
+        message = self.create_message()
+        AnalysisJob.objects.filter(message=message).update(
+            status=AnalysisJob.STATUS_FAILED,
+            attempts=3,
+            last_error="503",
+            available_at=timezone.now() + timedelta(hours=1),
+        )
+
+        enqueue_analysis(message)
+
+        job = self.job(message)
+        self.assertEqual(job.status, AnalysisJob.STATUS_PENDING)
+        self.assertEqual(job.attempts, 0)
+        self.assertIsNone(job.last_error)
+        self.assertEqual([j.message_id for j in claim_jobs()], [message.pk])
+
+
+MODEL = "gemini-test"
+
+
+@override_settings(ANALYSIS_CACHE_TTL_DAYS=30, ANALYSIS_CACHE_MAX_ENTRIES=1000)
+class AnalysisCacheTests(TestCase):
+    """AnalysisCache: LRU va DB darajalari, TTL, eviction, prompt versiyasi"""
+
+    def setUp(self):
+        self.cache = AnalysisCache(maxsize=2)
+
+    def get(self, text, cache=None, version="1", model=MODEL):
+        return (cache or self.cache).get("batch", text, version, model)
+
+    def set(self, text, value, version="1", model=MODEL):
+        self.cache.set("batch", text, value, version, model)
+
+    def test_lru_hit_skips_database(self):
+        self.set("Salom", {"sentiment": "neutral"})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get("Salom"), {"sentiment": "neutral"})
+        self.assertEqual(self.cache.stats()["lru_hits"], 1)
+
+    def test_database_hit_fills_lru(self):
+        self.set("Salom", {"sentiment": "neutral"})
+        other = AnalysisCache(maxsize=2)
+
+        self.assertEqual(self.get("Salom", other), {"sentiment": "neutral"})
+        with self.assertNumQueries(0):
+            self.get("Salom", other)
+
+        self.assertEqual(other.stats()["db_hits"], 1)
+        self.assertEqual(other.stats()["lru_hits"], 1)
+        self.assertEqual(AnalysisCacheEntry.objects.get().hits, 1)
+
+    def test_key_ignores_case_and_whitespace(self):
+        self.set("Yetkazib  berish qachon?", {"intent": "question"})
+
+        self.assertEqual(self.get("  yetkazib berish QACHON? "), {"intent": "question"})
+
+    def test_miss(self):
+        self.assertIsNone(self.get("Salom"))
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    @override_settings(ANALYSIS_CACHE_TTL_DAYS=7)
+    def test_ttl_sets_expiry(self):
+        self.set("Salom", {"sentiment": "neutral"})
+
+        expires_in = AnalysisCacheEntry.objects.get().expires_at - timezone.now()
+        self.assertGreater(expires_in, timedelta(days=6, hours=23))
+        self.assertLessEqual(expires_in, timedelta(days=7))
+
+    def test_expired_entry_is_a_miss(self):
+        self.set("Salom", {"sentiment": "neutral"})
+        AnalysisCacheEntry.objects.update(expires_at=timezone.now())
+        self.cache.clear()
+
+        self.assertIsNone(self.get("Salom"))
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_overwrite_extends_expiry(self):
+        self.set("Salom", {"sentiment": "neutral"})
+        AnalysisCacheEntry.objects.update(expires_at=timezone.now())
+
+        self.set("Salom", {"sentiment": "positive"})
+        self.cache.clear()
+
+        self.assertEqual(self.get("Salom"), {"sentiment": "positive"})
+        self.assertEqual(AnalysisCacheEntry.objects.count(), 1)
+
+    def test_lru_evicts_least_recently_used(self):
+        self.set("a", 1)
+        self.set("b", 2)
+        self.get("a")
+        self.set("c", 3)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get("a"), 1)
+            self.assertEqual(self.get("c"), 3)
+        # "b" fell out of the LRU but is still in the database
+        with self.assertNumQueries(2):
+            self.assertEqual(self.get("b"), 2)
+        self.assertEqual(self.cache.stats()["lru_size"], 2)
+
+    @override_settings(ANALYSIS_CACHE_MAX_ENTRIES=2)
+    def test_evict_removes_expired_and_least_recently_used(self):
+        now = timezone.now()
+        texts = ["newest", "newer", "old", "oldest"]
+        for text in texts:
+            self.set(text, text)
+        for age, text in enumerate(texts):
+            key = self.cache.make_key("batch", text, "1", MODEL)
+            AnalysisCacheEntry.objects.filter(key=key).update(
+                last_used_at=now - timedelta(minutes=age)
+            )
+        self.set("expired", "expired")
+        AnalysisCacheEntry.objects.filter(
+            key=self.cache.make_key("batch", "expired", "1", MODEL)
+        ).update(expires_at=now, last_used_at=now + timedelta(minutes=1))
+
+        self.assertEqual(self.cache.evict(), 3)
+
+        self.cache.clear()
+        self.assertEqual(self.get("newest"), "newest")
+        self.assertEqual(self.get("newer"), "newer")
+        self.assertIsNone(self.get("old"))
+        self.assertIsNone(self.get("expired"))
+
+    def test_writes_trigger_eviction(self):
+        with mock.patch("analytics.ai_cache.EVICTION_INTERVAL", 2), mock.patch.object(
+            self.cache, "evict", return_value=0
+        ) as evict:
+            self.set("a", 1)
+            evict.assert_not_called()
+            self.set("b", 2)
+            evict.assert_called_once()
+
+    def test_prompt_version_and_model_invalidate(self):
+        self.set("Salom", {"sentiment": "neutral"}, version="1")
+
+        self.assertIsNone(self.get("Salom", version="2"))
+        self.assertIsNone(self.get("Salom", model="gemini-other"))
+        self.assertEqual(self.get("Salom", version="1"), {"sentiment": "neutral"})
+
+        self.set("Salom", {"sentiment": "positive"}, version="2")
+        self.assertEqual(self.get("Salom", version="2"), {"sentiment": "positive"})
+        self.assertEqual(AnalysisCacheEntry.objects.count(), 2)
+
+
+class FakeClock:
+    """time.monotonic va asyncio.sleep o'rnida: sleep soatni oldinga suradi"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, delay):
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+class ServiceUnavailable(Exception):
+    """google.api_core dagi 503 xatosi nomi bilan"""
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("analytics.gemini_ai.time.monotonic", self.clock.monotonic)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def acquire(self, bucket, amount):
+        with mock.patch("analytics.gemini_ai.asyncio.sleep", self.clock.sleep):
+            return asyncio.run(bucket.acquire(amount))
+
+    def test_full_bucket_does_not_wait(self):
+        bucket = TokenBucket(60)
+
+        self.assertEqual(self.acquire(bucket, 60), 0)
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_empty_bucket_waits_for_refill(self):
+        bucket = TokenBucket(60)
+        self.acquire(bucket, 60)
+
+        self.assertEqual(self.acquire(bucket, 3), 3)
+        self.assertEqual(self.clock.sleeps, [3])
+        self.assertEqual(bucket.tokens, 0)
+
+    def test_amount_is_capped_at_capacity(self):
+        bucket = TokenBucket(60)
+        self.acquire(bucket, 60)
+
+        self.assertEqual(self.acquire(bucket, 1000), 60)
+
+
+class GeminiClientTests(SimpleTestCase):
+    def setUp(self):
+        self.model = mock.Mock()
+        self.model.generate_content_async = mock.AsyncMock()
+        patcher = mock.patch("analytics.gemini_ai.model", self.model, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_client(self, request_timeout=60, call_timeout=None):
+        return AsyncGeminiClient(
+            max_concurrency=2,
+            requests_per_minute=600,
+            tokens_per_minute=1000000,
+            request_timeout=request_timeout,
+            call_timeout=call_timeout,
+        )
+
+    def generate(self, client):
+        sleep = mock.AsyncMock()
+        with mock.patch("analytics.gemini_ai.asyncio.sleep", sleep), mock.patch(
+            "analytics.gemini_ai.random.random", return_value=0.5
+        ):
+            try:
+                return asyncio.run(client.generate("Salom"))
+            finally:
+                self.sleeps = [call.args[0] for call in sleep.await_args_list]
+
+    def test_retryable_errors_back_off_exponentially(self):
+        self.model.generate_content_async.side_effect = [
+            ServiceUnavailable("503"),
+            ServiceUnavailable("503"),
+            ServiceUnavailable("503"),
+            "javob",
+        ]
+        client = self.make_client()
+
+        self.assertEqual(self.generate(client), "javob")
+        self.assertEqual(self.sleeps, [1, 2, 4])
+        self.assertEqual(client.api_calls, 4)
+        self.assertEqual(client.retries, 3)
+
+    def test_backoff_is_capped(self):
+        self.model.generate_content_async.side_effect = ServiceUnavailable("503")
+
+        with self.assertRaises(ServiceUnavailable):
+            self.generate(self.make_client())
+        self.assertEqual(self.sleeps, [1, 2, 4, 8, 16])
+        self.assertEqual(len(self.sleeps), MAX_API_RETRIES)
+        self.assertTrue(all(delay <= BACKOFF_MAX_SECONDS for delay in self.sleeps))
+
+    def test_other_errors_are_not_retried(self):
+        self.model.generate_content_async.side_effect = ValueError("bad prompt")
+        client = self.make_client()
+
+        with self.assertRaises(ValueError):
+            self.generate(client)
+        self.assertEqual(client.api_calls, 1)
+        self.assertEqual(self.sleeps, [])
+
+    def test_call_timeout_bounds_all_attempts(self):
+        async def hang(prompt):
+            await asyncio.Event().wait()
+
+        self.model.generate_content_async.side_effect = hang
+        client = self.make_client(request_timeout=0.05, call_timeout=0.12)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            self.generate(client)
+        self.assertEqual(client.api_calls, 3)
+
+    def test_rate_limit_waits_do_not_count_towards_call_timeout(self):
+        self.model.generate_content_async.return_value = "javob"
+        client = self.make_client(call_timeout=0.05)
+
+        async def throttled(amount=1):
+            await asyncio.sleep(0.1)
+            return 0.1
+
+        client.request_bucket.acquire = throttled
+
+        self.assertEqual(asyncio.run(client.generate("Salom")), "javob")
+        self.assertAlmostEqual(client.throttled_seconds, 0.1)
+
+
+@mock.patch("analytics.gemini_ai.GEMINI_AVAILABLE", True)
+class BatchAnalysisTests(TestCase):
+    """analyze_messages_batch: validatsiya va faqat xato elementlarni qayta yuborish"""
+
+    def setUp(self):
+        analysis_cache.clear()
+        self.addCleanup(analysis_cache.clear)
+
+    def request(self, *responses):
+        return mock.patch(
+            "analytics.gemini_ai._request_batch_analysis",
+            mock.AsyncMock(side_effect=responses),
+        )
+
+    def test_validate_normalizes_item(self):
+        item = {
+            "sentiment": " Positive ",
+            "intent": "QUESTION",
+            "topics": "yetkazib berish, narx, ok, to'lov, sifat",
+            "urgency": "urgent",
+        }
+
+        self.assertEqual(
+            _validate_analysis_item(item),
+            {
+                "sentiment": "positive",
+                "intent": "question",
+                "topics": ["yetkazib berish", "narx", "to'lov"],
+                "urgency": "low",
+                "is_question": True,
+            },
+        )
+
+    def test_validate_rejects_invalid_items(self):
+        for item in [
+            None,
+            "positive",
+            {"sentiment": "happy", "intent": "feedback"},
+            {"sentiment": "positive", "intent": "spam"},
+            {"sentiment": "positive", "intent": "feedback", "topics": 5},
+        ]:
+            with self.subTest(item=item):
+                self.assertIsNone(_validate_analysis_item(item))
+
+    def test_only_invalid_items_are_resent(self):
+        with self.request(
+            {1: POSITIVE, 2: {"sentiment": "?"}, 3: POSITIVE},
+            {1: POSITIVE},
+        ) as request:
+            results = analyze_messages_batch(["Rahmat", "Salom hammaga", "Zo'r"])
+
+        self.assertEqual(results, [POSITIVE] * 3)
+        self.assertEqual(
+            [call.args[0] for call in request.await_args_list],
+            [["Rahmat", "Salom hammaga", "Zo'r"], ["Salom hammaga"]],
+        )
+
+    def test_items_invalid_after_retries_stay_none(self):
+        with self.request({1: POSITIVE}, {}, {}, {}) as request, mock.patch.object(
+            analysis_cache, "set_many", wraps=analysis_cache.set_many
+        ) as set_many:
+            results = analyze_messages_batch(["Rahmat", "Salom hammaga", "ok"])
+
+        self.assertEqual(results, [POSITIVE, None, default_analysis()])
+        self.assertEqual(request.await_count, MAX_BATCH_RETRIES + 1)
+        self.assertEqual(set_many.call_args.args[1], {"Rahmat": POSITIVE})
+
+    def test_request_errors_are_retried_then_left_none(self):
+        with self.request(TimeoutError(), {1: POSITIVE}):
+            self.assertEqual(analyze_messages_batch(["Rahmat"]), [POSITIVE])
+
+        with self.request(*[TimeoutError()] * (MAX_BATCH_RETRIES + 1)) as request:
+            self.assertEqual(analyze_messages_batch(["Salom hammaga"]), [None])
+        self.assertEqual(request.await_count, MAX_BATCH_RETRIES + 1)
+
+
+class ResponseLatencyTests(TestCase):
+    """Savolga birinchi javob kechikishi (QuestionResponse, percentillar)"""
+
+    def setUp(self):
+        self.asker = TelegramUser.objects.create(telegram_id=1, first_name="Ali")
+        self.responder = TelegramUser.objects.create(
+            telegram_id=2, username="vali", first_name="Vali"
+        )
+        self.group = TelegramGroup.objects.create(telegram_id=-100, title="Test")
+        self.asked_at = timezone.now() - timedelta(hours=1)
+        self.next_message_id = 1
+
+    def create_message(self, user, seconds=0, reply_to=None, text="Rahmat"):
+        message = Message.objects.create(
+            message_id=self.next_message_id,
+            user=user,
+            group=self.group,
+            text=text,
+            reply_to=reply_to,
+            telegram_created_at=self.asked_at + timedelta(seconds=seconds),
+        )
+        self.next_message_id += 1
+        return message
+
+    def ask(self, *reply_delays):
+        """Savol va javoblar; update_question_responses ingest'dagidek"""
+        question = self.create_message(self.asker, text="Yetkazib berish qachon?")
+        replies = [
+            self.create_message(self.responder, delay, reply_to=question)
+            for delay in reply_delays
+        ]
+        update_question_responses([question], {question.pk} if replies else set())
+        return question
+
+    def test_percentiles_per_group(self):
+        self.ask(30)
+        self.ask(60, 90)
+        self.ask(120)
+        self.ask()
+
+        [row] = latency_percentiles("group")
+
+        self.assertEqual(row["group__telegram_id"], -100)
+        self.assertEqual(row["questions"], 4)
+        self.assertEqual(row["answered"], 3)
+        self.assertEqual(row["avg_seconds"], 70.0)
+        # Nearest-rank: n=3 -> p50 2-chi, p90/p99 3-chi qiymat
+        self.assertEqual(row["p50_seconds"], 60.0)
+        self.assertEqual(row["p90_seconds"], 120.0)
+        self.assertEqual(row["p99_seconds"], 120.0)
+
+    def test_self_reply_is_not_a_response(self):
+        question = self.ask()
+        self.create_message(self.asker, 10, reply_to=question)
+        self.create_message(self.responder, 45, reply_to=question)
+        update_question_responses([], {question.pk})
+
+        [row] = latency_percentiles("responder")
+
+        self.assertEqual(row["responder__telegram_id"], 2)
+        self.assertEqual(row["answered"], 1)
+        self.assertEqual(row["p50_seconds"], 45.0)
+
+    def test_filters(self):
+        self.ask(30)
+        other = TelegramGroup.objects.create(telegram_id=-200, title="Boshqa")
+        question = self.create_message(self.asker, text="Narxi qancha?")
+        Message.objects.filter(pk=question.pk).update(group=other)
+        question.refresh_from_db()
+        update_question_responses([question], set())
+
+        self.assertEqual(
+            [row["group__telegram_id"] for row in latency_percentiles("group")],
+            [-100, -200],
+        )
+        self.assertEqual(len(latency_percentiles("group", group_id=-200)), 1)
+
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        self.assertEqual(latency_percentiles("day", since=tomorrow), [])
+        [row] = latency_percentiles("day", group_id=-100, until=tomorrow)
+        self.assertEqual(row["p50_seconds"], 30.0)
+
+    def test_invalid_date_returns_400(self):
+        response = self.client.get(
+            "/api/stats/response-times/", {"date_from": "2026-02-30"}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["status"], "error")
+        self.assertIn("date_from", response.json()["message"])
+
+
+class ReplyChainStatsTests(TestCase):
+    """reply_chain_stats: sana oralig'i va first_reply_at ta'rifi"""
+
+    url = "/api/stats/reply-chain/"
+
+    def test_invalid_dates_return_400(self):
+        for params in (
+            {"date_to": "2026-02-30"},
+            {"date_from": "kecha"},
+            {"date_from": "2026-03-02", "date_to": "2026-03-01"},
+            {"date_from": "2025-01-01", "date_to": "2026-03-01"},
+        ):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertEqual(response.json()["status"], "error")
+
+    def test_first_reply_ignores_self_replies(self):
+        group = TelegramGroup.objects.create(telegram_id=-100, title="Test")
+        asker = TelegramUser.objects.create(telegram_id=1, first_name="Ali")
+        other = TelegramUser.objects.create(telegram_id=2, first_name="Vali")
+        now = timezone.now() - timedelta(minutes=10)
+
+        def create(message_id, user, seconds, reply_to=None):
+            return Message.objects.create(
+                message_id=message_id,
+                user=user,
+                group=group,
+                text="Salom",
+                reply_to=reply_to,
+                telegram_created_at=now + timedelta(seconds=seconds),
+            )
+
+        question = create(1, asker, 0)
+        create(2, asker, 5, reply_to=question)
+        create(3, other, 40, reply_to=question)
+        Message.objects.filter(pk=question.pk).update(reply_count=2)
+        reply_to_self = create(4, asker, 50)
+        create(5, asker, 55, reply_to=reply_to_self)
+        Message.objects.filter(pk=reply_to_self.pk).update(reply_count=1)
+        Message.objects.filter(pk__in=[question.pk, reply_to_self.pk]).update(
+            first_reply_at=Subquery(
+                first_reply_subquery(Message).values("telegram_created_at")[:1]
+            )
+        )
+
+        question.refresh_from_db()
+        reply_to_self.refresh_from_db()
+        self.assertEqual(question.first_reply_at, now + timedelta(seconds=40))
+        self.assertIsNone(reply_to_self.first_reply_at)
+
+        [row] = self.client.get(self.url).json()["groups"]
+        self.assertEqual(row["threads"], 2)
+        self.assertEqual(row["replies"], 3)
+        self.assertEqual(row["avg_first_reply_seconds"], 40.0)
+
+
+class IncrementalCountersTests(TestCase):
+    """
+    Ingest, edit, AI tahlil va o'chirishdan keyingi counter'lar
+    rebuild_* natijasi bilan bir xil bo'lishi kerak
+    """
+
+    def setUp(self):
+        # Protsess ichidagi keshlar test tranzaksiyasi rollback'idan keyin
+        # mavjud bo'lmagan pk'larni qaytarmasligi kerak
+        cache.clear()
+        user_identity_cache.clear()
+        group_identity_cache.clear()
+
+    def ingest(self, message_id, text, day="2026-03-01", **extra):
+        payload = {
+            "message_id": message_id,
+            "group_id": extra.pop("group_id", -100),
+            "group_name": "Test",
+            "sender_id": extra.pop("sender_id", 1),
+            "sender_first_name": "Ali",
+            "message_text": text,
+            "media_type": "text",
+            "telegram_created_at": f"{day}T10:00:00+05:00",
+        }
+        payload.update(extra)
+        [result] = ingest_messages([payload])
+        self.assertEqual(result["status"], "success", result)
+
+    def analyze(self, **keywords):
+        """Navbatni bajarish; keywords: {matn: topics}"""
+
+        def results(texts):
+            return [
+                dict(
+                    POSITIVE,
+                    topics=keywords.get(text, ["umumiy"]),
+                    is_question=text.endswith("?"),
+                )
+                for text in texts
+            ]
+
+        with mock.patch("analytics.tasks.analyze_messages_batch", side_effect=results):
+            run_pending_jobs()
+
+    def run_scenario(self, check=lambda: None):
+        """check() - har bir qadamdan keyin (on_commit callback'lari bajarilgan)"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ingest(1, "Yetkazib berish juda tez bo'ldi")
+            self.ingest(2, "Narxlar juda qimmat", day="2026-03-02", sender_id=2)
+            self.ingest(3, "Python guruhi", group_id=-200)
+            self.ingest(4, "Rahmat, yetkazib berish yaxshi", reply_to_message_id=1)
+            self.ingest(5, None, media_type="photo", media_file_id="photo-5")
+            self.ingest(6, "Yetkazib berish qancha turadi?", sender_id=2)
+        check()
+        self.analyze(**{"Narxlar juda qimmat": ["narx", "qimmat"]})
+        check()
+
+        # Edit'lar: text o'zgaradi (qayta tahlil qilinadi), media turi o'zgaradi
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ingest(
+                2, "Narxlar endi arzon", day="2026-03-02", sender_id=2, is_edited=True
+            )
+            self.ingest(
+                5, "Video", media_type="video", media_file_id="video-5", is_edited=True
+            )
+        check()
+        self.analyze(**{"Narxlar endi arzon": ["narx", "arzon"]})
+        check()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_deleted(Message.objects.filter(message_id=3))
+        check()
+        with self.captureOnCommitCallbacks(execute=True):
+            Message.objects.get(message_id=4).delete()
+        check()
+
+    def snapshot(self, model, *fields):
+        return sorted(
+            model.objects.filter(**{f"{fields[-1]}__gt": 0}).values_list(*fields)
+        )
+
+    def test_term_frequencies_match_rebuild(self):
+        self.run_scenario()
+        fields = ("term", "group_id", "day", "source", "count")
+        incremental = self.snapshot(TermFrequency, *fields)
+
+        rebuild_term_frequencies()
+
+        self.assertEqual(incremental, self.snapshot(TermFrequency, *fields))
+        keywords = {
+            term: count
+            for term, _, _, source, count in incremental
+            if source == TermFrequency.SOURCE_KEYWORD
+        }
+        self.assertEqual(keywords["narx"], 1)
+        self.assertEqual(keywords["arzon"], 1)
+        self.assertNotIn("qimmat", keywords)
+        self.assertNotIn("qimmat", [term for term, *_ in incremental])
+        self.assertNotIn("rahmat", [term for term, *_ in incremental])
+
+    def test_rollups_match_rebuild(self):
+        self.run_scenario()
+        fields = (
+            "group_id",
+            "granularity",
+            "bucket_start",
+            "media_type",
+            "edited_count",
+            "deleted_count",
+            "positive_count",
+            "negative_count",
+            "neutral_count",
+            "message_count",
+        )
+        incremental = self.snapshot(MessageRollup, *fields)
+
+        rebuild_rollups()
+
+        self.assertEqual(incremental, self.snapshot(MessageRollup, *fields))
+        self.assertEqual(
+            {row[3] for row in incremental if row[1] == MessageRollup.GRANULARITY_DAY},
+            {"text", "video"},
+        )
+
+    def test_user_stats_match_rebuild(self):
+        self.run_scenario()
+        stats_fields = (
+            "user_id",
+            "question_count",
+            "positive_count",
+            "negative_count",
+            "neutral_count",
+            "first_seen_at",
+            "last_seen_at",
+            "message_count",
+        )
+        media_fields = ("user_id", "media_type", "message_count")
+        incremental = (
+            self.snapshot(UserStats, *stats_fields),
+            self.snapshot(UserMediaStats, *media_fields),
+        )
+
+        rebuild_user_stats()
+
+        self.assertEqual(
+            incremental,
+            (
+                self.snapshot(UserStats, *stats_fields),
+                self.snapshot(UserMediaStats, *media_fields),
+            ),
+        )
+        self.assertEqual(
+            [media_type for _, media_type, _ in incremental[1]],
+            ["text", "video", "text"],
+        )
+        self.assertEqual([row[1] for row in incremental[0]], [0, 1])
+
+    def test_word_frequency_view(self):
+        self.run_scenario()
+        url = "/api/stats/word-frequency/"
+
+        response = self.client.get(url, {"date_from": "2026-03-02"})
+        self.assertEqual(
+            response.json(),
+            [{"word": "arzon", "count": 1}, {"word": "narx", "count": 1}],
+        )
+
+        response = self.client.get(url, {"date_to": "2026-02-30"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["status"], "error")
+
+    def test_overview_snapshot_matches_compute(self):
+        get_overview()
+
+        def check():
+            self.assertEqual(get_overview(), compute_overview())
+
+        self.run_scenario(check)
+
+        self.assertEqual(get_overview()["media_counts"], {"text": 4, "video": 1})
@@ -0,0 +1,156 @@
+"""
+Per-user message statistics.
+
+UserStats holds one row per user: message, AI-question and sentiment
+counts plus first/last seen. UserMediaStats holds the per-media-type
+message counts. Counters are maintained incrementally where their inputs
+change (ingest, AI analysis, sentiment updates, hard deletes);
+first/last seen is recomputed in SQL for the touched users only, using
+the (user, -telegram_created_at) index. Rebuild from scratch with
+`python manage.py rebuild_user_stats`.
+"""
+
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, OuterRef, Q, Subquery
+
+from analytics.counters import CounterBatch
+from analytics.models import UserMediaStats, UserStats
+from analytics.rollups import SENTIMENT_COUNTERS
+from core.models import Message, MessageAnalysis
+
+REBUILD_BATCH_SIZE = 1000
+
+
+class UserStatsBatch(CounterBatch):
+    """Collects per-user deltas (UserStats and UserMediaStats) for one flush."""
+
+    def __init__(self):
+        super().__init__(UserStats, ["user"])
+        self.media = CounterBatch(UserMediaStats, ["user", "media_type"])
+        self.seen_users = set()
+
+    def add_message(self, message: Message, sign: int = 1) -> None:
+        """Count a new message (sign=-1 removes it, e.g. on hard delete)."""
+        deltas = {"message_count": sign}
+        if message.sentiment in SENTIMENT_COUNTERS:
+            deltas[SENTIMENT_COUNTERS[message.sentiment]] = sign
+        self.add((message.user_id,), **deltas)
+        self.media.add(
+            (message.user_id, message.media_type or "text"), message_count=sign
+        )
+        self.seen_users.add(message.user_id)
+
+    def move_media_type(self, message: Message, old_media_type: Optional[str]) -> None:
+        """Count the message under its current media type (an edit replaced it)."""
+        old_media_type = old_media_type or "text"
+        new_media_type = message.media_type or "text"
+        if old_media_type != new_media_type:
+            self.media.add((message.user_id, old_media_type), message_count=-1)
+            self.media.add((message.user_id, new_media_type), message_count=1)
+
+    def add_sentiment_change(
+        self, message: Message, old: Optional[str], new: Optional[str]
+    ) -> None:
+        """Move the message from the `old` sentiment counter to `new`."""
+        if old == new:
+            return
+        deltas = {}
+        if old in SENTIMENT_COUNTERS:
+            deltas[SENTIMENT_COUNTERS[old]] = -1
+        if new in SENTIMENT_COUNTERS:
+            deltas[SENTIMENT_COUNTERS[new]] = 1
+        if deltas:
+            self.add((message.user_id,), **deltas)
+
+    def add_question_change(self, message: Message, old: bool, new: bool) -> None:
+        """AI is_question flag of the message changed."""
+        if old != new:
+            self.add((message.user_id,), question_count=1 if new else -1)
+
+    def flush(self) -> int:
+        touched = super().flush()
+        self.media.flush()
+        refresh_seen(self.seen_users)
+        self.seen_users = set()
+        return touched
+
+
+def refresh_seen(user_ids: Iterable[int]) -> None:
+    """Recompute first_seen_at / last_seen_at for the given users."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+
+    messages = Message.objects.filter(user_id=OuterRef("user_id"))
+    UserStats.objects.filter(user_id__in=user_ids).update(
+        first_seen_at=Subquery(
+            messages.order_by("telegram_created_at").values("telegram_created_at")[:1]
+        ),
+        last_seen_at=Subquery(
+            messages.order_by("-telegram_created_at").values("telegram_created_at")[:1]
+        ),
+    )
+
+
+def rebuild_user_stats() -> int:
+    """
+    Recompute all user statistics from messages and analyses.
+
+    Returns:
+        int: Number of UserStats rows written
+    """
+    questions = dict(
+        MessageAnalysis.objects.filter(is_question=True)
+        .values("message__user_id")
+        .annotate(count=Count("id"))
+        .order_by()
+        .values_list("message__user_id", "count")
+    )
+
+    with transaction.atomic():
+        UserStats.objects.all().delete()
+        UserMediaStats.objects.all().delete()
+
+        stats = (
+            Message.objects.values("user_id")
+            .annotate(
+                message_count=Count("id"),
+                positive_count=Count("id", filter=Q(sentiment="positive")),
+                negative_count=Count("id", filter=Q(sentiment="negative")),
+                neutral_count=Count("id", filter=Q(sentiment="neutral")),
+                first_seen_at=Min("telegram_created_at"),
+                last_seen_at=Max("telegram_created_at"),
+            )
+            .order_by()
+        )
+        batch = []
+        written = 0
+        for row in stats.iterator():
+            batch.append(
+                UserStats(question_count=questions.get(row["user_id"], 0), **row)
+            )
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                UserStats.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            UserStats.objects.bulk_create(batch)
+            written += len(batch)
+
+        media = (
+            Message.objects.values("user_id", "media_type")
+            .annotate(message_count=Count("id"))
+            .order_by()
+        )
+        batch = []
+        for row in media.iterator():
+            batch.append(UserMediaStats(**row))
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                UserMediaStats.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            UserMediaStats.objects.bulk_create(batch)
+
+    return written
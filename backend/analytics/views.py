@@ -1,49 +1,60 @@
 # backend/analytics/views.py
 # UPDATED WITH ENHANCED AI INTEGRATION
 
-import re
-from collections import Counter
-from datetime import timedelta
+from datetime import datetime, timedelta
 
-from django.db.models import Avg, Count, Q
-from django.db.models.functions import TruncDate, TruncHour
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Max, Q
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
+from analytics.models import MessageRollup, TermFrequency, UserMediaStats, UserStats
+from analytics.overview import get_overview, media_breakdown, total_groups
+from analytics.responses import DIMENSIONS as RESPONSE_DIMENSIONS
+from analytics.responses import latency_percentiles
+from analytics.rollups import (
+    SENTIMENT_COUNTERS,
+    RollupBatch,
+    bucket_starts,
+    message_series,
+)
+from analytics.terms import top_terms
+from analytics.user_stats import UserStatsBatch
 from core.models import Message, MessageAnalysis, TelegramUser
 
 # ========================================
 # ✅ ENHANCED AI IMPORTS
 # ========================================
-from .gemini_ai import (analyze_message_comprehensive, analyze_sentiment,
-                        analyze_sentiment_batch, classify_intent,
-                        extract_topics, generate_group_insights,
-                        generate_weekly_insights, is_gemini_available)
+from .gemini_ai import (
+    analyze_message_comprehensive,
+    analyze_sentiment,
+    analyze_sentiment_batch,
+    classify_intent,
+    extract_topics,
+    generate_group_insights,
+    generate_weekly_insights,
+    is_gemini_available,
+)
+
+# reply_chain_stats guruh ko'rsatkichlari oralig'i (kun)
+REPLY_STATS_DEFAULT_DAYS = 30
+REPLY_STATS_MAX_DAYS = 366
 
 
 @api_view(["GET"])
 def stats_overview(request):
-    """Umumiy statistika"""
-    total_messages = Message.objects.count()
-    total_users = TelegramUser.objects.count()
-    total_groups = Message.objects.values("group").distinct().count()
-
-    # Media statistika
-    media_stats = Message.objects.values("media_type").annotate(count=Count("id"))
-
-    # Deleted/Edited
-    deleted_count = Message.objects.filter(is_deleted=True).count()
-    edited_count = Message.objects.filter(is_edited=True).count()
+    """Umumiy statistika (keshlangan snapshot'dan)"""
+    snapshot = get_overview()
 
     return Response(
         {
-            "total_messages": total_messages,
-            "total_users": total_users,
-            "total_groups": total_groups,
-            "deleted_messages": deleted_count,
-            "edited_messages": edited_count,
-            "media_distribution": list(media_stats),
+            "total_messages": snapshot["total_messages"],
+            "total_users": snapshot["total_users"],
+            "total_groups": total_groups(snapshot),
+            "deleted_messages": snapshot["deleted_messages"],
+            "edited_messages": snapshot["edited_messages"],
+            "media_distribution": media_breakdown(snapshot),
         }
     )
 
@@ -53,21 +64,21 @@ def top_active_users(request):
     """Eng faol userlar"""
     limit = int(request.GET.get("limit", 10))
 
-    users = (
-        TelegramUser.objects.annotate(message_count=Count("messages"))
-        .filter(message_count__gt=0)
+    stats = (
+        UserStats.objects.filter(message_count__gt=0)
+        .select_related("user")
         .order_by("-message_count")[:limit]
     )
 
     data = [
         {
-            "user_id": user.telegram_id,
-            "username": user.username,
-            "full_name": user.full_name,
-            "first_name": user.first_name,
-            "message_count": user.message_count,
+            "user_id": row.user.telegram_id,
+            "username": row.user.username,
+            "full_name": row.user.full_name,
+            "first_name": row.user.first_name,
+            "message_count": row.message_count,
         }
-        for user in users
+        for row in stats
     ]
 
     return Response(data)
@@ -77,102 +88,77 @@ def top_active_users(request):
 def word_frequency(request):
     """
     So'z chastotasi - AI keywords'dan yoki basic text analysis
+
+    TermFrequency jadvalidan o'qiladi. Ixtiyoriy filtrlar: ?group_id=,
+    ?date_from=YYYY-MM-DD, ?date_to=YYYY-MM-DD
     """
     limit = int(request.GET.get("limit", 20))
+    try:
+        filters = {
+            "group_id": _group_filter(request),
+            "since": _date_filter(request, "date_from"),
+            "until": _date_filter(request, "date_to"),
+        }
+    except ValueError as e:
+        return Response({"status": "error", "message": str(e)}, status=400)
 
     # Try to get from AI-extracted keywords first
-    all_keywords = []
-
-    # Get AI keywords from MessageAnalysis
-    analyses = MessageAnalysis.objects.filter(keywords__isnull=False).values_list(
-        "keywords", flat=True
-    )
-
-    for keywords in analyses:
-        if isinstance(keywords, list):
-            all_keywords.extend(keywords)
-        elif isinstance(keywords, str):
-            all_keywords.extend(keywords.split(","))
-
-    # If we have AI keywords, use them
-    if all_keywords:
-        keyword_counts = Counter([k.strip() for k in all_keywords if k])
-        top_words = [
-            {"word": word, "count": count}
-            for word, count in keyword_counts.most_common(limit)
-        ]
-        return Response(top_words)
+    top_words = top_terms(TermFrequency.SOURCE_KEYWORD, limit, **filters)
 
     # Fallback: Basic text analysis
-    messages = Message.objects.filter(
-        media_type="text", text__isnull=False
-    ).values_list("text", flat=True)
-
-    all_words = []
-    stop_words = {
-        "va",
-        "yoki",
-        "lekin",
-        "uchun",
-        "and",
-        "or",
-        "but",
-        "the",
-        "is",
-        "in",
-        "to",
-        "a",
-        "of",
-        "for",
-        "на",
-        "в",
-        "и",
-        "с",
-        "по",
-        "что",
-        "это",
-        "bu",
-        "u",
-        "ham",
-        "bilan",
-        "dan",
-        "ga",
-        "ni",
-        "ни",
-        "да",
-        "нет",
-    }
-
-    for text in messages:
-        words = re.findall(r"\b\w+\b", text.lower())
-        words = [w for w in words if w not in stop_words and len(w) > 2]
-        all_words.extend(words)
-
-    word_counts = Counter(all_words)
-    top_words = [
-        {"word": word, "count": count} for word, count in word_counts.most_common(limit)
-    ]
+    if not top_words:
+        top_words = top_terms(TermFrequency.SOURCE_TEXT, limit, **filters)
 
     return Response(top_words)
 
 
+def _group_filter(request):
+    """?group_id= (Telegram group id) parametri"""
+    group_id = request.GET.get("group_id")
+    return int(group_id) if group_id else None
+
+
+def _date_filter(request, name):
+    """
+    ?date_from= / ?date_to= (YYYY-MM-DD) parametri
+
+    Noto'g'ri sana (masalan 2026-02-30) - ValueError (view'lar 400 qaytaradi)
+    """
+    value = request.GET.get(name)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f"{name} must be a valid YYYY-MM-DD date: {value}")
+    return day
+
+
+def _local_midnight(day):
+    """Mahalliy (TIME_ZONE) kun boshi (aware datetime)"""
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
 @api_view(["GET"])
 def messages_per_day(request):
-    """Kunlik xabarlar statistikasi"""
+    """Kunlik xabarlar statistikasi (MessageRollup'dan, faqat so'ralgan oraliq)"""
     days = int(request.GET.get("days", 30))
 
-    stats = (
-        Message.objects.annotate(date=TruncDate("telegram_created_at"))
-        .values("date")
-        .annotate(count=Count("id"))
-        .order_by("date")
-    )
+    today = bucket_starts(timezone.now())[MessageRollup.GRANULARITY_DAY]
+    since = today - timedelta(days=days - 1)
 
-    # Last N days
-    stats = list(stats)[-days:]
+    stats = message_series(
+        MessageRollup.GRANULARITY_DAY, since, group_id=_group_filter(request)
+    )
 
     data = [
-        {"date": item["date"].isoformat(), "count": item["count"]} for item in stats
+        {
+            "date": timezone.localtime(item["bucket_start"]).date().isoformat(),
+            "count": item["count"],
+        }
+        for item in stats
     ]
 
     return Response(data)
@@ -180,20 +166,17 @@ def messages_per_day(request):
 
 @api_view(["GET"])
 def messages_per_hour(request):
-    """Soatlik xabarlar statistikasi"""
-    stats = (
-        Message.objects.annotate(hour=TruncHour("telegram_created_at"))
-        .values("hour")
-        .annotate(count=Count("id"))
-        .order_by("hour")
-    )
+    """Soatlik xabarlar statistikasi (oxirgi 24 soat, MessageRollup'dan)"""
+    current_hour = bucket_starts(timezone.now())[MessageRollup.GRANULARITY_HOUR]
+    since = current_hour - timedelta(hours=23)
 
-    # Last 24 hours
-    stats = list(stats)[-24:]
+    stats = message_series(
+        MessageRollup.GRANULARITY_HOUR, since, group_id=_group_filter(request)
+    )
 
     data = [
         {
-            "hour": item["hour"].isoformat() if item["hour"] else None,
+            "hour": timezone.localtime(item["bucket_start"]).isoformat(),
             "count": item["count"],
         }
         for item in stats
@@ -263,14 +246,50 @@ def sentiment_overall(request):
 
 @api_view(["GET"])
 def reply_chain_stats(request):
-    """Reply chain statistikasi"""
-    total_replies = Message.objects.filter(reply_to_message_id__isnull=False).count()
-    total_messages = Message.objects.count()
+    """
+    Reply chain statistikasi
+
+    Message.reply_count / thread_depth / first_reply_at ingest paytida
+    yangilanadi, shuning uchun butun jadval bo'yicha annotate kerak emas.
+    Guruhlar bo'yicha: thread chuqurligi va birinchi javobgacha vaqt
+    (time-to-first-reply, boshqa user'ning javobi). Guruh ko'rsatkichlari
+    faqat tanlangan oraliqdagi xabarlar bo'yicha hisoblanadi
+    (?date_from= / ?date_to=, default oxirgi REPLY_STATS_DEFAULT_DAYS kun,
+    ko'pi bilan REPLY_STATS_MAX_DAYS kun). Ixtiyoriy filtr: ?group_id=
+    """
+    try:
+        until = _date_filter(request, "date_to") or timezone.localdate()
+        since = _date_filter(request, "date_from") or until - timedelta(
+            days=REPLY_STATS_DEFAULT_DAYS - 1
+        )
+        group_id = _group_filter(request)
+    except ValueError as e:
+        return Response({"status": "error", "message": str(e)}, status=400)
+
+    if since > until or (until - since).days >= REPLY_STATS_MAX_DAYS:
+        return Response(
+            {
+                "status": "error",
+                "message": "date_from must not be after date_to and the range "
+                f"must not exceed {REPLY_STATS_MAX_DAYS} days",
+            },
+            status=400,
+        )
+
+    messages = Message.objects.all()
+    if group_id is not None:
+        messages = messages.filter(group__telegram_id=group_id)
+
+    totals = messages.aggregate(
+        total_messages=Count("id"),
+        total_replies=Count("id", filter=Q(reply_to_message_id__isnull=False)),
+    )
+    total_replies = totals["total_replies"]
+    total_messages = totals["total_messages"]
 
-    # Eng ko'p reply olgan xabarlar
     top_replied = (
-        Message.objects.annotate(reply_count=Count("replies"))
-        .filter(reply_count__gt=0)
+        messages.filter(reply_count__gt=0)
+        .select_related("user")
         .order_by("-reply_count")[:10]
     )
 
@@ -284,8 +303,48 @@ def reply_chain_stats(request):
         for msg in top_replied
     ]
 
+    first_reply_delay = ExpressionWrapper(
+        F("first_reply_at") - F("telegram_created_at"), output_field=DurationField()
+    )
+    # (group, -telegram_created_at) / (-telegram_created_at) indekslari
+    window = messages.filter(
+        telegram_created_at__gte=_local_midnight(since),
+        telegram_created_at__lt=_local_midnight(until + timedelta(days=1)),
+    )
+    groups = (
+        window.values("group__telegram_id", "group__title")
+        .annotate(
+            threads=Count("id", filter=Q(reply_count__gt=0)),
+            replies=Count("id", filter=Q(reply_to__isnull=False)),
+            max_depth=Max("thread_depth"),
+            avg_depth=Avg("thread_depth", filter=Q(thread_depth__gt=0)),
+            avg_first_reply=Avg(first_reply_delay, filter=Q(reply_count__gt=0)),
+        )
+        .filter(threads__gt=0)
+        .order_by("-threads")
+    )
+
+    group_data = [
+        {
+            "group_id": row["group__telegram_id"],
+            "group_name": row["group__title"],
+            "threads": row["threads"],
+            "replies": row["replies"],
+            "max_thread_depth": row["max_depth"],
+            "avg_thread_depth": round(row["avg_depth"] or 0, 2),
+            "avg_first_reply_seconds": (
+                round(row["avg_first_reply"].total_seconds(), 1)
+                if row["avg_first_reply"] is not None
+                else None
+            ),
+        }
+        for row in groups
+    ]
+
     return Response(
         {
+            "date_from": since.isoformat(),
+            "date_to": until.isoformat(),
             "total_replies": total_replies,
             "reply_percentage": (
                 round((total_replies / total_messages * 100), 2)
@@ -293,42 +352,67 @@ def reply_chain_stats(request):
                 else 0
             ),
             "top_replied_messages": top_replied_data,
+            "groups": group_data,
         }
     )
 
 
 @api_view(["GET"])
-def user_profile(request, user_id):
-    """Individual user profil"""
+def response_time_stats(request):
+    """
+    Savollarga birinchi javob kechikishi (p50/p90/p99, soniyalarda)
+
+    Parametrlar: ?by=group|day|responder (default group), ?group_id=,
+    ?date_from=YYYY-MM-DD, ?date_to=YYYY-MM-DD
+    """
+    by = request.GET.get("by", "group")
+    if by not in RESPONSE_DIMENSIONS:
+        return Response(
+            {"error": f"by must be one of: {', '.join(RESPONSE_DIMENSIONS)}"},
+            status=400,
+        )
+
     try:
-        user = TelegramUser.objects.get(telegram_id=user_id)
-    except TelegramUser.DoesNotExist:
-        return Response({"error": "User not found"}, status=404)
+        filters = {
+            "group_id": _group_filter(request),
+            "since": _date_filter(request, "date_from"),
+            "until": _date_filter(request, "date_to"),
+        }
+    except ValueError as e:
+        return Response({"status": "error", "message": str(e)}, status=400)
 
-    # User statistikasi
-    total_messages = user.messages.count()
-    text_messages = user.messages.filter(media_type="text").count()
-    media_messages = total_messages - text_messages
+    data = latency_percentiles(by, **filters)
 
-    # Media types
-    media_stats = user.messages.values("media_type").annotate(count=Count("id"))
+    return Response({"by": by, "results": data})
 
-    # Questions asked (AI-detected)
-    questions = user.messages.filter(analysis__is_question=True).count()
 
-    # Sentiment
-    sentiments = (
-        user.messages.filter(sentiment__isnull=False)
-        .values("sentiment")
-        .annotate(count=Count("id"))
+@api_view(["GET"])
+def user_profile(request, user_id):
+    """
+    Individual user profil
+
+    UserStats/UserMediaStats'dan bitta so'rov: media turlari qatorlari
+    user va stats bilan JOIN qilinadi.
+    """
+    media_rows = list(
+        UserMediaStats.objects.filter(user__telegram_id=user_id, message_count__gt=0)
+        .select_related("user", "user__stats")
+        .order_by("-message_count")
     )
 
-    if not sentiments:
-        sentiments = (
-            MessageAnalysis.objects.filter(message__user=user, sentiment__isnull=False)
-            .values("sentiment")
-            .annotate(count=Count("id"))
-        )
+    if media_rows:
+        user = media_rows[0].user
+        stats = user.stats
+    else:
+        try:
+            user = TelegramUser.objects.get(telegram_id=user_id)
+        except TelegramUser.DoesNotExist:
+            return Response({"error": "User not found"}, status=404)
+        stats = UserStats(user=user)
+
+    media_counts = {row.media_type: row.message_count for row in media_rows}
+    total_messages = stats.message_count
+    text_messages = media_counts.get("text", 0)
 
     return Response(
         {
@@ -338,10 +422,19 @@ def user_profile(request, user_id):
             "first_name": user.first_name,
             "total_messages": total_messages,
             "text_messages": text_messages,
-            "media_messages": media_messages,
-            "media_distribution": list(media_stats),
-            "questions_asked": questions,
-            "sentiment_distribution": list(sentiments),
+            "media_messages": total_messages - text_messages,
+            "media_distribution": [
+                {"media_type": media_type, "count": count}
+                for media_type, count in media_counts.items()
+            ],
+            "questions_asked": stats.question_count,
+            "sentiment_distribution": [
+                {"sentiment": sentiment, "count": getattr(stats, field)}
+                for sentiment, field in SENTIMENT_COUNTERS.items()
+                if getattr(stats, field)
+            ],
+            "first_seen_at": stats.first_seen_at,
+            "last_seen_at": stats.last_seen_at,
         }
     )
 
@@ -383,6 +476,8 @@ def ai_sentiment_analysis(request):
 
         # Build results
         results = []
+        rollups = RollupBatch()
+        user_stats = UserStatsBatch()
         for msg, analyzed_msg in zip(messages, analyzed):
             sentiment = analyzed_msg.get("sentiment", "neutral")
             score = (
@@ -404,9 +499,14 @@ def ai_sentiment_analysis(request):
 
             # ✅ Save sentiment back to Message model
             if msg.sentiment != sentiment:
+                rollups.add_sentiment_change(msg, msg.sentiment, sentiment)
+                user_stats.add_sentiment_change(msg, msg.sentiment, sentiment)
                 msg.sentiment = sentiment
                 msg.save(update_fields=["sentiment"])
 
+        rollups.flush()
+        user_stats.flush()
+
         # Calculate stats
         positive = sum(1 for r in results if r["sentiment"] == "positive")
         negative = sum(1 for r in results if r["sentiment"] == "negative")
@@ -747,5 +847,7 @@ def ai_status(request):
             "gemini_available": status["available"],
             "api_key_configured": status["api_key_configured"],
             "model": status["model"],
+            "cache": status["cache"],
+            "client": status["client"],
         }
     )
@@ -153,3 +153,49 @@ CORS_ALLOW_CREDENTIALS = True
 # Telegram Bot Settings
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL", "")
+
+# AI analysis queue (analytics.tasks)
+ANALYSIS_QUEUE_BATCH_SIZE = int(os.getenv("ANALYSIS_QUEUE_BATCH_SIZE", "20"))
+ANALYSIS_QUEUE_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_QUEUE_MAX_ATTEMPTS", "5"))
+ANALYSIS_QUEUE_RETRY_DELAY = int(os.getenv("ANALYSIS_QUEUE_RETRY_DELAY", "30"))
+ANALYSIS_QUEUE_LOCK_TIMEOUT = int(os.getenv("ANALYSIS_QUEUE_LOCK_TIMEOUT", "300"))
+ANALYSIS_QUEUE_POLL_INTERVAL = float(os.getenv("ANALYSIS_QUEUE_POLL_INTERVAL", "2"))
+
+# Gemini client limits (analytics.gemini_ai)
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
+GEMINI_TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "250000"))
+# Seconds one API request may take (timeouts are retried like 5xx errors)
+GEMINI_REQUEST_TIMEOUT = float(os.getenv("GEMINI_REQUEST_TIMEOUT", "60"))
+# Seconds one request may take with its retries (rate-limit waits not counted)
+GEMINI_CALL_TIMEOUT = float(os.getenv("GEMINI_CALL_TIMEOUT", "900"))
+
+# Gemini analysis result cache (analytics.ai_cache)
+ANALYSIS_CACHE_LRU_SIZE = int(os.getenv("ANALYSIS_CACHE_LRU_SIZE", "5000"))
+ANALYSIS_CACHE_TTL_DAYS = int(os.getenv("ANALYSIS_CACHE_TTL_DAYS", "30"))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "200000"))
+
+# Bot -> backend batch ingestion (telegram_bot.ingest)
+TELEGRAM_INGEST_MAX_BATCH_SIZE = int(os.getenv("TELEGRAM_INGEST_MAX_BATCH_SIZE", "500"))
+
+# Ingest identity cache: telegram_id -> (pk, fingerprint) (telegram_bot.identity_cache)
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))
+IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", "300"))
+
+# Overview snapshot cache (analytics.overview)
+STATS_OVERVIEW_CACHE_TTL = int(os.getenv("STATS_OVERVIEW_CACHE_TTL", "300"))
+
+# Telegram media proxy: bytes per streamed chunk (bounds memory per request)
+MEDIA_PROXY_CHUNK_SIZE = int(os.getenv("MEDIA_PROXY_CHUNK_SIZE", str(64 * 1024)))
+
+# Media offload (core.media_serving): "" - Django streams the file,
+# "accel" - nginx X-Accel-Redirect, "sendfile" - X-Sendfile (Apache/lighttpd)
+MEDIA_OFFLOAD_MODE = os.getenv("MEDIA_OFFLOAD_MODE", "")
+# nginx `internal` location aliased to MEDIA_ROOT (accel mode)
+MEDIA_OFFLOAD_PREFIX = os.getenv("MEDIA_OFFLOAD_PREFIX", "/protected-media/")
+
+# Telegram getFile resolver (telegram_bot.telegram_files): file paths are
+# valid ~1 hour, so cache them a bit less than that
+TELEGRAM_FILE_CACHE_TTL = int(os.getenv("TELEGRAM_FILE_CACHE_TTL", "3300"))
+TELEGRAM_FILE_CACHE_SIZE = int(os.getenv("TELEGRAM_FILE_CACHE_SIZE", "5000"))
+TELEGRAM_HTTP_POOL_SIZE = int(os.getenv("TELEGRAM_HTTP_POOL_SIZE", "10"))
@@ -1,18 +1,33 @@
 # backend/config/urls.py
 
+import re
+
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, re_path
 
 from analytics import views as analytics_views
 from analytics.views import ai_insights, ai_sentiment_analysis
+from core.views import serve_media
 from telegram_bot.message_views import MessageViewSet
 from telegram_bot.views import proxy_telegram_file  # ✅ ADD THIS
-from telegram_bot.views import (bulk_mark_deleted, get_message_history,
-                                get_telegram_file, get_telegram_media_url,
-                                group_comparison, mark_message_deleted,
-                                telegram_webhook, test_telegram_file)
+from telegram_bot.views import (
+    bulk_mark_deleted,
+    get_media_blob,
+    get_message_history,
+    get_telegram_file,
+    get_telegram_media_url,
+    group_comparison,
+    group_typeahead,
+    ingest_stats,
+    mark_message_deleted,
+    telegram_webhook,
+    telegram_webhook_batch,
+    test_telegram_file,
+    update_message_media,
+    user_typeahead,
+)
 
 # ViewSet views
 message_list_view = MessageViewSet.as_view({"get": "list"})
@@ -21,6 +36,20 @@ message_detail_view = MessageViewSet.as_view({"get": "retrieve"})
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/telegram/webhook/", telegram_webhook, name="telegram-webhook"),
+    path(
+        "api/telegram/webhook/batch/",
+        telegram_webhook_batch,
+        name="telegram-webhook-batch",
+    ),
+    path("api/telegram/users/search/", user_typeahead, name="user-typeahead"),
+    path("api/telegram/groups/search/", group_typeahead, name="group-typeahead"),
+    path("api/telegram/ingest-stats/", ingest_stats, name="ingest-stats"),
+    path("api/telegram/media/", update_message_media, name="telegram-media"),
+    path(
+        "api/telegram/media/blobs/<str:file_unique_id>/",
+        get_media_blob,
+        name="telegram-media-blob",
+    ),
     # Messages
     path("api/messages/", message_list_view, name="message-list"),
     path("api/messages/<int:message_id>/", message_detail_view, name="message-detail"),
@@ -82,6 +111,11 @@ urlpatterns = [
     path(
         "api/stats/reply-chain/", analytics_views.reply_chain_stats, name="reply-chain"
     ),
+    path(
+        "api/stats/response-times/",
+        analytics_views.response_time_stats,
+        name="response-times",
+    ),
     path(
         "api/stats/user/<int:user_id>/",
         analytics_views.user_profile,
@@ -93,7 +127,14 @@ urlpatterns = [
     path("api/ai/insights/", ai_insights, name="ai_insights"),
 ]
 
-# Serve media files
+# Serve media files (offload rejimida production'da ham - baytlarni nginx beradi)
+if settings.DEBUG or settings.MEDIA_OFFLOAD_MODE:
+    urlpatterns += [
+        re_path(
+            rf"^{re.escape(settings.MEDIA_URL.lstrip('/'))}(?P<path>.*)$",
+            serve_media,
+            name="media",
+        )
+    ]
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
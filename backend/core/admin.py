@@ -1,11 +1,43 @@
 from django.contrib import admin
 
-from .models import (Message, MessageAnalysis, MessageHistory, TelegramGroup,
-                     TelegramUser)
+from telegram_bot.identity_cache import group_identity_cache, user_identity_cache
+
+from .models import (
+    MediaBlob,
+    Message,
+    MessageAnalysis,
+    MessageHistory,
+    TelegramGroup,
+    TelegramUser,
+)
+
+
+class IdentityCacheInvalidationMixin:
+    """Admin'dagi o'zgarishlardan keyin ingest identity cache'ini tozalash"""
+
+    identity_cache = None
+
+    def _invalidate(self, telegram_ids):
+        self.identity_cache.invalidate([tid for tid in telegram_ids if tid])
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # telegram_id o'zgargan bo'lsa eski qiymat ham tozalanadi
+        self._invalidate([obj.telegram_id, form.initial.get("telegram_id")])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self._invalidate([obj.telegram_id])
+
+    def delete_queryset(self, request, queryset):
+        telegram_ids = list(queryset.values_list("telegram_id", flat=True))
+        super().delete_queryset(request, queryset)
+        self._invalidate(telegram_ids)
 
 
 @admin.register(TelegramUser)
-class TelegramUserAdmin(admin.ModelAdmin):
+class TelegramUserAdmin(IdentityCacheInvalidationMixin, admin.ModelAdmin):
+    identity_cache = user_identity_cache
     list_display = [
         "telegram_id",
         "username",
@@ -20,13 +52,29 @@ class TelegramUserAdmin(admin.ModelAdmin):
 
 
 @admin.register(TelegramGroup)
-class TelegramGroupAdmin(admin.ModelAdmin):
+class TelegramGroupAdmin(IdentityCacheInvalidationMixin, admin.ModelAdmin):
+    identity_cache = group_identity_cache
     list_display = ["telegram_id", "title", "username", "member_count", "created_at"]
     list_filter = ["created_at"]
     search_fields = ["telegram_id", "title", "username"]
     ordering = ["-created_at"]
 
 
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = [
+        "file_unique_id",
+        "file_name",
+        "file_size",
+        "ref_count",
+        "created_at",
+    ]
+    list_filter = ["created_at"]
+    search_fields = ["file_unique_id", "sha256", "file_name"]
+    ordering = ["-created_at"]
+    readonly_fields = ["ref_count"]
+
+
 class MessageHistoryInline(admin.TabularInline):
     model = MessageHistory
     extra = 0
@@ -55,7 +103,7 @@ class MessageAdmin(admin.ModelAdmin):
     ]
     search_fields = ["message_id", "text", "user__username"]
     ordering = ["-telegram_created_at"]
-    raw_id_fields = ["user", "group", "reply_to"]
+    raw_id_fields = ["user", "group", "reply_to", "media_blob"]
     inlines = [MessageHistoryInline]
 
     def text_preview(self, obj):
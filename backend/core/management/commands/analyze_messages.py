@@ -1,12 +1,18 @@
 # backend/core/management/commands/analyze_messages.py
 # Django management command to analyze all messages with AI
 
+import time
+
 from django.core.management.base import BaseCommand
-from django.db.models import Q
+from django.db import transaction
 
-from analytics.gemini_ai import analyze_sentiment_batch
+from analytics.gemini_ai import analyze_messages_batch, gemini_client
+from analytics.models import AnalysisJob, BackfillCheckpoint
+from analytics.tasks import apply_analyses
 from core.models import Message
 
+CHECKPOINT_NAME = "analyze_messages"
+
 
 class Command(BaseCommand):
     help = "Analyze all messages with AI (sentiment, topics, etc.)"
@@ -16,7 +22,13 @@ class Command(BaseCommand):
             "--batch-size",
             type=int,
             default=50,
-            help="Number of messages to process at once",
+            help="Number of messages sent in one API call",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of batches submitted concurrently per round",
         )
         parser.add_argument(
             "--limit",
@@ -24,24 +36,40 @@ class Command(BaseCommand):
             default=None,
             help="Maximum number of messages to process (default: all)",
         )
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Ignore the saved checkpoint and start from the first message",
+        )
 
     def handle(self, *args, **options):
         batch_size = options["batch_size"]
+        workers = max(1, options["workers"])
         limit = options["limit"]
 
-        # Get messages that haven't been analyzed yet
+        checkpoint, _ = BackfillCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+        if options["reset"]:
+            self._reset_checkpoint(checkpoint)
+
+        # Messages that haven't been analyzed yet, walked by primary key
         messages = (
-            Message.objects.filter(Q(sentiment__isnull=True) | Q(sentiment=""))
+            Message.objects.filter(ai_processed=False)
             .exclude(text__isnull=True)
             .exclude(text="")
-            .order_by("-telegram_created_at")
         )
 
+        total = messages.filter(pk__gt=checkpoint.last_pk).count()
+        if total == 0 and checkpoint.last_pk:
+            # Nothing after the checkpoint: the previous run finished, start
+            # over for messages reset since then (e.g. failed queue jobs)
+            self._reset_checkpoint(checkpoint)
+            total = messages.count()
         if limit:
-            messages = messages[:limit]
+            total = min(total, limit)
 
-        total = messages.count()
-        self.stdout.write(f"📊 Found {total} messages to analyze")
+        self.stdout.write(
+            f"📊 Found {total} messages to analyze (resuming after pk={checkpoint.last_pk})"
+        )
 
         if total == 0:
             self.stdout.write(self.style.SUCCESS("✅ All messages already analyzed!"))
@@ -49,39 +77,107 @@ class Command(BaseCommand):
 
         processed = 0
         updated = 0
-
-        # Process in batches
-        for i in range(0, total, batch_size):
-            batch = messages[i : i + batch_size]
-            texts = [msg.text for msg in batch if msg.text]
-
-            self.stdout.write(
-                f"🔄 Processing batch {i//batch_size + 1}/{(total-1)//batch_size + 1}..."
+        started_at = time.monotonic()
+        api_calls_at_start = gemini_client.api_calls
+
+        while processed < total:
+            window_size = min(batch_size * workers, total - processed)
+            batch = list(
+                messages.filter(pk__gt=checkpoint.last_pk)
+                .order_by("pk")
+                .only(
+                    "id",
+                    "message_id",
+                    "text",
+                    "group_id",
+                    "user_id",
+                    "media_type",
+                    "sentiment",
+                    "telegram_created_at",
+                )[:window_size]
             )
+            if not batch:
+                break
 
             try:
-                # Analyze sentiments
-                sentiments = analyze_sentiment_batch(texts)
-
-                # Update messages
-                for msg, sentiment in zip(batch, sentiments):
-                    if sentiment and sentiment != "neutral":
-                        msg.sentiment = sentiment
-                        msg.save(update_fields=["sentiment"])
-                        updated += 1
-                    processed += 1
-
-                self.stdout.write(f"✅ Processed {processed}/{total} messages")
+                # All batches of this round are submitted concurrently
+                analyses = analyze_messages_batch(
+                    [msg.text for msg in batch], batch_size=batch_size
+                )
+
+                # Failed analyses are not stored; the run stops before the
+                # first failed message so a rerun retries it
+                failed_at = next(
+                    (idx for idx, a in enumerate(analyses) if a is None), None
+                )
+                if failed_at is not None:
+                    batch = batch[:failed_at]
+                    analyses = analyses[:failed_at]
+
+                if batch:
+                    with transaction.atomic():
+                        apply_analyses(batch, analyses)
+                        AnalysisJob.objects.filter(
+                            message_id__in=[msg.pk for msg in batch],
+                            status=AnalysisJob.STATUS_PENDING,
+                        ).update(status=AnalysisJob.STATUS_DONE)
+
+                        checkpoint.last_pk = batch[-1].pk
+                        checkpoint.processed += len(batch)
+                        checkpoint.save(
+                            update_fields=["last_pk", "processed", "updated_at"]
+                        )
 
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f"❌ Error processing batch: {e}"))
-                continue
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"ℹ️  Checkpoint kept at pk={checkpoint.last_pk}, rerun to resume"
+                    )
+                )
+                return
+
+            processed += len(batch)
+            updated += sum(1 for a in analyses if a["sentiment"] != "neutral")
+            self._report_progress(processed, total, started_at, api_calls_at_start)
+
+            if failed_at is not None:
+                self.stdout.write(
+                    self.style.ERROR("❌ AI analysis failed (Gemini unavailable?)")
+                )
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"ℹ️  Checkpoint kept at pk={checkpoint.last_pk}, rerun to resume"
+                    )
+                )
+                return
+
+        # The checkpoint only resumes interrupted runs: once the end is
+        # reached the next run starts from the first unanalyzed message
+        if not messages.filter(pk__gt=checkpoint.last_pk).exists():
+            self._reset_checkpoint(checkpoint)
 
         self.stdout.write(
             self.style.SUCCESS(f"🎉 Done! Updated {updated}/{processed} messages")
         )
         self.stdout.write(
-            self.style.WARNING(
-                f"ℹ️  {processed - updated} messages were neutral or failed"
-            )
+            self.style.WARNING(f"ℹ️  {processed - updated} messages were neutral")
+        )
+
+    def _reset_checkpoint(self, checkpoint):
+        checkpoint.last_pk = 0
+        checkpoint.processed = 0
+        checkpoint.save()
+
+    def _report_progress(self, processed, total, started_at, api_calls_at_start):
+        """Throughput: msgs/s, API calls/s va ETA"""
+        elapsed = max(time.monotonic() - started_at, 1e-6)
+        msgs_per_sec = processed / elapsed
+        calls_per_sec = (gemini_client.api_calls - api_calls_at_start) / elapsed
+        eta = (total - processed) / msgs_per_sec if msgs_per_sec else 0
+
+        self.stdout.write(
+            f"✅ Processed {processed}/{total} messages | "
+            f"{msgs_per_sec:.1f} msgs/s | {calls_per_sec:.2f} API calls/s | "
+            f"ETA {int(eta // 60)}m {int(eta % 60)}s"
         )
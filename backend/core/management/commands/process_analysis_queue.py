@@ -0,0 +1,69 @@
+# backend/core/management/commands/process_analysis_queue.py
+# Worker that drains the AI analysis queue (analytics.tasks)
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from analytics.tasks import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Process queued AI analysis jobs (sentiment, topics, intent)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.ANALYSIS_QUEUE_BATCH_SIZE,
+            help="Number of jobs to claim at once",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=settings.ANALYSIS_QUEUE_POLL_INTERVAL,
+            help="Seconds to wait when the queue is empty",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the queue once and exit instead of polling forever",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        sleep_seconds = options["sleep"]
+        once = options["once"]
+
+        self.stdout.write(f"🚀 Analysis worker started (batch size: {batch_size})")
+
+        total_processed = 0
+        total_failed = 0
+
+        try:
+            while True:
+                processed, failed = run_pending_jobs(batch_size)
+                total_processed += processed
+                total_failed += failed
+
+                if processed or failed:
+                    self.stdout.write(
+                        f"✅ Processed {processed} jobs, {failed} failed "
+                        f"(total: {total_processed}/{total_failed})"
+                    )
+                    continue
+
+                if once:
+                    break
+
+                time.sleep(sleep_seconds)
+
+        except KeyboardInterrupt:
+            self.stdout.write("\n👋 Worker stopped by user")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"🎉 Done! Processed {total_processed} jobs, {total_failed} failed"
+            )
+        )
@@ -0,0 +1,28 @@
+# backend/core/management/commands/prune_media_blobs.py
+# Hech bir xabar ishlatmayotgan media blob'larni o'chirish
+
+from django.core.management.base import BaseCommand
+
+from core.media_store import prune_blobs
+
+
+class Command(BaseCommand):
+    help = "Delete media blobs that are no longer referenced by any message"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report what would be deleted",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        deleted, freed = prune_blobs(dry_run=dry_run)
+
+        prefix = "Would delete" if dry_run else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"🧹 {prefix} {deleted} blobs ({freed / 1024 / 1024:.1f} MB)"
+            )
+        )
@@ -0,0 +1,25 @@
+# backend/core/management/commands/rebuild_question_responses.py
+# QuestionResponse jadvalini messages va message_analysis'dan qayta hisoblash
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.responses import rebuild_question_responses
+
+
+class Command(BaseCommand):
+    help = "Rebuild question first-reply latency rows from messages and analyses"
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Rebuilding question responses...")
+        started_at = time.monotonic()
+
+        written = rebuild_question_responses()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {written} questions indexed in "
+                f"{time.monotonic() - started_at:.1f}s"
+            )
+        )
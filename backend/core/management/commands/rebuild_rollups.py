@@ -0,0 +1,25 @@
+# backend/core/management/commands/rebuild_rollups.py
+# MessageRollup jadvalini messages jadvalidan qayta hisoblash
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild hourly/daily message rollups from the messages table"
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Rebuilding message rollups...")
+        started_at = time.monotonic()
+
+        written = rebuild_rollups()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {written} rollup rows written in "
+                f"{time.monotonic() - started_at:.1f}s"
+            )
+        )
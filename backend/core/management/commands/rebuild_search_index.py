@@ -0,0 +1,37 @@
+# backend/core/management/commands/rebuild_search_index.py
+# Xabarlar full-text qidiruv indeksini qayta qurish
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.search import rebuild_search_index, search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for message text"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database", default="default", help="Database alias (default: default)"
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Rebuilding search index...")
+        started_at = time.monotonic()
+
+        if not rebuild_search_index(options["database"]):
+            self.stdout.write(
+                self.style.WARNING(
+                    "⚠️ Full-text search is not available on this database "
+                    "(search falls back to icontains)"
+                )
+            )
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {search_backend(options['database'])} index rebuilt in "
+                f"{time.monotonic() - started_at:.1f}s"
+            )
+        )
@@ -0,0 +1,25 @@
+# backend/core/management/commands/rebuild_term_frequencies.py
+# TermFrequency jadvalini messages va message_analysis'dan qayta hisoblash
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.terms import rebuild_term_frequencies
+
+
+class Command(BaseCommand):
+    help = "Rebuild the word/keyword frequency index from messages and analyses"
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Rebuilding term frequencies...")
+        started_at = time.monotonic()
+
+        written = rebuild_term_frequencies()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {written} term rows written in "
+                f"{time.monotonic() - started_at:.1f}s"
+            )
+        )
@@ -0,0 +1,25 @@
+# backend/core/management/commands/rebuild_user_stats.py
+# UserStats va UserMediaStats jadvallarini messages va message_analysis'dan qayta hisoblash
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.user_stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild per-user message statistics from messages and analyses"
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Rebuilding user stats...")
+        started_at = time.monotonic()
+
+        written = rebuild_user_stats()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {written} users indexed in "
+                f"{time.monotonic() - started_at:.1f}s"
+            )
+        )
@@ -0,0 +1,89 @@
+# backend/core/management/commands/sync_media.py
+# Lokal fayli yo'q media xabarlarni Telegram'dan yuklab olish va
+# local_file_present flag'ini fayl tizimi bilan solishtirish
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from telegram_bot.media_sync import sync_missing_media, verify_local_files
+
+
+class Command(BaseCommand):
+    help = "Download media files missing locally and verify stored files"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Concurrent downloads",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=5.0,
+            help="Maximum downloads started per second (all workers)",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Maximum number of files to process (default: all)",
+        )
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Re-check local_file_present against the filesystem first",
+        )
+        parser.add_argument(
+            "--verify-only",
+            action="store_true",
+            help="Only verify, do not download",
+        )
+
+    def handle(self, *args, **options):
+        started_at = time.monotonic()
+
+        if options["verify"] or options["verify_only"]:
+            self.stdout.write("🔄 Verifying local media files...")
+            stats = verify_local_files()
+            self.stdout.write(
+                f"🔎 Checked {stats['checked']} | flagged {stats['set']} | "
+                f"missing {stats['cleared']}"
+            )
+            if options["verify_only"]:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"✅ Verified in {time.monotonic() - started_at:.1f}s"
+                    )
+                )
+                return
+
+        if not settings.TELEGRAM_BOT_TOKEN:
+            raise CommandError("TELEGRAM_BOT_TOKEN not configured")
+
+        self.stdout.write("🔄 Downloading missing media...")
+        stats = sync_missing_media(
+            workers=options["workers"],
+            rate=options["rate"],
+            limit=options["limit"],
+            progress=self._report_progress,
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {stats['downloaded']} downloaded "
+                f"({stats['bytes'] / 1024 / 1024:.1f} MB), {stats['reused']} reused, "
+                f"{stats['failed']} failed, {stats['skipped']} skipped, "
+                f"{stats['messages']} messages updated in "
+                f"{time.monotonic() - started_at:.1f}s"
+            )
+        )
+
+    def _report_progress(self, stats):
+        self.stdout.write(
+            f"📥 {stats['downloaded']} downloaded | {stats['reused']} reused | "
+            f"{stats['failed']} failed"
+        )
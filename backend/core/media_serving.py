@@ -0,0 +1,249 @@
+"""
+HTTP responses for locally stored media files.
+
+`serve_media_file` adds what browsers need to cache and seek media:
+- a strong ETag (blob sha256, else Telegram file_unique_id, else size+mtime)
+- Last-Modified and Accept-Ranges headers
+- 304 responses for If-None-Match / If-Modified-Since
+- 206 responses for a single `bytes=` range, honouring If-Range
+
+Multi-range requests get the full file (200), which RFC 9110 allows.
+
+With MEDIA_OFFLOAD_MODE set, the view only resolves the path and answers
+conditional requests; the bytes (and ranges) are sent by the front proxy:
+"accel" returns X-Accel-Redirect: MEDIA_OFFLOAD_PREFIX + path relative to
+MEDIA_ROOT (nginx `internal` location), "sendfile" returns X-Sendfile with
+the absolute path (Apache mod_xsendfile, lighttpd). Files outside
+MEDIA_ROOT are always served by Django in accel mode.
+
+nginx example:
+    location /protected-media/ {
+        internal;
+        alias /app/backend/media/;
+    }
+"""
+
+import os
+from typing import Optional
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import (
+    content_disposition_header,
+    http_date,
+    parse_etags,
+    parse_http_date_safe,
+    quote_etag,
+)
+
+from core.models import Message
+
+# Bytes read per chunk for range responses
+RANGE_CHUNK_SIZE = 64 * 1024
+
+MEDIA_CONTENT_TYPES = {
+    "photo": "image/jpeg",
+    "video": "video/mp4",
+    "voice": "audio/ogg",
+    "audio": "audio/mpeg",
+    "document": "application/octet-stream",
+    "sticker": "image/webp",
+    "animation": "video/mp4",
+    "video_note": "video/mp4",
+}
+
+# Browsers only expose these to cross-origin players if listed
+EXPOSED_HEADERS = "Accept-Ranges, Content-Length, Content-Range, ETag, Last-Modified"
+
+
+OFFLOAD_ACCEL = "accel"
+OFFLOAD_SENDFILE = "sendfile"
+
+
+def offload_headers(file_path: str) -> Optional[dict]:
+    """
+    Front proxy headers that hand the transfer off (MEDIA_OFFLOAD_MODE).
+
+    Returns:
+        Optional[dict]: Headers to send, or None if Django serves the file
+    """
+    mode = settings.MEDIA_OFFLOAD_MODE
+    if not mode:
+        return None
+
+    if mode == OFFLOAD_SENDFILE:
+        return {"X-Sendfile": os.path.abspath(file_path)}
+
+    if mode == OFFLOAD_ACCEL:
+        media_root = os.path.abspath(settings.MEDIA_ROOT)
+        file_path = os.path.abspath(file_path)
+        if os.path.commonpath([media_root, file_path]) != media_root:
+            return None
+        relative_path = os.path.relpath(file_path, media_root).replace(os.sep, "/")
+        prefix = settings.MEDIA_OFFLOAD_PREFIX.rstrip("/")
+        return {"X-Accel-Redirect": f"{prefix}/{quote(relative_path)}"}
+
+    raise ImproperlyConfigured(
+        f"MEDIA_OFFLOAD_MODE must be '', '{OFFLOAD_ACCEL}' or "
+        f"'{OFFLOAD_SENDFILE}', got {mode!r}"
+    )
+
+
+def media_content_type(message: Message) -> str:
+    """Content-Type for a message's file."""
+    return MEDIA_CONTENT_TYPES.get(message.media_type, "application/octet-stream")
+
+
+def media_etag(message: Optional[Message], stat: os.stat_result) -> str:
+    """Strong ETag: content hash, Telegram file_unique_id or size+mtime."""
+    if message is not None:
+        if message.media_blob_id and message.media_blob.sha256:
+            return quote_etag(message.media_blob.sha256)
+        if message.media_file_unique_id:
+            return quote_etag(message.media_file_unique_id)
+    return quote_etag(f"{stat.st_size:x}-{int(stat.st_mtime):x}")
+
+
+def parse_range(header: str, size: int):
+    """
+    Parse a single `bytes=` range.
+
+    Returns:
+        Optional[tuple]: (start, end) inclusive, None to serve the whole file,
+        or False if the range is not satisfiable
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    start, sep, end = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if start:
+            start = int(start)
+            end = int(end) if end else size - 1
+        else:
+            # bytes=-N: last N bytes
+            length = int(end)
+            if length <= 0:
+                return False
+            start, end = max(size - length, 0), size - 1
+    except ValueError:
+        return None
+
+    if start > end or start >= size:
+        return False
+    return start, min(end, size - 1)
+
+
+def _not_modified(request, etag: str, mtime: int) -> bool:
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        # Weak comparison (RFC 9110 13.1.2): W/"x" matches "x"
+        etags = [
+            tag[2:] if tag.startswith("W/") else tag
+            for tag in parse_etags(if_none_match)
+        ]
+        return "*" in etags or etag in etags
+
+    if_modified_since = parse_http_date_safe(
+        request.headers.get("If-Modified-Since", "")
+    )
+    return if_modified_since is not None and mtime <= if_modified_since
+
+
+def _range_applies(request, etag: str, mtime: int) -> bool:
+    """If-Range: range only if the client's copy is still current."""
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    if_range_date = parse_http_date_safe(if_range)
+    return if_range_date is not None and mtime <= if_range_date
+
+
+def _read_range(file_path: str, start: int, length: int):
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(RANGE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_media_file(
+    request,
+    file_path: str,
+    message: Optional[Message] = None,
+    content_type: Optional[str] = None,
+    file_name: Optional[str] = None,
+    as_attachment: bool = False,
+) -> HttpResponse:
+    """
+    Serve a local file with Range, ETag and conditional GET support.
+
+    Args:
+        request: Incoming request (Range / If-* headers)
+        file_path: Absolute path of an existing file
+        message: Message the file belongs to (ETag, Content-Type)
+        content_type: Overrides the media type based Content-Type
+        file_name: Download name (defaults to the file's basename)
+        as_attachment: Content-Disposition attachment instead of inline
+    """
+    stat = os.stat(file_path)
+    size = stat.st_size
+    mtime = int(stat.st_mtime)
+    etag = media_etag(message, stat)
+    if content_type is None:
+        content_type = (
+            media_content_type(message) if message else "application/octet-stream"
+        )
+
+    file_name = file_name or os.path.basename(file_path)
+    offload = offload_headers(file_path)
+
+    if _not_modified(request, etag, mtime):
+        response = HttpResponse(status=304)
+    elif offload:
+        # The front proxy sends the body, Content-Length and ranges
+        response = HttpResponse(content_type=content_type)
+        for header, value in offload.items():
+            response[header] = value
+    else:
+        byte_range = None
+        range_header = request.headers.get("Range")
+        if range_header and _range_applies(request, etag, mtime):
+            byte_range = parse_range(range_header, size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+        elif byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                _read_range(file_path, start, length),
+                status=206,
+                content_type=content_type,
+            )
+            response["Content-Length"] = length
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        else:
+            response = FileResponse(open(file_path, "rb"), content_type=content_type)
+
+    if response.status_code in (200, 206):
+        response["Content-Disposition"] = content_disposition_header(
+            as_attachment, file_name
+        )
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(mtime)
+    response["Accept-Ranges"] = "bytes"
+    response["Access-Control-Expose-Headers"] = EXPOSED_HEADERS
+    return response
@@ -0,0 +1,331 @@
+"""
+Content-addressed media store.
+
+Telegram gives every file a stable `file_unique_id`, so the bot stores each
+distinct file once under MEDIA_ROOT/telegram/blobs/<2 chars>/<file_unique_id>
+and messages point to the shared MediaBlob row. Blobs are reference counted:
+attaching a message increments the count, deleting or re-pointing it
+decrements it, and unreferenced blobs are removed by `prune_media_blobs`.
+A sha256 of the content is stored as well, so the same bytes uploaded under
+another file_unique_id reuse the existing file.
+
+Files proxied from Telegram are teed into the store with `BlobWriter`
+while they stream to the client. `Message.local_file_present` records
+whether a message's file is on disk, so serving code only touches the
+filesystem for files that exist; `python manage.py sync_media` downloads
+missing files and re-checks the flag.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from core.models import MediaBlob, Message
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = "telegram/blobs"
+
+
+def blob_relative_path(file_unique_id: str) -> str:
+    """
+    Path of a blob relative to MEDIA_ROOT.
+
+    The bot computes the same path, so it can tell whether a file is
+    already stored without asking the backend.
+    """
+    return f"{BLOB_DIR}/{file_unique_id[:2]}/{file_unique_id}"
+
+
+def absolute_path(relative_path: str) -> str:
+    """Absolute path of a file stored relative to MEDIA_ROOT."""
+    if os.path.isabs(relative_path):
+        return relative_path
+    return os.path.join(settings.MEDIA_ROOT, relative_path)
+
+
+def register_blob(
+    file_unique_id: str,
+    file_path: str,
+    file_name: Optional[str] = None,
+    file_size: Optional[int] = None,
+    sha256: Optional[str] = None,
+    mime_type: Optional[str] = None,
+) -> MediaBlob:
+    """
+    Get or create the blob for a downloaded file.
+
+    If the content hash matches a blob stored under another file_unique_id,
+    the new row points to that file and the duplicate copy is removed.
+
+    Returns:
+        MediaBlob: Blob row (ref_count not changed)
+    """
+    blob = MediaBlob.objects.filter(file_unique_id=file_unique_id).first()
+    if blob is not None:
+        updates = {}
+        if sha256 and not blob.sha256:
+            updates["sha256"] = sha256
+        if file_size and not blob.file_size:
+            updates["file_size"] = file_size
+        if updates:
+            MediaBlob.objects.filter(pk=blob.pk).update(**updates)
+            for field, value in updates.items():
+                setattr(blob, field, value)
+        return blob
+
+    if sha256:
+        same_content = (
+            MediaBlob.objects.filter(sha256=sha256).exclude(file_path=file_path).first()
+        )
+        if same_content is not None:
+            _remove_file(file_path)
+            file_path = same_content.file_path
+
+    blob, _ = MediaBlob.objects.get_or_create(
+        file_unique_id=file_unique_id,
+        defaults={
+            "file_path": file_path,
+            "file_name": file_name,
+            "file_size": file_size,
+            "sha256": sha256,
+            "mime_type": mime_type,
+        },
+    )
+    return blob
+
+
+def attach_blob(messages: Iterable[Message], blob: MediaBlob) -> int:
+    """
+    Point messages to a blob and update reference counts.
+
+    Messages already attached to `blob` are left alone; messages attached to
+    another blob release it.
+
+    Returns:
+        int: Number of messages newly attached
+    """
+    to_attach = [message for message in messages if message.media_blob_id != blob.pk]
+    if not to_attach:
+        return 0
+
+    released = [m.media_blob_id for m in to_attach if m.media_blob_id is not None]
+
+    with transaction.atomic():
+        Message.objects.filter(pk__in=[m.pk for m in to_attach]).update(
+            media_blob=blob,
+            media_file_path=blob.file_path,
+            media_file_name=blob.file_name,
+            local_file_present=True,
+        )
+        MediaBlob.objects.filter(pk=blob.pk).update(
+            ref_count=F("ref_count") + len(to_attach)
+        )
+        release_blobs(released)
+
+    for message in to_attach:
+        message.media_blob = blob
+        message.media_file_path = blob.file_path
+        message.media_file_name = blob.file_name
+        message.local_file_present = True
+
+    return len(to_attach)
+
+
+def release_blobs(blob_ids: List[int]) -> None:
+    """Decrement reference counts (one per id occurrence)."""
+    counts = {}
+    for blob_id in blob_ids:
+        counts[blob_id] = counts.get(blob_id, 0) + 1
+
+    for blob_id, count in counts.items():
+        MediaBlob.objects.filter(pk=blob_id, ref_count__gte=count).update(
+            ref_count=F("ref_count") - count
+        )
+
+
+def resolve_media_path(message: Message) -> Optional[str]:
+    """
+    Absolute path of a message's file, preferring the shared blob.
+
+    Messages without `local_file_present` return None without touching the
+    filesystem. A flagged file that turns out to be gone clears the flag
+    (`sync_media` downloads it again).
+
+    Returns:
+        Optional[str]: Existing file path or None
+    """
+    if not message.local_file_present:
+        return None
+
+    candidates = []
+    if message.media_blob_id:
+        candidates.append(message.media_blob.file_path)
+    if message.media_file_path:
+        candidates.append(message.media_file_path)
+
+    for relative_path in candidates:
+        file_path = absolute_path(relative_path)
+        if os.path.exists(file_path):
+            return file_path
+
+    logger.warning(f"⚠️ Media file missing for message {message.pk}")
+    Message.objects.filter(pk=message.pk).update(local_file_present=False)
+    message.local_file_present = False
+    return None
+
+
+class BlobWriter:
+    """
+    Writes a streamed download into the store chunk by chunk.
+
+    Data goes to a temporary file next to the final blob path; `finish()`
+    moves it into place and registers the blob, `discard()` removes it
+    (client went away, upstream failed). Write errors only disable the
+    writer - the stream itself is never interrupted.
+
+    Usage:
+        writer = BlobWriter(file_unique_id, expected_size=1024)
+        for chunk in chunks:
+            writer.write(chunk)
+        blob = writer.finish()
+    """
+
+    def __init__(
+        self,
+        file_unique_id: str,
+        file_name: Optional[str] = None,
+        mime_type: Optional[str] = None,
+        expected_size: Optional[int] = None,
+    ):
+        self.file_unique_id = file_unique_id
+        self.file_name = file_name
+        self.mime_type = mime_type
+        self.expected_size = expected_size
+        self.relative_path = blob_relative_path(file_unique_id)
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._file = None
+        self._temp_path = None
+
+        target_dir = os.path.dirname(absolute_path(self.relative_path))
+        try:
+            os.makedirs(target_dir, exist_ok=True)
+            fd, self._temp_path = tempfile.mkstemp(
+                dir=target_dir, prefix=f"{file_unique_id}.", suffix=".part"
+            )
+            self._file = os.fdopen(fd, "wb")
+        except OSError as e:
+            logger.error(f"❌ Could not open media store file {target_dir}: {e}")
+            self.discard()
+
+    @property
+    def active(self) -> bool:
+        return self._file is not None
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    def write(self, chunk: bytes) -> None:
+        if not self.active:
+            return
+        try:
+            self._file.write(chunk)
+        except OSError as e:
+            logger.error(f"❌ Media store write failed ({self.file_unique_id}): {e}")
+            self.discard()
+            return
+        self._sha256.update(chunk)
+        self.size += len(chunk)
+
+    def finish(self) -> Optional[MediaBlob]:
+        """
+        Move the completed file into place and register its blob.
+
+        Returns:
+            Optional[MediaBlob]: None if the download was incomplete
+        """
+        if not self.active:
+            return None
+        if self.expected_size is not None and self.size != self.expected_size:
+            logger.warning(
+                f"⚠️ Incomplete download {self.file_unique_id}: "
+                f"{self.size}/{self.expected_size} bytes"
+            )
+            self.discard()
+            return None
+
+        try:
+            self._file.close()
+            self._file = None
+            os.replace(self._temp_path, absolute_path(self.relative_path))
+            self._temp_path = None
+        except OSError as e:
+            logger.error(f"❌ Could not store media {self.file_unique_id}: {e}")
+            self.discard()
+            return None
+
+        return register_blob(
+            self.file_unique_id,
+            self.relative_path,
+            file_name=self.file_name,
+            file_size=self.size,
+            sha256=self.sha256,
+            mime_type=self.mime_type,
+        )
+
+    def discard(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._temp_path is not None:
+            try:
+                os.remove(self._temp_path)
+            except FileNotFoundError:
+                pass
+            self._temp_path = None
+
+
+def prune_blobs(dry_run: bool = False) -> tuple:
+    """
+    Delete unreferenced blobs and their files.
+
+    A file shared by several blob rows (same sha256) is only removed when
+    no remaining row points to it.
+
+    Returns:
+        tuple: (deleted blobs, freed bytes)
+    """
+    orphans = list(MediaBlob.objects.filter(ref_count=0))
+    freed = 0
+
+    for blob in orphans:
+        still_used = (
+            MediaBlob.objects.filter(file_path=blob.file_path)
+            .exclude(pk=blob.pk)
+            .exists()
+        )
+        if not still_used:
+            freed += blob.file_size or 0
+            if not dry_run:
+                _remove_file(blob.file_path)
+        if not dry_run:
+            blob.delete()
+
+    return len(orphans), freed
+
+
+def _remove_file(relative_path: str) -> None:
+    try:
+        os.remove(absolute_path(relative_path))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error(f"❌ Could not remove media file {relative_path}: {e}")
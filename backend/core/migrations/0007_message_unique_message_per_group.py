@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-17 00:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_message_media_file_name_message_media_file_path"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="message",
+            constraint=models.UniqueConstraint(
+                fields=("message_id", "group"), name="unique_message_per_group"
+            ),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 6.0 on 2026-10-17 00:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_message_unique_message_per_group"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MediaBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("file_unique_id", models.CharField(max_length=255, unique=True)),
+                (
+                    "sha256",
+                    models.CharField(
+                        blank=True, db_index=True, max_length=64, null=True
+                    ),
+                ),
+                (
+                    "file_path",
+                    models.CharField(
+                        help_text="Path relative to MEDIA_ROOT: telegram/blobs/AQ/AQADxxxx",
+                        max_length=500,
+                    ),
+                ),
+                ("file_name", models.CharField(blank=True, max_length=255, null=True)),
+                ("file_size", models.BigIntegerField(blank=True, null=True)),
+                ("mime_type", models.CharField(blank=True, max_length=100, null=True)),
+                (
+                    "ref_count",
+                    models.PositiveIntegerField(
+                        db_index=True,
+                        default=0,
+                        help_text="Number of messages using this file",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Media Blob",
+                "verbose_name_plural": "Media Blobs",
+                "db_table": "media_blobs",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="message",
+            name="media_blob",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Shared file in the content-addressed media store",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="messages",
+                to="core.mediablob",
+            ),
+        ),
+    ]
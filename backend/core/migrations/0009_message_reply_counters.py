@@ -0,0 +1,93 @@
+# Generated by Django 6.0 on 2026-10-17 00:49
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+
+BACKFILL_CHUNK_SIZE = 500
+
+
+def backfill_reply_counters(apps, schema_editor):
+    """reply_count, first_reply_at va thread_depth'ni mavjud xabarlar uchun hisoblash"""
+    Message = apps.get_model("core", "Message")
+
+    replies = (
+        Message.objects.filter(reply_to_id=OuterRef("pk"))
+        .order_by()
+        .values("reply_to_id")
+    )
+    targets = Message.objects.filter(reply_to__isnull=False).values("reply_to_id")
+    Message.objects.filter(pk__in=targets).update(
+        reply_count=Subquery(replies.annotate(count=Count("id")).values("count")),
+        first_reply_at=Subquery(
+            replies.annotate(first=Min("telegram_created_at")).values("first")
+        ),
+    )
+
+    # Thread'lar bo'ylab daraja-ma-daraja (root'lardan boshlab)
+    frontier = list(
+        Message.objects.filter(reply_to__isnull=True, pk__in=targets).values_list(
+            "id", flat=True
+        )
+    )
+    depth = 0
+    seen = set(frontier)
+    while frontier:
+        depth += 1
+        children = []
+        for start in range(0, len(frontier), BACKFILL_CHUNK_SIZE):
+            chunk = frontier[start : start + BACKFILL_CHUNK_SIZE]
+            ids = [
+                pk
+                for pk in Message.objects.filter(reply_to_id__in=chunk).values_list(
+                    "id", flat=True
+                )
+                if pk not in seen
+            ]
+            children.extend(ids)
+        for start in range(0, len(children), BACKFILL_CHUNK_SIZE):
+            Message.objects.filter(
+                id__in=children[start : start + BACKFILL_CHUNK_SIZE]
+            ).update(thread_depth=depth)
+        seen.update(children)
+        frontier = children
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_mediablob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="first_reply_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="telegram_created_at of the earliest reply",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="message",
+            name="reply_count",
+            field=models.IntegerField(
+                db_default=0, default=0, help_text="Number of direct replies"
+            ),
+        ),
+        migrations.AddField(
+            model_name="message",
+            name="thread_depth",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="0 for a thread root, reply target's depth + 1 otherwise",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["-reply_count"], name="messages_reply_c_e6132e_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_reply_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.0 on 2026-10-17 00:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_message_reply_counters"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["-telegram_created_at", "-id"],
+                name="messages_telegra_a03d8f_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-17 01:10
+
+from django.db import migrations
+
+from core.search import install_search_index, uninstall_search_index
+
+
+def install(apps, schema_editor):
+    install_search_index(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    uninstall_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_message_list_cursor_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 6.0 on 2026-10-17 00:55
+
+import logging
+
+from django.db import DatabaseError, migrations, models, transaction
+
+from core.models import build_search_name
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL: pg_trgm GIN index - LIKE '%q%' va prefix qidiruv uchun
+TRIGRAM_INDEXES = [
+    ("telegram_users", "telegram_users_search_name_trgm"),
+    ("telegram_groups", "telegram_groups_search_name_trgm"),
+]
+
+
+def backfill_search_names(apps, schema_editor):
+    TelegramUser = apps.get_model("core", "TelegramUser")
+    TelegramGroup = apps.get_model("core", "TelegramGroup")
+
+    users = list(TelegramUser.objects.all())
+    for user in users:
+        user.search_name = build_search_name(
+            user.username, user.first_name, user.last_name
+        )
+    TelegramUser.objects.bulk_update(users, ["search_name"], batch_size=500)
+
+    groups = list(TelegramGroup.objects.all())
+    for group in groups:
+        group.search_name = build_search_name(group.title)
+    TelegramGroup.objects.bulk_update(groups, ["search_name"], batch_size=500)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            for table, name in TRIGRAM_INDEXES:
+                schema_editor.execute(
+                    f"CREATE INDEX IF NOT EXISTS {name} "
+                    f"ON {table} USING gin (search_name gin_trgm_ops)"
+                )
+    except DatabaseError as e:
+        # pg_trgm o'rnatish huquqi bo'lmasa typeahead indekssiz ishlaydi
+        logger.warning(f"⚠️ Trigram indexes not created: {e}")
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for _, name in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_message_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="telegramgroup",
+            name="search_name",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="title, lowercased (typeahead)",
+                max_length=255,
+            ),
+        ),
+        migrations.AddField(
+            model_name="telegramuser",
+            name="search_name",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="username + first_name + last_name, lowercased (typeahead)",
+                max_length=800,
+            ),
+        ),
+        migrations.RunPython(backfill_search_names, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
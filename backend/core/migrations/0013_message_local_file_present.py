@@ -0,0 +1,52 @@
+# Generated by Django 6.0 on 2026-10-17 01:04
+
+import os
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_local_file_present(apps, schema_editor):
+    """Mavjud media fayllar uchun flag (bir martalik stat)"""
+    Message = apps.get_model("core", "Message")
+
+    present = []
+    rows = (
+        Message.objects.filter(
+            models.Q(media_file_path__isnull=False) | models.Q(media_blob__isnull=False)
+        )
+        .values_list("id", "media_file_path", "media_blob__file_path")
+        .iterator(chunk_size=2000)
+    )
+    for pk, file_path, blob_path in rows:
+        for relative_path in (blob_path, file_path):
+            if relative_path and os.path.exists(
+                os.path.join(settings.MEDIA_ROOT, relative_path)
+            ):
+                present.append(pk)
+                break
+
+    for start in range(0, len(present), 500):
+        Message.objects.filter(pk__in=present[start : start + 500]).update(
+            local_file_present=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_identity_search_name"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="local_file_present",
+            field=models.BooleanField(
+                db_index=True,
+                default=False,
+                help_text="media_file_path exists on disk (kept by ingest/sync_media)",
+            ),
+        ),
+        migrations.RunPython(backfill_local_file_present, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-17 01:17
+
+from django.db import migrations, models
+from django.db.models import Subquery
+
+from core.models import first_reply_subquery
+
+
+def recompute_first_reply_at(apps, schema_editor):
+    """first_reply_at'ni o'z xabariga javoblarsiz qayta hisoblash"""
+    Message = apps.get_model("core", "Message")
+
+    first_reply = first_reply_subquery(Message)
+    Message.objects.filter(reply_count__gt=0).update(
+        first_reply_at=Subquery(first_reply.values("telegram_created_at")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_message_local_file_present"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="message",
+            name="first_reply_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="telegram_created_at of the earliest reply from another user",
+                null=True,
+            ),
+        ),
+        migrations.RunPython(recompute_first_reply_at, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,29 @@
 from django.db import models
+from django.db.models import OuterRef
+
+
+def build_search_name(*parts) -> str:
+    """Typeahead uchun normallashtirilgan nom: kichik harf, '@'siz, bo'shliq bilan"""
+    words = []
+    for part in parts:
+        if part:
+            words.extend(str(part).lstrip("@").lower().split())
+    return " ".join(words)
+
+
+def first_reply_subquery(message_model, target="pk", author="user_id"):
+    """
+    OuterRef(target) xabariga boshqa user'ning javoblari, eng birinchisi oldin
+
+    Message.first_reply_at va QuestionResponse uchun yagona ta'rif (o'z
+    xabariga javob hisobga olinmaydi). Model parametr - migratsiyalar
+    tarixiy modelni beradi. Ishlatish: Subquery(qs.values("...")[:1])
+    """
+    return (
+        message_model.objects.filter(reply_to_id=OuterRef(target))
+        .exclude(user_id=OuterRef(author))
+        .order_by("telegram_created_at", "id")
+    )
 
 
 class TelegramUser(models.Model):
@@ -11,6 +36,13 @@ class TelegramUser(models.Model):
     is_bot = models.BooleanField(default=False)
     department = models.CharField(max_length=255, null=True, blank=True)
 
+    search_name = models.CharField(
+        max_length=800,
+        blank=True,
+        default="",
+        help_text="username + first_name + last_name, lowercased (typeahead)",
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -23,6 +55,14 @@ class TelegramUser(models.Model):
     def __str__(self):
         return f"@{self.username}" if self.username else f"User {self.telegram_id}"
 
+    def save(self, *args, **kwargs):
+        self.search_name = build_search_name(
+            self.username, self.first_name, self.last_name
+        )
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "search_name"}
+        super().save(*args, **kwargs)
+
     @property
     def full_name(self):
         """To'liq ism"""
@@ -39,6 +79,13 @@ class TelegramGroup(models.Model):
     description = models.TextField(null=True, blank=True)
     member_count = models.IntegerField(default=0)
 
+    search_name = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        help_text="title, lowercased (typeahead)",
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -51,6 +98,43 @@ class TelegramGroup(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.search_name = build_search_name(self.title)
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "search_name"}
+        super().save(*args, **kwargs)
+
+
+class MediaBlob(models.Model):
+    """Umumiy media fayllar (file_unique_id bo'yicha, reference counting bilan)"""
+
+    file_unique_id = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+
+    file_path = models.CharField(
+        max_length=500,
+        help_text="Path relative to MEDIA_ROOT: telegram/blobs/AQ/AQADxxxx",
+    )
+    file_name = models.CharField(max_length=255, null=True, blank=True)
+    file_size = models.BigIntegerField(null=True, blank=True)
+    mime_type = models.CharField(max_length=100, null=True, blank=True)
+
+    ref_count = models.PositiveIntegerField(
+        default=0, db_index=True, help_text="Number of messages using this file"
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "media_blobs"
+        ordering = ["-created_at"]
+        verbose_name = "Media Blob"
+        verbose_name_plural = "Media Blobs"
+
+    def __str__(self):
+        return f"{self.file_unique_id} ({self.ref_count} refs)"
+
 
 class Message(models.Model):
     """Guruhdan kelgan xabarlar"""
@@ -103,6 +187,20 @@ class Message(models.Model):
         help_text="Original file name: photo_123.jpg",
     )
 
+    media_blob = models.ForeignKey(
+        MediaBlob,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="messages",
+        help_text="Shared file in the content-addressed media store",
+    )
+    local_file_present = models.BooleanField(
+        default=False,
+        db_index=True,
+        help_text="media_file_path exists on disk (kept by ingest/sync_media)",
+    )
+
     reply_to_message_id = models.BigIntegerField(null=True, blank=True, db_index=True)
     reply_to = models.ForeignKey(
         "self",
@@ -112,6 +210,17 @@ class Message(models.Model):
         related_name="replies",
         db_column="reply_to_id",
     )
+    reply_count = models.IntegerField(
+        default=0, db_default=0, help_text="Number of direct replies"
+    )
+    thread_depth = models.PositiveIntegerField(
+        default=0, help_text="0 for a thread root, reply target's depth + 1 otherwise"
+    )
+    first_reply_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="telegram_created_at of the earliest reply from another user",
+    )
 
     forward_from_user_id = models.BigIntegerField(null=True, blank=True)
     forward_from_chat_id = models.BigIntegerField(null=True, blank=True)
@@ -164,6 +273,8 @@ class Message(models.Model):
             models.Index(fields=["media_type", "-telegram_created_at"]),
             models.Index(fields=["sentiment"]),
             models.Index(fields=["ai_processed"]),
+            models.Index(fields=["-reply_count"]),
+            models.Index(fields=["-telegram_created_at", "-id"]),
         ]
         constraints = [
             models.UniqueConstraint(
@@ -187,15 +298,8 @@ class Message(models.Model):
 
     @property
     def has_local_file(self):
-        """Local file mavjudmi?"""
-        if not self.media_file_path:
-            return False
-        import os
-
-        from django.conf import settings
-
-        file_path = os.path.join(settings.MEDIA_ROOT, self.media_file_path)
-        return os.path.exists(file_path)
+        """Local file mavjudmi? (keshlangan flag - fayl tizimi tekshirilmaydi)"""
+        return self.local_file_present
 
 
 class MessageAnalysis(models.Model):
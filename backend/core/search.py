@@ -0,0 +1,261 @@
+"""
+Full-text search over message text.
+
+PostgreSQL: a generated `messages.search_vector` tsvector column with a
+GIN index. SQLite: an external-content FTS5 table `messages_fts` kept in
+sync by triggers on `messages`. Either way the index is maintained by the
+database itself, so every write path (bulk upserts, updates, deletes) keeps
+it current.
+
+Text is tokenized language-agnostically (PostgreSQL `simple` config,
+FTS5 `unicode61` with diacritics removed) because groups mix Uzbek
+(Latin and Cyrillic), Russian and English and there is no Uzbek stemmer.
+Every query term is matched as a prefix instead, which also covers
+suffix inflections. Results are ranked with ts_rank / bm25.
+
+The schema is installed by migration core.0011 and re-checked after every
+migrate (SQLite drops triggers when a migration rebuilds the table).
+`python manage.py rebuild_search_index` re-populates the SQLite table.
+Other database backends fall back to `icontains`.
+
+`typeahead` serves the user/group filter dropdowns from the normalized
+`search_name` columns.
+"""
+
+import logging
+import re
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import Case, FloatField, Value, When
+
+from core.models import build_search_name
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "messages_fts"
+
+SEARCH_MIGRATION = ("core", "0011_message_search_index")
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Query terms beyond this are ignored
+MAX_QUERY_TERMS = 10
+
+SQLITE_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text, content='messages', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON messages BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON messages BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF text ON messages
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+]
+
+POSTGRES_SCHEMA = [
+    """
+    ALTER TABLE messages ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple', coalesce(text, ''))) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS messages_search_vector_idx
+    ON messages USING GIN (search_vector)
+    """,
+]
+
+SQLITE_UNINSTALL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS messages_search_vector_idx",
+    "ALTER TABLE messages DROP COLUMN IF EXISTS search_vector",
+]
+
+# alias -> backend name ("postgres", "fts5") or None
+_backends = {}
+
+
+def is_installed(connection) -> bool:
+    """Has the search index migration been applied on this database?"""
+    return SEARCH_MIGRATION in MigrationRecorder(connection).applied_migrations()
+
+
+def install_search_index(connection) -> bool:
+    """
+    Create the search index for this connection's backend (idempotent).
+
+    Returns:
+        bool: True if full-text search is available
+    """
+    _backends.pop(connection.alias, None)
+
+    if connection.vendor == "postgresql":
+        statements = POSTGRES_SCHEMA
+    elif connection.vendor == "sqlite":
+        statements = SQLITE_SCHEMA
+    else:
+        return False
+
+    try:
+        with connection.cursor() as cursor:
+            created = (
+                connection.vendor == "sqlite"
+                and FTS_TABLE not in connection.introspection.table_names(cursor)
+            )
+            for sql in statements:
+                cursor.execute(sql)
+            if created:
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+                )
+    except OperationalError as e:
+        # SQLite without the FTS5 extension
+        logger.warning(f"⚠️ Full-text search index not installed: {e}")
+        return False
+
+    return True
+
+
+def uninstall_search_index(connection) -> None:
+    """Drop the search index (migration rollback)."""
+    _backends.pop(connection.alias, None)
+
+    if connection.vendor == "postgresql":
+        statements = POSTGRES_UNINSTALL
+    elif connection.vendor == "sqlite":
+        statements = SQLITE_UNINSTALL
+    else:
+        return
+
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def rebuild_search_index(using: str = DEFAULT_DB_ALIAS) -> bool:
+    """
+    Rebuild the index from the messages table.
+
+    Only SQLite needs this (the PostgreSQL column is generated).
+
+    Returns:
+        bool: True if full-text search is available
+    """
+    connection = connections[using]
+    if not install_search_index(connection):
+        return False
+
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def search_backend(using: str = DEFAULT_DB_ALIAS):
+    """
+    Available full-text backend for a database.
+
+    Returns:
+        Optional[str]: "postgres", "fts5" or None
+    """
+    if using not in _backends:
+        connection = connections[using]
+        backend = None
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                columns = connection.introspection.get_table_description(
+                    cursor, "messages"
+                )
+                if any(column.name == "search_vector" for column in columns):
+                    backend = "postgres"
+            elif connection.vendor == "sqlite":
+                if FTS_TABLE in connection.introspection.table_names(cursor):
+                    backend = "fts5"
+        _backends[using] = backend
+    return _backends[using]
+
+
+def query_terms(query: str) -> list:
+    """Lowercased word tokens of a search query."""
+    return TOKEN_RE.findall(query.lower())[:MAX_QUERY_TERMS]
+
+
+def search_messages(queryset, query: str):
+    """
+    Filter a Message queryset by full-text query.
+
+    Every term must match (as a prefix). The result is annotated with
+    `search_rank` (higher is better); order by it for ranked results.
+    Falls back to `text__icontains` (rank 0) without a full-text backend.
+    """
+    terms = query_terms(query)
+    backend = search_backend(queryset.db) if terms else None
+
+    if backend == "postgres":
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        return queryset.extra(
+            select={
+                "search_rank": (
+                    "ts_rank(messages.search_vector, to_tsquery('simple', %s))"
+                )
+            },
+            select_params=[tsquery],
+            where=["messages.search_vector @@ to_tsquery('simple', %s)"],
+            params=[tsquery],
+        )
+
+    if backend == "fts5":
+        match = " ".join(f'"{term}"*' for term in terms)
+        return queryset.extra(
+            select={"search_rank": f"-bm25({FTS_TABLE})"},
+            tables=[FTS_TABLE],
+            where=[f"{FTS_TABLE}.rowid = messages.id", f"{FTS_TABLE} MATCH %s"],
+            params=[match],
+        )
+
+    return queryset.filter(text__icontains=query).annotate(
+        search_rank=Value(0.0, output_field=FloatField())
+    )
+
+
+def typeahead(queryset, query: str):
+    """
+    Filter users or groups by `search_name` for dropdown typeahead.
+
+    Matches anywhere in the name (backed by a pg_trgm GIN index on
+    PostgreSQL). Annotated with `match_rank`: 0 = name starts with the
+    query, 1 = a word starts with it, 2 = matches inside a word.
+    """
+    query = build_search_name(query)
+    if not query:
+        return queryset.annotate(match_rank=Value(0))
+
+    return queryset.filter(search_name__contains=query).annotate(
+        match_rank=Case(
+            When(search_name__startswith=query, then=Value(0)),
+            When(search_name__contains=f" {query}", then=Value(1)),
+            default=Value(2),
+        )
+    )
@@ -0,0 +1,57 @@
+# backend/core/signals.py
+# Media store reference counting, reply counter'lar va qidiruv indeksi
+
+from django.db import connections
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_migrate
+from django.dispatch import receiver
+
+from core.media_store import release_blobs
+from core.models import Message, first_reply_subquery
+from core.search import install_search_index, is_installed
+
+
+@receiver(post_delete, sender=Message)
+def release_message_blob(sender, instance, **kwargs):
+    """O'chirilgan xabar ishlatgan media blob'ning ref_count'ini kamaytirish"""
+    if instance.media_blob_id:
+        release_blobs([instance.media_blob_id])
+
+
+@receiver(post_delete, sender=Message)
+def refresh_reply_target(sender, instance, **kwargs):
+    """
+    O'chirilgan reply target'ining reply_count va first_reply_at'ini
+    yangilash (first_reply_at - boshqa user'ning birinchi javobi)
+    """
+    if not instance.reply_to_id:
+        return
+
+    replies = (
+        Message.objects.filter(reply_to_id=OuterRef("pk"))
+        .order_by()
+        .values("reply_to_id")
+    )
+    first_reply = first_reply_subquery(Message)
+    Message.objects.filter(pk=instance.reply_to_id).update(
+        reply_count=Coalesce(
+            Subquery(replies.annotate(count=Count("id")).values("count")), 0
+        ),
+        first_reply_at=Subquery(first_reply.values("telegram_created_at")[:1]),
+    )
+
+
+@receiver(post_migrate)
+def ensure_search_index(sender, using, **kwargs):
+    """
+    Qidiruv indeksini migrate'dan keyin tekshirish
+
+    SQLite migratsiya jadvalni qayta yaratganda (ALTER TABLE o'rniga)
+    trigger'lar o'chib ketadi - ular shu yerda qayta yaratiladi.
+    """
+    if sender.name != "core":
+        return
+    connection = connections[using]
+    if is_installed(connection):
+        install_search_index(connection)
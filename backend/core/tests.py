@@ -1,3 +1,215 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from analytics.models import BackfillCheckpoint
+from core.models import Message, TelegramGroup, TelegramUser
+from core.views import serve_media
+
+VIDEO_BYTES = b"\x00\x01video" * 1000
+
+
+class MediaOffloadTests(TestCase):
+    """MEDIA_OFFLOAD_MODE: view faqat header qaytaradi, baytlarni proxy beradi"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+        os.makedirs(os.path.join(self.media_root, "telegram", "videos"))
+        self.file_path = os.path.join(self.media_root, "telegram", "videos", "a b.mp4")
+        with open(self.file_path, "wb") as f:
+            f.write(VIDEO_BYTES)
+
+        user = TelegramUser.objects.create(telegram_id=1, first_name="Ali")
+        group = TelegramGroup.objects.create(telegram_id=-100, title="Test")
+        self.message = Message.objects.create(
+            message_id=10,
+            user=user,
+            group=group,
+            media_type="video",
+            media_file_unique_id="AgADvideo",
+            media_file_path="telegram/videos/a b.mp4",
+            media_file_name="a b.mp4",
+            local_file_present=True,
+            telegram_created_at=timezone.now(),
+        )
+        self.url = f"/api/messages/{self.message.message_id}/file/"
+
+    def media_settings(self, **kwargs):
+        return override_settings(MEDIA_ROOT=self.media_root, **kwargs)
+
+    def test_accel_redirect(self):
+        with self.media_settings(
+            MEDIA_OFFLOAD_MODE="accel", MEDIA_OFFLOAD_PREFIX="/protected-media/"
+        ):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["X-Accel-Redirect"], "/protected-media/telegram/videos/a%20b.mp4"
+        )
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["Content-Type"], "video/mp4")
+        self.assertIn("attachment", response["Content-Disposition"])
+        self.assertEqual(response["ETag"], '"AgADvideo"')
+        self.assertNotIn("X-Sendfile", response)
+
+    def test_sendfile(self):
+        with self.media_settings(MEDIA_OFFLOAD_MODE="sendfile"):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Sendfile"], os.path.abspath(self.file_path))
+        self.assertEqual(response.content, b"")
+        self.assertNotIn("X-Accel-Redirect", response)
+
+    def test_offload_disabled_streams_file(self):
+        with self.media_settings(MEDIA_OFFLOAD_MODE=""):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), VIDEO_BYTES)
+        self.assertNotIn("X-Accel-Redirect", response)
+        self.assertNotIn("X-Sendfile", response)
+
+    def test_not_modified_skips_offload(self):
+        with self.media_settings(MEDIA_OFFLOAD_MODE="accel"):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"AgADvideo"')
+
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn("X-Accel-Redirect", response)
+
+    def test_weak_if_none_match(self):
+        with self.media_settings(MEDIA_OFFLOAD_MODE=""):
+            response = self.client.get(
+                self.url, HTTP_IF_NONE_MATCH='"other", W/"AgADvideo"'
+            )
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_weak_if_range_serves_full_file(self):
+        with self.media_settings(MEDIA_OFFLOAD_MODE=""):
+            response = self.client.get(
+                self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='W/"AgADvideo"'
+            )
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_accel_outside_media_root_served_by_django(self):
+        outside = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False)
+        outside.write(VIDEO_BYTES)
+        outside.close()
+        self.addCleanup(os.remove, outside.name)
+        Message.objects.filter(pk=self.message.pk).update(media_file_path=outside.name)
+
+        with self.media_settings(MEDIA_OFFLOAD_MODE="accel"):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Accel-Redirect", response)
+        self.assertEqual(b"".join(response.streaming_content), VIDEO_BYTES)
+
+    def test_invalid_mode(self):
+        with self.media_settings(MEDIA_OFFLOAD_MODE="nginx"):
+            with self.assertRaises(ImproperlyConfigured):
+                serve_media(RequestFactory().get("/media/"), "telegram/videos/a b.mp4")
+
+    def test_media_route(self):
+        request = RequestFactory().get("/media/telegram/videos/a%20b.mp4")
+        with self.media_settings(MEDIA_OFFLOAD_MODE="accel"):
+            response = serve_media(request, "telegram/videos/a b.mp4")
+
+            with self.assertRaises(Http404):
+                serve_media(request, "../../etc/passwd")
+
+        self.assertEqual(
+            response["X-Accel-Redirect"], "/protected-media/telegram/videos/a%20b.mp4"
+        )
+        self.assertIn("inline", response["Content-Disposition"])
+
+
+class AnalyzeMessagesCommandTests(TestCase):
+    """analyze_messages: checkpoint faqat to'xtatilgan run'ni davom ettiradi"""
+
+    ANALYSIS = {
+        "sentiment": "positive",
+        "intent": "feedback",
+        "topics": ["umumiy"],
+        "urgency": "low",
+        "is_question": False,
+    }
+
+    def setUp(self):
+        user = TelegramUser.objects.create(telegram_id=1, first_name="Ali")
+        group = TelegramGroup.objects.create(telegram_id=-100, title="Test")
+        self.messages = [
+            Message.objects.create(
+                message_id=message_id,
+                user=user,
+                group=group,
+                text=f"Yetkazib berish haqida xabar {message_id}",
+                telegram_created_at=timezone.now(),
+            )
+            for message_id in range(1, 4)
+        ]
+
+    def run_command(self, *results):
+        """results: har bir chaqiruv uchun natija (None - tahlil xatosi)"""
+
+        def analyze(texts, batch_size):
+            return [results[0] if results else self.ANALYSIS for _ in texts]
+
+        with mock.patch(
+            "core.management.commands.analyze_messages.analyze_messages_batch",
+            side_effect=analyze,
+        ):
+            call_command("analyze_messages", stdout=StringIO())
+        return BackfillCheckpoint.objects.get(name="analyze_messages")
+
+    def test_finished_run_resets_checkpoint(self):
+        checkpoint = self.run_command()
+
+        self.assertEqual(checkpoint.last_pk, 0)
+        self.assertFalse(Message.objects.filter(ai_processed=False).exists())
+
+        # Navbat xatosi (_mark_failed) xabarni qayta tahlilsiz qiladi
+        Message.objects.filter(pk=self.messages[0].pk).update(ai_processed=False)
+        self.run_command()
+
+        self.assertTrue(Message.objects.get(pk=self.messages[0].pk).ai_processed)
+
+    def test_failed_run_keeps_checkpoint(self):
+        checkpoint = self.run_command(None)
+
+        self.assertEqual(checkpoint.last_pk, 0)
+        self.assertEqual(Message.objects.filter(ai_processed=False).count(), 3)
+
+        Message.objects.filter(pk=self.messages[0].pk).update(ai_processed=True)
+        BackfillCheckpoint.objects.filter(name="analyze_messages").update(
+            last_pk=self.messages[0].pk
+        )
+        self.run_command(None)
+
+        self.assertEqual(
+            BackfillCheckpoint.objects.get(name="analyze_messages").last_pk,
+            self.messages[0].pk,
+        )
+
+    def test_stale_checkpoint_at_end_starts_over(self):
+        BackfillCheckpoint.objects.create(
+            name="analyze_messages", last_pk=self.messages[-1].pk
+        )
+
+        checkpoint = self.run_command()
+
+        self.assertEqual(checkpoint.last_pk, 0)
+        self.assertFalse(Message.objects.filter(ai_processed=False).exists())
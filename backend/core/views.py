@@ -1,3 +1,28 @@
-from django.shortcuts import render
+# backend/core/views.py
 
-# Create your views here.
+import os
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404
+from django.utils._os import safe_join
+
+from core.media_serving import serve_media_file
+
+
+def serve_media(request, path):
+    """
+    MEDIA_URL fayllari (MEDIA_OFFLOAD_MODE bo'lsa front proxy uzatadi)
+
+    django.views.static.serve o'rniga: Range, ETag va offload header'lari
+    bilan.
+    """
+    try:
+        file_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Fayl topilmadi")
+
+    if not os.path.isfile(file_path):
+        raise Http404("Fayl topilmadi")
+
+    return serve_media_file(request, file_path)
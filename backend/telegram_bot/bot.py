@@ -1,4 +1,5 @@
 import asyncio
+import hashlib
 import logging
 import os
 import re
@@ -18,108 +19,374 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+BACKEND_BATCH_SIZE = int(os.getenv("BACKEND_BATCH_SIZE", "50"))
+BACKEND_FLUSH_INTERVAL = float(os.getenv("BACKEND_FLUSH_INTERVAL", "0.5"))
+BACKEND_POOL_SIZE = int(os.getenv("BACKEND_POOL_SIZE", "10"))
+MEDIA_DOWNLOAD_WORKERS = int(os.getenv("MEDIA_DOWNLOAD_WORKERS", "3"))
+MEDIA_DOWNLOAD_RETRIES = int(os.getenv("MEDIA_DOWNLOAD_RETRIES", "3"))
+MEDIA_QUEUE_SIZE = int(os.getenv("MEDIA_QUEUE_SIZE", "1000"))
 
 if not BOT_TOKEN:
     raise ValueError("TELEGRAM_BOT_TOKEN topilmadi! .env.example faylini tekshiring.")
 bot = Bot(token=BOT_TOKEN)
 dp = Dispatcher()
-MEDIA_DIR = Path("media/telegram")
+MEDIA_ROOT = Path("media")
+MEDIA_DIR = MEDIA_ROOT / "telegram"
 MEDIA_DIR.mkdir(parents=True, exist_ok=True)
 
 
-async def download_media_file(message: Message, media_type: str) -> tuple:
+def media_file_info(message: Message, media_type: str) -> tuple:
     """
-    Download media file from Telegram
-    Returns: (file_path, file_name, file_size)
+    Media fayl identifikatorlari
+    Returns: (file_id, file_unique_id, file_name)
     """
-    try:
-        file_id = None
-        file_name = None
-
-        if media_type == "photo":
-            photo = message.photo[-1]
-            file_id = photo.file_id
-            file_name = f"photo_{message.message_id}.jpg"
-
-        elif media_type == "video":
-            file_id = message.video.file_id
-            file_name = message.video.file_name or f"video_{message.message_id}.mp4"
-
-        elif media_type == "voice":
-            file_id = message.voice.file_id
-            file_name = f"voice_{message.message_id}.ogg"
-
-        elif media_type == "audio":
-            file_id = message.audio.file_id
-            file_name = message.audio.file_name or f"audio_{message.message_id}.mp3"
-
-        elif media_type == "document":
-            file_id = message.document.file_id
-            file_name = message.document.file_name or f"document_{message.message_id}"
-
-        elif media_type == "sticker":
-            file_id = message.sticker.file_id
-            file_name = f"sticker_{message.message_id}.webp"
-
-        elif media_type == "animation":
-            file_id = message.animation.file_id
-            file_name = (
-                message.animation.file_name or f"animation_{message.message_id}.mp4"
-            )
+    if media_type == "photo":
+        media = message.photo[-1]
+        file_name = f"photo_{message.message_id}.jpg"
+
+    elif media_type == "video":
+        media = message.video
+        file_name = media.file_name or f"video_{message.message_id}.mp4"
+
+    elif media_type == "voice":
+        media = message.voice
+        file_name = f"voice_{message.message_id}.ogg"
+
+    elif media_type == "audio":
+        media = message.audio
+        file_name = media.file_name or f"audio_{message.message_id}.mp3"
+
+    elif media_type == "document":
+        media = message.document
+        file_name = media.file_name or f"document_{message.message_id}"
+
+    elif media_type == "sticker":
+        media = message.sticker
+        file_name = f"sticker_{message.message_id}.webp"
+
+    elif media_type == "animation":
+        media = message.animation
+        file_name = media.file_name or f"animation_{message.message_id}.mp4"
+
+    elif media_type == "video_note":
+        media = message.video_note
+        file_name = f"video_note_{message.message_id}.mp4"
+
+    else:
+        return None, None, None
 
-        elif media_type == "video_note":
-            file_id = message.video_note.file_id
-            file_name = f"video_note_{message.message_id}.mp4"
+    return media.file_id, media.file_unique_id, file_name
+
+
+def blob_relative_path(file_unique_id: str) -> str:
+    """Media store'dagi fayl yo'li (MEDIA_ROOT ga nisbatan, backend bilan bir xil)"""
+    return f"telegram/blobs/{file_unique_id[:2]}/{file_unique_id}"
+
+
+def file_sha256(path: Path) -> str:
+    """Fayl kontentining sha256 hash'i"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def download_media_file(message: Message, media_type: str) -> dict:
+    """
+    Download media file from Telegram into the content-addressed store
+    Returns: dict(media_file_path, media_file_name, media_file_size, media_sha256)
+    """
+    try:
+        file_id, file_unique_id, file_name = media_file_info(message, media_type)
 
         if not file_id:
             logger.warning(f"No file_id for {media_type}")
-            return None, None, None
+            return None
 
         file = await bot.get_file(file_id)
 
-        date_path = datetime.now().strftime("%Y/%m/%d")
-        dir_path = MEDIA_DIR / date_path
-        dir_path.mkdir(parents=True, exist_ok=True)
+        relative_path = blob_relative_path(file_unique_id)
+        file_path = MEDIA_ROOT / relative_path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
 
-        file_path = dir_path / file_name
-
-        await bot.download_file(file.file_path, file_path)
+        # Avval vaqtinchalik faylga, keyin atomik rename
+        tmp_path = file_path.with_name(f"{file_path.name}.{message.message_id}.part")
+        await bot.download_file(file.file_path, tmp_path)
+        sha256 = await asyncio.to_thread(file_sha256, tmp_path)
+        os.replace(tmp_path, file_path)
 
         file_size = file_path.stat().st_size
 
-        relative_path = str(file_path.relative_to(MEDIA_DIR)).replace("\\", "/")
-
         logger.info(f"✅ Downloaded {media_type}: {relative_path} ({file_size} bytes)")
 
-        return relative_path, file_name, file_size
+        return {
+            "media_file_path": relative_path,
+            "media_file_name": file_name,
+            "media_file_size": file_size,
+            "media_sha256": sha256,
+        }
 
     except Exception as e:
         logger.error(f"❌ Error downloading media: {e}")
-        return None, None, None
+        return None
+
+
+class BackendBatcher:
+    """
+    Backend'ga yuboriladigan xabarlarni bufferlab, to'plam qilib yuborish
+
+    Buffer BACKEND_BATCH_SIZE ga yetganda yoki BACKEND_FLUSH_INTERVAL soniya
+    o'tganda /api/telegram/webhook/batch/ ga bitta so'rov yuboriladi. Barcha
+    so'rovlar bitta uzoq yashaydigan (pooled) aiohttp session orqali ketadi.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_retries: int = 3):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.session = None
+        self._buffer = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def start(self):
+        """Session va fon flush task'ini ishga tushirish"""
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=BACKEND_POOL_SIZE),
+            timeout=aiohttp.ClientTimeout(total=30),
+        )
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Qolgan xabarlarni yuborib, session'ni yopish"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+        if self.session:
+            await self.session.close()
+
+    async def add(self, message_data: dict):
+        """Xabarni buffer'ga qo'shish"""
+        self._buffer.append(message_data)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Buffer'dagi xabarlarni BACKEND_BATCH_SIZE bo'laklarda yuborish"""
+        async with self._flush_lock:
+            while self._buffer:
+                batch = self._buffer[: self.batch_size]
+                del self._buffer[: self.batch_size]
+                await self._send_batch(batch)
+
+    async def _send_batch(self, batch: list):
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                async with self.session.post(
+                    f"{BACKEND_URL}/api/telegram/webhook/batch/",
+                    json={"messages": batch},
+                ) as response:
+                    if response.status == 200:
+                        result = await response.json()
+                        logger.info(
+                            f"✅ {len(batch)} messages sent to backend "
+                            f"({result.get('failed', 0)} failed)"
+                        )
+                        for item in result.get("results", []):
+                            if item.get("status") == "error":
+                                logger.error(
+                                    f"❌ Backend rejected message "
+                                    f"{item.get('message_id')}: {item.get('message')}"
+                                )
+                        return
+
+                    text = await response.text()
+                    logger.error(f"❌ Backend error: {response.status}")
+                    logger.error(f"Response: {text[:200]}")
+                    if response.status < 500:
+                        return
+            except asyncio.TimeoutError:
+                logger.error(f"❌ Backend timeout (attempt {attempt})")
+            except Exception as e:
+                logger.error(f"❌ Error sending to backend: {e} (attempt {attempt})")
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(2 ** (attempt - 1))
+
+        logger.error(f"❌ Dropped batch of {len(batch)} messages after retries")
+
+
+backend_batcher = BackendBatcher(BACKEND_BATCH_SIZE, BACKEND_FLUSH_INTERVAL)
 
 
 async def send_to_backend(message_data: dict):
-    """Xabarni backend'ga yuborish"""
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{BACKEND_URL}/api/telegram/webhook/",
-                json=message_data,
-                headers={"Content-Type": "application/json"},
-                timeout=aiohttp.ClientTimeout(total=30),
+    """Xabarni backend'ga yuborish (batcher orqali)"""
+    await backend_batcher.add(message_data)
+
+
+def needs_download(message_data: dict) -> bool:
+    """Xabar media faylini yuklab olish kerakmi?"""
+    return bool(message_data.get("media_file_id")) and message_data[
+        "media_type"
+    ] not in ["text", "emoji", "location", "contact", "poll"]
+
+
+class MediaDownloader:
+    """
+    Media fayllarni xabar yuborishdan alohida yuklab olish
+
+    Metadata backend'ga darhol yuboriladi, fayl esa cheklangan worker pool'da
+    (MEDIA_DOWNLOAD_WORKERS) yuklanadi. Yuklangach fayl ma'lumotlari
+    PATCH /api/telegram/media/ orqali saqlangan xabarga yoziladi. Shu tarzda
+    katta video keyingi xabarlarni kechiktirmaydi.
+    """
+
+    def __init__(self, workers: int, max_retries: int, queue_size: int):
+        self.workers = workers
+        self.max_retries = max_retries
+        self.queue_size = queue_size
+        self._queue = None
+        self._tasks = []
+
+    async def start(self):
+        """Worker'larni ishga tushirish"""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self, timeout: float = 30):
+        """Navbatdagi yuklashlarni kutib, worker'larni to'xtatish"""
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ {self._queue.qsize()} media downloads dropped")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def submit(self, message: Message, media_type: str) -> bool:
+        """Yuklashni navbatga qo'yish (navbat to'lsa fayl o'tkazib yuboriladi)"""
+        try:
+            self._queue.put_nowait((message, media_type))
+            return True
+        except asyncio.QueueFull:
+            logger.error(
+                f"❌ Media queue full, skipping {media_type} "
+                f"for message {message.message_id}"
+            )
+            return False
+
+    async def _worker(self):
+        while True:
+            message, media_type = await self._queue.get()
+            try:
+                await self._process(message, media_type)
+            except Exception as e:
+                logger.exception(f"❌ Media worker error: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, message: Message, media_type: str):
+        file_id, file_unique_id, file_name = media_file_info(message, media_type)
+
+        # Fayl media store'da bo'lsa qayta yuklab olinmaydi
+        media = await self._fetch_blob(file_unique_id)
+        if media:
+            logger.info(
+                f"♻️ {media_type} for message {message.message_id} already stored"
+            )
+
+        attempt = 0
+        while not media and attempt < self.max_retries:
+            attempt += 1
+            logger.info(
+                f"📥 Downloading {media_type} for message {message.message_id} "
+                f"(attempt {attempt})..."
+            )
+            media = await download_media_file(message, media_type)
+            if not media and attempt < self.max_retries:
+                await asyncio.sleep(2 ** (attempt - 1))
+
+        if not media:
+            logger.error(
+                f"❌ Giving up on {media_type} for message {message.message_id}"
+            )
+            return
+
+        # Metadata hali buffer'da bo'lishi mumkin - avval uni yuboramiz
+        await backend_batcher.flush()
+        await self._patch_backend(
+            {
+                "group_id": message.chat.id,
+                "message_id": message.message_id,
+                "media_file_unique_id": file_unique_id,
+                **media,
+            }
+        )
+
+    async def _fetch_blob(self, file_unique_id: str) -> dict:
+        """Backend'dan media store'dagi fayl ma'lumotini olish (yo'q bo'lsa None)"""
+        try:
+            async with backend_batcher.session.get(
+                f"{BACKEND_URL}/api/telegram/media/blobs/{file_unique_id}/"
             ) as response:
-                if response.status == 200:
-                    logger.info(
-                        f"✅ Message {message_data.get('message_id')} sent to backend"
-                    )
-                else:
-                    logger.error(f"❌ Backend error: {response.status}")
+                if response.status != 200:
+                    return None
+                data = await response.json()
+                return {
+                    "media_file_path": data["media_file_path"],
+                    "media_file_name": data["media_file_name"],
+                    "media_file_size": data["media_file_size"],
+                    "media_sha256": data["media_sha256"],
+                }
+        except Exception as e:
+            logger.warning(f"⚠️ Blob lookup failed for {file_unique_id}: {e}")
+            return None
+
+    async def _patch_backend(self, payload: dict):
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                async with backend_batcher.session.patch(
+                    f"{BACKEND_URL}/api/telegram/media/", json=payload
+                ) as response:
+                    if response.status == 200:
+                        logger.info(
+                            f"✅ Media path sent for message {payload['message_id']}"
+                        )
+                        return
+
                     text = await response.text()
+                    logger.error(f"❌ Backend media error: {response.status}")
                     logger.error(f"Response: {text[:200]}")
-    except asyncio.TimeoutError:
-        logger.error(f"❌ Backend timeout")
-    except Exception as e:
-        logger.error(f"❌ Error sending to backend: {e}")
+                    if response.status != 404 and response.status < 500:
+                        return
+            except asyncio.TimeoutError:
+                logger.error(f"❌ Backend timeout (attempt {attempt})")
+            except Exception as e:
+                logger.error(f"❌ Error sending media path: {e} (attempt {attempt})")
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(2 ** (attempt - 1))
+
+
+media_downloader = MediaDownloader(
+    MEDIA_DOWNLOAD_WORKERS, MEDIA_DOWNLOAD_RETRIES, MEDIA_QUEUE_SIZE
+)
 
 
 def detect_emoji_only(text: str) -> bool:
@@ -216,22 +483,6 @@ async def extract_message_data(
         if detect_emoji_only(message.text):
             media_type = "emoji"
 
-    if (
-        media_type not in ["text", "emoji", "location", "contact", "poll"]
-        and media_file_id
-    ):
-        try:
-            logger.info(
-                f"📥 Downloading {media_type} for message {message.message_id}..."
-            )
-            media_file_path, media_file_name, downloaded_size = (
-                await download_media_file(message, media_type)
-            )
-            if media_file_path:
-                logger.info(f"✅ Downloaded: {media_file_path}")
-        except Exception as e:
-            logger.error(f"❌ Failed to download media: {e}")
-
     def to_iso_string(dt):
         if dt is None:
             return None
@@ -291,6 +542,9 @@ async def handle_group_message(message: Message):
 
         await send_to_backend(message_data)
 
+        if needs_download(message_data):
+            media_downloader.submit(message, message_data["media_type"])
+
     except Exception as e:
         logger.exception(f"❌ Error processing message: {e}")
 
@@ -307,7 +561,7 @@ async def handle_edited_message(message: Message):
 
         await send_to_backend(message_data)
 
-        logger.info(f"✅ Edit event sent to backend for message {message.message_id}")
+        logger.info(f"✅ Edit event queued for backend: message {message.message_id}")
 
     except Exception as e:
         logger.exception(f"❌ Error processing edited message: {e}")
@@ -343,26 +597,38 @@ async def main():
     logger.info("🚀 HR Support Analytics Bot starting...")
     logger.info(f"📡 Backend URL: {BACKEND_URL}")
     logger.info(f"💾 Media directory: {MEDIA_DIR.absolute()}")
+    logger.info(
+        f"📦 Backend batching: {BACKEND_BATCH_SIZE} msgs / {BACKEND_FLUSH_INTERVAL}s"
+    )
+    logger.info(f"📥 Media download workers: {MEDIA_DOWNLOAD_WORKERS}")
     logger.info("=" * 60)
 
+    await backend_batcher.start()
+    await media_downloader.start()
+
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{BACKEND_URL}/api/stats/overview/",
-                timeout=aiohttp.ClientTimeout(total=5),
-            ) as response:
-                if response.status == 200:
-                    logger.info("✅ Backend connection successful")
-                else:
-                    logger.warning(f"⚠️ Backend returned status {response.status}")
+        async with backend_batcher.session.get(
+            f"{BACKEND_URL}/api/stats/overview/",
+            timeout=aiohttp.ClientTimeout(total=5),
+        ) as response:
+            if response.status == 200:
+                logger.info("✅ Backend connection successful")
+            else:
+                logger.warning(f"⚠️ Backend returned status {response.status}")
     except Exception as e:
         logger.error(f"❌ Cannot connect to backend: {e}")
         logger.warning("⚠️ Bot will continue but messages won't be saved")
 
     logger.info("🔄 Starting polling...")
-    await dp.start_polling(
-        bot, allowed_updates=dp.resolve_used_update_types(), drop_pending_updates=True
-    )
+    try:
+        await dp.start_polling(
+            bot,
+            allowed_updates=dp.resolve_used_update_types(),
+            drop_pending_updates=True,
+        )
+    finally:
+        await media_downloader.close()
+        await backend_batcher.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,131 @@
+"""
+In-process identity cache for ingestion.
+
+The same senders and groups appear in nearly every webhook call, so ingest
+keeps a bounded LRU mapping telegram_id -> (pk, fingerprint). The fingerprint
+is a hash of the fields the bot sends (username/first/last/is_bot for users,
+title for groups); when it matches, the row is known to be up to date and no
+query is needed. Entries expire after IDENTITY_CACHE_TTL seconds so rows
+changed or deleted by another process are picked up again. Admin edits
+invalidate entries explicitly (core/admin.py).
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+def fingerprint(values: Dict[str, Any]) -> str:
+    """
+    Hash of identity fields.
+
+    Args:
+        values: Field values as sent by the bot
+
+    Returns:
+        str: Short sha1 hex digest
+    """
+    raw = "\x1f".join(f"{key}={values[key]}" for key in sorted(values))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class IdentityCache:
+    """Bounded LRU of telegram_id -> (pk, fingerprint) with a TTL."""
+
+    def __init__(self, name: str, maxsize: Optional[int] = None, ttl=None):
+        self.name = name
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries: "OrderedDict[int, Tuple[int, str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def maxsize(self) -> int:
+        if self._maxsize is None:
+            from django.conf import settings
+
+            self._maxsize = settings.IDENTITY_CACHE_SIZE
+        return self._maxsize
+
+    @property
+    def ttl(self) -> float:
+        if self._ttl is None:
+            from django.conf import settings
+
+            self._ttl = settings.IDENTITY_CACHE_TTL
+        return self._ttl
+
+    def lookup(self, telegram_id: int, fp: str) -> Optional[int]:
+        """
+        Return the cached pk if the row is known to match `fp`.
+
+        Args:
+            telegram_id: Telegram user/chat id
+            fp: Fingerprint of the incoming values
+
+        Returns:
+            Optional[int]: pk on hit, None on miss (unknown, expired or changed)
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(telegram_id)
+            if entry is None or entry[1] != fp or entry[2] < now:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(telegram_id)
+            self.hits += 1
+            return entry[0]
+
+    def set_many(self, entries: Dict[int, Tuple[int, str]]) -> None:
+        """
+        Store (pk, fingerprint) pairs.
+
+        Args:
+            entries: {telegram_id: (pk, fingerprint)}
+        """
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for telegram_id, (pk, fp) in entries.items():
+                self._entries[telegram_id] = (pk, fp, expires_at)
+                self._entries.move_to_end(telegram_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, telegram_ids: Iterable[int]) -> None:
+        """Drop entries (admin edits, deletes)."""
+        with self._lock:
+            for telegram_id in telegram_ids:
+                if self._entries.pop(telegram_id, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+        self.hits = self.misses = self.invalidations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters for this process.
+
+        Returns:
+            Dict[str, Any]: hits, misses, hit_rate, invalidations, size, maxsize
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+
+user_identity_cache = IdentityCache("users")
+group_identity_cache = IdentityCache("groups")
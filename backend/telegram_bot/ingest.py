@@ -0,0 +1,660 @@
+# telegram_bot/ingest.py
+# Bot payload'larini bazaga yozish (webhook va batch webhook uchun umumiy)
+#
+# Set-based ingest: butun batch uchun user, group va message'lar
+# bulk_create(update_conflicts=True) (INSERT ... ON CONFLICT DO UPDATE) bilan
+# yoziladi. Reply target'lar va eski textlar bitta so'rovda olinadi,
+# o'zgarmagan user/group qatorlari umuman yozilmaydi (identity cache
+# hit bo'lsa hatto o'qilmaydi ham).
+
+import json
+import logging
+from collections import Counter
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Subquery, Value, When
+
+from analytics.models import TermFrequency
+from analytics.overview import bump_overview
+from analytics.responses import update_question_responses
+from analytics.rollups import RollupBatch
+from analytics.tasks import enqueue_analyses
+from analytics.terms import TermBatch, counts_text, text_terms
+from analytics.user_stats import UserStatsBatch
+from analytics.utils import is_question
+from core.models import (
+    Message,
+    MessageHistory,
+    TelegramGroup,
+    TelegramUser,
+    build_search_name,
+    first_reply_subquery,
+)
+from telegram_bot.identity_cache import (
+    fingerprint,
+    group_identity_cache,
+    user_identity_cache,
+)
+
+logger = logging.getLogger(__name__)
+
+USER_FIELDS = ["username", "first_name", "last_name", "is_bot", "search_name"]
+GROUP_FIELDS = ["title", "search_name"]
+
+# update_or_create defaults bilan bir xil maydonlar
+MESSAGE_UPDATE_FIELDS = [
+    "user",
+    "text",
+    "media_type",
+    "media_file_id",
+    "media_file_unique_id",
+    "media_file_size",
+    "media_mime_type",
+    "media_file_path",
+    "media_file_name",
+    "local_file_present",
+    "reply_to_message_id",
+    "reply_to",
+    "thread_depth",
+    "forward_from_user_id",
+    "forward_from_chat_id",
+    "raw_json",
+    "is_edited",
+    "telegram_created_at",
+    "telegram_edited_at",
+    "updated_at",
+]
+
+
+def _parse_payload(data: dict) -> dict:
+    """
+    Payload'ni tekshirish va normallashtirish
+
+    Raises:
+        ValueError: Majburiy maydonlar yo'q yoki noto'g'ri formatda
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Payload must be an object")
+
+    for field in (
+        "message_id",
+        "group_id",
+        "group_name",
+        "sender_id",
+        "telegram_created_at",
+    ):
+        if data.get(field) is None:
+            raise ValueError(f"{field} is required")
+
+    event_type = data.get("event_type", "new_message")
+    is_edited = bool(data.get("is_edited", False)) or event_type == "edited_message"
+
+    telegram_edited_at = None
+    if data.get("telegram_edited_at"):
+        telegram_edited_at = datetime.fromisoformat(data.get("telegram_edited_at"))
+
+    return {
+        "event_type": event_type,
+        "is_edited": is_edited,
+        "message_id": int(data["message_id"]),
+        "group_id": int(data["group_id"]),
+        "sender_id": int(data["sender_id"]),
+        "user": {
+            "username": data.get("sender_username"),
+            "first_name": data.get("sender_first_name"),
+            "last_name": data.get("sender_last_name"),
+            "is_bot": data.get("is_bot", False),
+            "search_name": build_search_name(
+                data.get("sender_username"),
+                data.get("sender_first_name"),
+                data.get("sender_last_name"),
+            ),
+        },
+        "group": {
+            "title": data.get("group_name"),
+            "search_name": build_search_name(data.get("group_name")),
+        },
+        "reply_to_message_id": data.get("reply_to_message_id"),
+        "telegram_created_at": datetime.fromisoformat(data["telegram_created_at"]),
+        "telegram_edited_at": telegram_edited_at,
+        "raw_json": json.loads(data.get("raw_json") or "{}"),
+        "fields": {
+            "text": data.get("message_text"),
+            "media_type": data.get("media_type", "text"),
+            "media_file_id": data.get("media_file_id"),
+            "media_file_unique_id": data.get("media_file_unique_id"),
+            "media_file_size": data.get("media_file_size"),
+            "media_mime_type": data.get("media_mime_type"),
+            "media_file_path": data.get("media_file_path"),
+            "media_file_name": data.get("media_file_name"),
+            "local_file_present": bool(data.get("media_file_path")),
+            "forward_from_user_id": data.get("forward_from_user_id"),
+            "forward_from_chat_id": data.get("forward_from_chat_id"),
+        },
+    }
+
+
+def _upsert_by_telegram_id(model, rows: dict, fields: list, cache) -> tuple:
+    """
+    telegram_id bo'yicha upsert (faqat yangi yoki o'zgargan qatorlar yoziladi)
+
+    Avval identity cache tekshiriladi: fingerprint mos kelsa qator o'zgarmagan,
+    so'rov kerak emas. Faqat cache miss bo'lganlar bazadan o'qiladi.
+
+    Args:
+        model: TelegramUser yoki TelegramGroup
+        rows: {telegram_id: {field: value}} - batch'dagi oxirgi qiymatlar
+        fields: Solishtiriladigan va yangilanadigan maydonlar
+        cache: IdentityCache
+
+    Returns:
+        tuple: ({telegram_id: model instance (pk bilan)}, yangi yaratilganlar soni)
+    """
+    resolved = {}
+    fingerprints = {}
+    misses = []
+
+    for telegram_id, values in rows.items():
+        fp = fingerprint(values)
+        pk = cache.lookup(telegram_id, fp)
+        if pk is not None:
+            resolved[telegram_id] = model(pk=pk, telegram_id=telegram_id, **values)
+        else:
+            fingerprints[telegram_id] = fp
+            misses.append(telegram_id)
+
+    if not misses:
+        return resolved, 0
+
+    existing = {
+        obj.telegram_id: obj
+        for obj in model.objects.filter(telegram_id__in=misses).only(
+            "id", "telegram_id", *fields
+        )
+    }
+
+    changed = []
+    for telegram_id in misses:
+        values = rows[telegram_id]
+        obj = existing.get(telegram_id)
+        if obj is not None and all(
+            getattr(obj, field) == value for field, value in values.items()
+        ):
+            resolved[telegram_id] = obj
+            continue
+        changed.append(model(telegram_id=telegram_id, **values))
+
+    if changed:
+        model.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=["telegram_id"],
+            update_fields=[*fields, "updated_at"],
+        )
+
+        missing_pk = [obj.telegram_id for obj in changed if obj.pk is None]
+        pks = dict(
+            model.objects.filter(telegram_id__in=missing_pk).values_list(
+                "telegram_id", "id"
+            )
+        )
+        for obj in changed:
+            if obj.pk is None:
+                obj.pk = pks[obj.telegram_id]
+            resolved[obj.telegram_id] = obj
+
+    # Rollback bo'lsa cache'da mavjud bo'lmagan pk qolmasligi uchun
+    entries = {
+        telegram_id: (resolved[telegram_id].pk, fingerprints[telegram_id])
+        for telegram_id in misses
+    }
+    transaction.on_commit(lambda: cache.set_many(entries))
+
+    created = sum(1 for obj in changed if obj.telegram_id not in existing)
+    return resolved, created
+
+
+def _fetch_messages(keys: set) -> dict:
+    """
+    (group pk, message_id) juftliklari bo'yicha mavjud xabarlarni bitta so'rovda olish
+
+    Returns:
+        dict: {(group pk, message_id): {id, text, is_edited, is_deleted,
+        sentiment, media_type, media_file_unique_id, media_file_path,
+        media_file_name, local_file_present, reply_to_id, thread_depth}}
+    """
+    by_group = {}
+    for group_pk, message_id in keys:
+        by_group.setdefault(group_pk, set()).add(message_id)
+
+    if not by_group:
+        return {}
+
+    query = Q()
+    for group_pk, message_ids in by_group.items():
+        query |= Q(group_id=group_pk, message_id__in=message_ids)
+
+    return {
+        (row.pop("group_id"), row.pop("message_id")): row
+        for row in Message.objects.filter(query).values(
+            "id",
+            "group_id",
+            "message_id",
+            "text",
+            "is_edited",
+            "is_deleted",
+            "sentiment",
+            "media_type",
+            "media_file_unique_id",
+            "media_file_path",
+            "media_file_name",
+            "local_file_present",
+            "reply_to_id",
+            "thread_depth",
+        )
+    }
+
+
+def ingest_messages(payloads: list) -> list:
+    """
+    Bir nechta payload'ni bitta tranzaksiyada set-based saqlash
+
+    Payload'lar kelgan tartibida qo'llanadi: bitta xabar batch ichida bir
+    necha marta kelsa (masalan, yangi + edit), oxirgi holat yoziladi va har
+    bir edit uchun MessageHistory qatori yaratiladi. Noto'g'ri payload'lar
+    alohida xato sifatida qaytariladi, qolganlari saqlanadi.
+
+    Args:
+        payloads: Bot payload'lari ro'yxati
+
+    Returns:
+        list: Har bir payload uchun natija (status + message_id, created,
+        event_type, is_edited yoki xato matni), payload tartibida
+    """
+    results = [None] * len(payloads)
+    parsed = []
+
+    for index, data in enumerate(payloads):
+        try:
+            parsed.append((index, _parse_payload(data)))
+        except Exception as e:
+            logger.error(f"❌ Batch item {index} xato: {e}")
+            results[index] = {
+                "index": index,
+                "status": "error",
+                "message_id": (
+                    data.get("message_id") if isinstance(data, dict) else None
+                ),
+                "message": str(e),
+            }
+
+    if not parsed:
+        return results
+
+    with transaction.atomic():
+        # 1. Users va groups (oxirgi kelgan qiymat yoziladi)
+        users, new_users = _upsert_by_telegram_id(
+            TelegramUser,
+            {item["sender_id"]: item["user"] for _, item in parsed},
+            USER_FIELDS,
+            user_identity_cache,
+        )
+        groups, _ = _upsert_by_telegram_id(
+            TelegramGroup,
+            {item["group_id"]: item["group"] for _, item in parsed},
+            GROUP_FIELDS,
+            group_identity_cache,
+        )
+
+        # 2. Mavjud xabarlar va reply target'lar - bitta so'rov
+        keys = set()
+        for _, item in parsed:
+            group_pk = groups[item["group_id"]].pk
+            keys.add((group_pk, item["message_id"]))
+            if item["reply_to_message_id"]:
+                keys.add((group_pk, item["reply_to_message_id"]))
+        known = _fetch_messages(keys)
+
+        # 3. Payload'larni tartib bilan qo'llash
+        messages = {}  # key -> Message (oxirgi holat)
+        pending_replies = {}  # key -> reply target key (target batch ichida)
+        reply_keys = {}  # key -> reply target key (barcha reply'lar)
+        created_keys = set()
+        current = {key: dict(row) for key, row in known.items()}
+        history = []  # (key, MessageHistory)
+
+        for index, item in parsed:
+            user = users[item["sender_id"]]
+            group = groups[item["group_id"]]
+            key = (group.pk, item["message_id"])
+            exists = key in current
+
+            if item["is_edited"] and exists:
+                history.append(
+                    (
+                        key,
+                        MessageHistory(
+                            old_text=current[key]["text"],
+                            new_text=item["fields"]["text"],
+                            edit_metadata={
+                                "edited_at": (
+                                    item["telegram_edited_at"].isoformat()
+                                    if item["telegram_edited_at"]
+                                    else None
+                                ),
+                                "event_type": item["event_type"],
+                            },
+                        ),
+                    )
+                )
+
+            reply_to_id = None
+            reply_keys.pop(key, None)
+            if item["reply_to_message_id"]:
+                reply_key = (group.pk, item["reply_to_message_id"])
+                reply_keys[key] = reply_key
+                if reply_key in known:
+                    reply_to_id = known[reply_key]["id"]
+                else:
+                    pending_replies[key] = reply_key
+
+            fields = dict(item["fields"])
+            # Media bot tomonidan alohida yuklanadi (PATCH /api/telegram/media/),
+            # shuning uchun edit payload'i saqlangan faylni o'chirmasligi kerak
+            previous = current.get(key)
+            if (
+                previous
+                and fields["media_file_path"] is None
+                and previous["media_file_path"]
+                and previous["media_file_unique_id"] == fields["media_file_unique_id"]
+            ):
+                fields["media_file_path"] = previous["media_file_path"]
+                fields["media_file_name"] = previous["media_file_name"]
+                fields["local_file_present"] = previous["local_file_present"]
+
+            message = Message(
+                message_id=item["message_id"],
+                user=user,
+                group=group,
+                reply_to_message_id=item["reply_to_message_id"],
+                reply_to_id=reply_to_id,
+                raw_json=item["raw_json"],
+                is_edited=item["is_edited"],
+                telegram_created_at=item["telegram_created_at"],
+                telegram_edited_at=item["telegram_edited_at"],
+                **fields,
+            )
+            if not exists:
+                created_keys.add(key)
+            messages[key] = message
+            current[key] = {
+                "text": message.text,
+                "media_file_unique_id": message.media_file_unique_id,
+                "media_file_path": message.media_file_path,
+                "media_file_name": message.media_file_name,
+                "local_file_present": message.local_file_present,
+            }
+
+            results[index] = {
+                "index": index,
+                "status": "success",
+                "message_id": item["message_id"],
+                "created": not exists,
+                "event_type": item["event_type"],
+                "is_edited": item["is_edited"],
+            }
+
+        depths = _thread_depths(messages, reply_keys, known)
+        for key, message in messages.items():
+            message.thread_depth = depths[key]
+
+        # 4. Message upsert - bitta INSERT ... ON CONFLICT DO UPDATE
+        Message.objects.bulk_create(
+            list(messages.values()),
+            update_conflicts=True,
+            unique_fields=["message_id", "group"],
+            update_fields=MESSAGE_UPDATE_FIELDS,
+        )
+        _resolve_missing_pks(messages)
+
+        # Batch ichida yaratilgan reply target'lar
+        in_batch_replies = []
+        for key, reply_key in pending_replies.items():
+            message = messages[key]
+            target = messages.get(reply_key)
+            if target is None:
+                logger.warning(
+                    f"Reply to message topilmadi: {message.reply_to_message_id}"
+                )
+                continue
+            message.reply_to_id = target.pk
+            in_batch_replies.append(message)
+        if in_batch_replies:
+            Message.objects.bulk_update(in_batch_replies, ["reply_to"])
+
+        # Reply target'larning reply_count va first_reply_at'i
+        reply_deltas = Counter()
+        for key, message in messages.items():
+            old_target = None if key in created_keys else known[key]["reply_to_id"]
+            if message.reply_to_id == old_target:
+                continue
+            if old_target:
+                reply_deltas[old_target] -= 1
+            if message.reply_to_id:
+                reply_deltas[message.reply_to_id] += 1
+        _apply_reply_counts(reply_deltas)
+
+        # Savollar va birinchi javob kechikishi
+        update_question_responses(
+            [
+                message
+                for key, message in messages.items()
+                if key in created_keys and is_question(message.text)
+            ],
+            set(reply_deltas),
+        )
+
+        # 5. Edit tarixi
+        if history:
+            for key, row in history:
+                row.message = messages[key]
+            MessageHistory.objects.bulk_create([row for _, row in history])
+
+        # 6. Soatlik/kunlik rollup'lar, so'z chastotasi, user statistikasi va
+        # overview snapshot
+        rollups = RollupBatch()
+        terms = TermBatch()
+        user_stats = UserStatsBatch()
+        new_edits = 0
+        media_counts = Counter()
+        group_counts = Counter()
+        for key, message in messages.items():
+            if key in created_keys:
+                rollups.add_message(
+                    message, message_count=1, edited_count=int(message.is_edited)
+                )
+                user_stats.add_message(message)
+                new_edits += int(message.is_edited)
+                media_counts[message.media_type] += 1
+                group_counts[message.group_id] += 1
+                if counts_text(message.media_type):
+                    terms.add_terms(
+                        message, TermFrequency.SOURCE_TEXT, text_terms(message.text)
+                    )
+                continue
+
+            old = known[key]
+            if message.media_type != old["media_type"]:
+                # Edit media'ni almashtirdi (masalan rasm -> video): counter'lar
+                # yangi media turiga ko'chadi (holati edit'dan oldingi)
+                rollups.move_media_type(
+                    Message(
+                        group_id=message.group_id,
+                        telegram_created_at=message.telegram_created_at,
+                        media_type=message.media_type,
+                        is_edited=old["is_edited"],
+                        is_deleted=old["is_deleted"],
+                        sentiment=old["sentiment"],
+                    ),
+                    old["media_type"],
+                )
+                user_stats.move_media_type(message, old["media_type"])
+                media_counts[old["media_type"]] -= 1
+                media_counts[message.media_type] += 1
+            if message.is_edited and not old["is_edited"]:
+                rollups.add_message(message, edited_count=1)
+                new_edits += 1
+            terms.add_text_change(
+                message,
+                old["text"] if counts_text(old["media_type"]) else None,
+                message.text if counts_text(message.media_type) else None,
+            )
+        rollups.flush()
+        terms.flush()
+        user_stats.flush()
+
+        transaction.on_commit(
+            lambda: bump_overview(
+                messages=len(created_keys),
+                edited=new_edits,
+                users=new_users,
+                media_counts=media_counts,
+                group_counts=group_counts,
+            )
+        )
+
+        # 7. AI tahlil navbati (bulk_create post_save signal'larini chaqirmaydi)
+        enqueue_analyses(
+            [
+                message
+                for key, message in messages.items()
+                if key in created_keys or (message.is_edited and message.text)
+            ]
+        )
+
+    logger.info(
+        f"📦 Ingest: {len(messages)} messages ({len(created_keys)} new, "
+        f"{len(history)} edits), {len(payloads) - len(parsed)} rejected"
+    )
+    return results
+
+
+def _thread_depths(messages: dict, reply_keys: dict, known: dict) -> dict:
+    """
+    Batch'dagi xabarlarning thread chuqurligi
+
+    Reply target batch ichida bo'lsa uning hisoblangan chuqurligi, bazada
+    bo'lsa saqlangan thread_depth ishlatiladi. Target topilmasa xabar
+    root (0) hisoblanadi.
+
+    Returns:
+        dict: {key: thread_depth}
+    """
+    depths = {}
+
+    for start in messages:
+        # Hisoblanmagan ota-xabarlar zanjirini yig'ish
+        chain = []
+        key = start
+        while key not in depths:
+            chain.append(key)
+            reply_key = reply_keys.get(key)
+            if reply_key is None or reply_key in chain:
+                base = 0
+                break
+            if reply_key in messages:
+                key = reply_key
+                continue
+            base = known[reply_key]["thread_depth"] + 1 if reply_key in known else 0
+            break
+        else:
+            base = depths[key] + 1
+
+        for offset, key in enumerate(reversed(chain)):
+            depths[key] = base + offset
+
+    return depths
+
+
+def _apply_reply_counts(deltas: Counter) -> None:
+    """
+    Reply target'larning reply_count va first_reply_at'ini bitta UPDATE bilan
+    yangilash
+
+    reply_count delta bilan o'zgaradi. first_reply_at boshqa user'ning eng
+    birinchi javobi (QuestionResponse bilan bir xil ta'rif), o'z xabariga
+    javob hisobga olinmaydi - u tegilgan target'lar uchun SQL'da qayta
+    hisoblanadi, shuning uchun boshqa xabarga ko'chirilgan reply ham to'g'ri
+    ayriladi.
+    """
+    if not deltas:
+        return
+
+    first_reply = first_reply_subquery(Message)
+    updates = {
+        "first_reply_at": Subquery(first_reply.values("telegram_created_at")[:1])
+    }
+    changed = {pk: delta for pk, delta in deltas.items() if delta}
+    if changed:
+        updates["reply_count"] = F("reply_count") + Case(
+            *[When(pk=pk, then=Value(delta)) for pk, delta in changed.items()],
+            default=Value(0),
+        )
+
+    Message.objects.filter(pk__in=list(deltas)).update(**updates)
+
+
+def _resolve_missing_pks(messages: dict) -> None:
+    """bulk_create pk qaytarmagan backend'lar uchun pk'larni bitta so'rovda olish"""
+    missing = {key for key, message in messages.items() if message.pk is None}
+    if not missing:
+        return
+    for key, row in _fetch_messages(missing).items():
+        messages[key].pk = row["id"]
+
+
+def mark_deleted(queryset) -> int:
+    """
+    Xabarlarni o'chirilgan deb belgilash (rollup'lar bilan birga)
+
+    Args:
+        queryset: Message queryset
+
+    Returns:
+        int: Yangi belgilangan xabarlar soni
+    """
+    with transaction.atomic():
+        messages = list(
+            queryset.filter(is_deleted=False).only(
+                "id", "group_id", "media_type", "telegram_created_at"
+            )
+        )
+        if not messages:
+            return 0
+
+        Message.objects.filter(pk__in=[m.pk for m in messages]).update(is_deleted=True)
+
+        rollups = RollupBatch()
+        for message in messages:
+            rollups.add_message(message, deleted_count=1)
+        rollups.flush()
+
+        transaction.on_commit(lambda: bump_overview(deleted=len(messages)))
+
+    return len(messages)
+
+
+def ingest_message(data: dict) -> dict:
+    """
+    Bitta bot payload'ini saqlash
+
+    Raises:
+        ValueError: Payload noto'g'ri bo'lsa
+    """
+    result = ingest_messages([data])[0]
+    if result["status"] == "error":
+        raise ValueError(result["message"])
+    return {
+        key: value for key, value in result.items() if key not in ("index", "status")
+    }
@@ -0,0 +1,303 @@
+"""
+Media backfill and integrity sweep (`python manage.py sync_media`).
+
+Messages whose download failed in the bot never get a local file, and
+every view then falls back to the live Telegram proxy. `sync_missing_media`
+walks messages with a media_file_id but no `local_file_present` flag,
+reuses a stored blob when one exists and otherwise downloads the file into
+the content-addressed store (size and sha256 recorded on the MediaBlob).
+Downloads run in a thread pool under a global rate limit; only the main
+thread touches the database.
+
+`verify_local_files` re-checks the flag against the filesystem: missing or
+truncated files clear it (the next sync downloads them again), files that
+appeared on disk set it.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+import requests
+from django.db.models import Q
+
+from core.media_store import BlobWriter, absolute_path, attach_blob
+from core.models import MediaBlob, Message
+from telegram_bot.telegram_files import TelegramFileError, telegram_file_resolver
+
+logger = logging.getLogger(__name__)
+
+# Unique files handed to the thread pool per round (x workers)
+FILES_PER_WORKER = 10
+
+VERIFY_BATCH_SIZE = 1000
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(self._next, now)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def download_file(
+    file_id: str,
+    file_unique_id: str,
+    file_name: Optional[str],
+    mime_type: Optional[str],
+    limiter: RateLimiter,
+) -> Optional[BlobWriter]:
+    """
+    Download one file into a BlobWriter (no database access).
+
+    Returns:
+        Optional[BlobWriter]: Complete writer to `finish()`, None on failure
+    """
+    limiter.wait()
+    try:
+        file_path, response = telegram_file_resolver.open(
+            file_id, headers={"Accept-Encoding": "identity"}, timeout=60
+        )
+    except (TelegramFileError, requests.RequestException) as e:
+        logger.warning(f"⚠️ Telegram getFile failed for {file_unique_id}: {e}")
+        return None
+
+    with response:
+        if response.status_code != 200:
+            logger.warning(
+                f"⚠️ Download of {file_unique_id} failed: HTTP {response.status_code}"
+            )
+            return None
+
+        content_length = response.headers.get("Content-Length")
+        writer = BlobWriter(
+            file_unique_id,
+            file_name=file_name or os.path.basename(file_path),
+            mime_type=mime_type,
+            expected_size=int(content_length) if content_length else None,
+        )
+        try:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                writer.write(chunk)
+        except requests.RequestException as e:
+            logger.warning(f"⚠️ Download of {file_unique_id} interrupted: {e}")
+            writer.discard()
+            return None
+
+    return writer if writer.active else None
+
+
+def sync_missing_media(
+    workers: int = 4,
+    rate: float = 5.0,
+    limit: Optional[int] = None,
+    progress=None,
+) -> Dict[str, int]:
+    """
+    Store files of messages without a local copy.
+
+    Args:
+        workers: Concurrent downloads
+        rate: Maximum download starts per second (all workers)
+        limit: Maximum number of unique files to process
+        progress: Optional callback(stats dict) after every round
+
+    Returns:
+        Dict[str, int]: downloaded, reused, failed, skipped, messages, bytes
+    """
+    stats = {
+        "downloaded": 0,
+        "reused": 0,
+        "failed": 0,
+        "skipped": 0,
+        "messages": 0,
+        "bytes": 0,
+    }
+    limiter = RateLimiter(rate)
+    window = max(1, workers) * FILES_PER_WORKER
+    processed = 0
+    last_pk = 0
+
+    missing = (
+        Message.objects.filter(local_file_present=False, media_file_id__isnull=False)
+        .exclude(media_file_id="")
+        .only(
+            "id",
+            "media_file_id",
+            "media_file_unique_id",
+            "media_file_name",
+            "media_mime_type",
+            "media_blob_id",
+        )
+        .order_by("pk")
+    )
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while limit is None or processed < limit:
+            # Keyset by pk: files that failed are not retried in the same run
+            batch = list(missing.filter(pk__gt=last_pk)[: window * 4])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            files: Dict[str, List[Message]] = {}
+            for message in batch:
+                if not message.media_file_unique_id:
+                    stats["skipped"] += 1
+                    continue
+                files.setdefault(message.media_file_unique_id, []).append(message)
+
+            if limit is not None:
+                files = dict(list(files.items())[: limit - processed])
+            processed += len(files)
+
+            blobs = {
+                blob.file_unique_id: blob
+                for blob in MediaBlob.objects.filter(file_unique_id__in=list(files))
+            }
+
+            futures = {}
+            for file_unique_id, messages in files.items():
+                blob = blobs.get(file_unique_id)
+                if blob is not None and os.path.exists(absolute_path(blob.file_path)):
+                    stats["messages"] += _attach(messages, blob)
+                    stats["reused"] += 1
+                    continue
+
+                first = messages[0]
+                future = pool.submit(
+                    download_file,
+                    first.media_file_id,
+                    file_unique_id,
+                    first.media_file_name,
+                    first.media_mime_type,
+                    limiter,
+                )
+                futures[future] = file_unique_id
+
+            for future in as_completed(futures):
+                file_unique_id = futures[future]
+                writer = future.result()
+                blob = writer.finish() if writer is not None else None
+                if blob is None:
+                    stats["failed"] += 1
+                    continue
+                _repoint_blob(blob, writer)
+                stats["messages"] += _attach(files[file_unique_id], blob)
+                stats["downloaded"] += 1
+                stats["bytes"] += writer.size
+
+            if progress is not None:
+                progress(stats)
+
+    return stats
+
+
+def _attach(messages: List[Message], blob: MediaBlob) -> int:
+    """attach_blob, plus the flag for messages already pointing to `blob`."""
+    attach_blob(messages, blob)
+    Message.objects.filter(pk__in=[m.pk for m in messages]).update(
+        local_file_present=True
+    )
+    return len(messages)
+
+
+def _repoint_blob(blob: MediaBlob, writer: BlobWriter) -> None:
+    """An existing blob whose file was lost now uses the fresh download."""
+    if blob.file_path == writer.relative_path or os.path.exists(
+        absolute_path(blob.file_path)
+    ):
+        return
+    updates = {
+        "file_path": writer.relative_path,
+        "file_size": writer.size,
+        "sha256": writer.sha256,
+    }
+    MediaBlob.objects.filter(pk=blob.pk).update(**updates)
+    for field, value in updates.items():
+        setattr(blob, field, value)
+
+
+def verify_local_files(progress=None) -> Dict[str, int]:
+    """
+    Re-check `local_file_present` against the filesystem.
+
+    A file counts as present if it exists and, when the blob recorded a
+    size, has that size.
+
+    Returns:
+        Dict[str, int]: checked, cleared, set
+    """
+    stats = {"checked": 0, "cleared": 0, "set": 0}
+    last_pk = 0
+
+    rows = (
+        Message.objects.filter(
+            Q(media_file_path__isnull=False) | Q(media_blob__isnull=False)
+        )
+        .values_list(
+            "id",
+            "local_file_present",
+            "media_file_path",
+            "media_blob__file_path",
+            "media_blob__file_size",
+        )
+        .order_by("pk")
+    )
+
+    while True:
+        batch = list(rows.filter(pk__gt=last_pk)[:VERIFY_BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+
+        to_set, to_clear = [], []
+        for pk, flagged, file_path, blob_path, blob_size in batch:
+            present = False
+            if blob_path:
+                present = _file_ok(blob_path, blob_size)
+            if not present and file_path:
+                present = _file_ok(file_path, None)
+            if present and not flagged:
+                to_set.append(pk)
+            elif flagged and not present:
+                to_clear.append(pk)
+
+        if to_set:
+            Message.objects.filter(pk__in=to_set).update(local_file_present=True)
+        if to_clear:
+            Message.objects.filter(pk__in=to_clear).update(local_file_present=False)
+
+        stats["checked"] += len(batch)
+        stats["set"] += len(to_set)
+        stats["cleared"] += len(to_clear)
+        if progress is not None:
+            progress(stats)
+
+    # Flag without any path (legacy rows)
+    stats["cleared"] += Message.objects.filter(
+        local_file_present=True, media_file_path__isnull=True, media_blob__isnull=True
+    ).update(local_file_present=False)
+
+    return stats
+
+
+def _file_ok(relative_path: str, expected_size: Optional[int]) -> bool:
+    try:
+        size = os.path.getsize(absolute_path(relative_path))
+    except OSError:
+        return False
+    return not expected_size or size == expected_size
@@ -5,20 +5,78 @@ import os
 
 from django.conf import settings
 from django.db.models import Q
-from django.http import FileResponse, JsonResponse
+from django.http import JsonResponse
 from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 
+from core.media_serving import serve_media_file
+from core.media_store import resolve_media_path
 from core.models import Message
+from core.search import search_messages
 
-from .serializers import MessageSerializer
+from .serializers import MessageListSerializer, MessageSerializer
 
 logger = logging.getLogger(__name__)
 
+# Cursor rejimida ro'yxat uchun yuklanadigan ustunlar (MessageListSerializer)
+LIST_ONLY_FIELDS = [
+    "id",
+    "message_id",
+    "text",
+    "media_type",
+    "is_deleted",
+    "is_edited",
+    "telegram_created_at",
+    "user__telegram_id",
+    "user__first_name",
+    "user__last_name",
+    "group__title",
+]
+
+
+def user_name_filter(name: str) -> Q:
+    """
+    Foydalanuvchi nomi bo'yicha filtr (TelegramUser.full_name ko'rinishida)
+
+    "Ism Familiya", "Ism", "username" yoki "User <telegram_id>".
+    """
+    name = name.strip()
+    condition = Q(user__first_name=name) | Q(user__username=name.lstrip("@"))
+
+    first_name, _, last_name = name.partition(" ")
+    if last_name:
+        condition |= Q(user__first_name=first_name, user__last_name=last_name)
+
+    if first_name == "User" and last_name.isdigit():
+        condition |= Q(user__telegram_id=int(last_name))
+
+    return condition
+
+
+class MessageCursorPagination(CursorPagination):
+    """
+    Keyset pagination (telegram_created_at, id) bo'yicha
+
+    COUNT(*) va OFFSET yo'q: chuqur va katta sahifalar ham birinchi sahifa
+    narxida. Javobda faqat next/previous cursor'lar bo'ladi.
+    """
+
+    ordering = ("-telegram_created_at", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
 
 class MessageViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing messages
+
+    List ikki rejimda ishlaydi:
+    - default: PageNumberPagination + MessageSerializer (count bilan)
+    - ?pagination=cursor (yoki ?cursor=): MessageCursorPagination +
+      MessageListSerializer, ?fields=id,text,... bilan maydonlarni tanlash mumkin
+      (noma'lum maydon nomi: 400, javobda valid_fields)
     """
 
     queryset = Message.objects.select_related("user", "group").all()
@@ -26,26 +84,81 @@ class MessageViewSet(viewsets.ReadOnlyModelViewSet):
 
     lookup_url_kwarg = "message_id"
 
+    @property
+    def use_cursor(self):
+        params = self.request.query_params
+        return self.action == "list" and (
+            params.get("pagination") == "cursor" or "cursor" in params
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if self.use_cursor:
+                self._paginator = MessageCursorPagination()
+            else:
+                self._paginator = (
+                    self.pagination_class() if self.pagination_class else None
+                )
+        return self._paginator
+
+    def get_serializer_class(self):
+        if self.use_cursor:
+            return MessageListSerializer
+        return super().get_serializer_class()
+
+    @property
+    def requested_fields(self):
+        """?fields=id,text,... (faqat cursor rejimida)"""
+        if not self.use_cursor:
+            return []
+        fields = self.request.query_params.get("fields", "")
+        return [f.strip() for f in fields.split(",") if f.strip()]
+
+    def get_serializer(self, *args, **kwargs):
+        if self.requested_fields:
+            kwargs["fields"] = self.requested_fields
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        # Noma'lum maydon nomlari: 400 (bazaga so'rov yuborilmasdan)
+        valid_fields = MessageListSerializer.Meta.fields
+        unknown = [f for f in self.requested_fields if f not in valid_fields]
+        if unknown:
+            return JsonResponse(
+                {
+                    "error": f"Noma'lum maydonlar: {', '.join(unknown)}",
+                    "valid_fields": valid_fields,
+                },
+                status=400,
+            )
+        return super().list(request, *args, **kwargs)
+
     def get_queryset(self):
         queryset = super().get_queryset()
+        if self.use_cursor:
+            queryset = queryset.only(*LIST_ONLY_FIELDS)
 
         group_param = self.request.query_params.get("group")
         if group_param:
-            queryset = queryset.filter(
-                Q(group__title=group_param) | Q(group__name=group_param)
-            )
+            queryset = queryset.filter(group__title=group_param)
 
         user_param = self.request.query_params.get("user")
         if user_param:
-            queryset = queryset.filter(
-                Q(user__full_name=user_param)
-                | Q(user__first_name=user_param)
-                | Q(user__username=user_param)
-            )
+            queryset = queryset.filter(user_name_filter(user_param))
+
+        # Typeahead'dan tanlangan id (Telegram id)
+        group_id = self.request.query_params.get("group_id")
+        if group_id:
+            queryset = queryset.filter(group__telegram_id=group_id)
+
+        user_id = self.request.query_params.get("user_id")
+        if user_id:
+            queryset = queryset.filter(user__telegram_id=user_id)
 
         search = self.request.query_params.get("search")
         if search:
-            queryset = queryset.filter(text__icontains=search)
+            queryset = search_messages(queryset, search)
 
         date_from = self.request.query_params.get("date_from")
         if date_from:
@@ -59,6 +172,9 @@ class MessageViewSet(viewsets.ReadOnlyModelViewSet):
         if sentiment:
             queryset = queryset.filter(sentiment=sentiment)
 
+        # Qidiruvda eng mos natijalar birinchi (cursor rejimi vaqt bo'yicha)
+        if search:
+            return queryset.order_by("-search_rank", "-telegram_created_at")
         return queryset.order_by("-telegram_created_at")
 
     @action(detail=True, methods=["get"], url_path="file")
@@ -79,33 +195,19 @@ class MessageViewSet(viewsets.ReadOnlyModelViewSet):
                 logger.warning(f"No media_file_path for message {message_id}")
                 return JsonResponse({"error": "Media yo'q"}, status=404)
 
-            if not os.path.isabs(message.media_file_path):
-                file_path = os.path.join(settings.MEDIA_ROOT, message.media_file_path)
-            else:
-                file_path = message.media_file_path
-
+            file_path = resolve_media_path(message)
             logger.info(f"File path: {file_path}")
 
-            if not os.path.exists(file_path):
-                logger.error(f"File not found: {file_path}")
+            if not file_path:
+                logger.error(f"File not found: {message.media_file_path}")
                 return JsonResponse({"error": "Fayl topilmadi"}, status=404)
 
-            content_types = {
-                "photo": "image/jpeg",
-                "video": "video/mp4",
-                "voice": "audio/ogg",
-                "audio": "audio/mpeg",
-                "document": "application/octet-stream",
-                "sticker": "image/webp",
-            }
-
-            return FileResponse(
-                open(file_path, "rb"),
-                content_type=content_types.get(
-                    message.media_type, "application/octet-stream"
-                ),
+            return serve_media_file(
+                request,
+                file_path,
+                message,
+                file_name=message.media_file_name or os.path.basename(file_path),
                 as_attachment=True,
-                filename=message.media_file_name or os.path.basename(file_path),
             )
 
         except Message.DoesNotExist:
@@ -59,6 +59,7 @@ class MessageSerializer(serializers.ModelSerializer):
     group = TelegramGroupSerializer(read_only=True)
     analysis = MessageAnalysisSerializer(read_only=True)
     has_media = serializers.BooleanField(read_only=True)
+    has_local_file = serializers.BooleanField(read_only=True)
     is_reply = serializers.BooleanField(read_only=True)
 
     class Meta:
@@ -84,6 +85,7 @@ class MessageSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
             "has_media",
+            "has_local_file",
             "is_reply",
             "analysis",
         ]
@@ -95,6 +97,16 @@ class MessageListSerializer(serializers.ModelSerializer):
     user_name = serializers.CharField(source="user.full_name", read_only=True)
     group_name = serializers.CharField(source="group.title", read_only=True)
 
+    def __init__(self, *args, fields=None, **kwargs):
+        """fields: faqat shu maydonlarni qaytarish (noma'lum nom: ValueError)"""
+        super().__init__(*args, **kwargs)
+        if fields:
+            unknown = [name for name in fields if name not in self.fields]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     class Meta:
         model = Message
         fields = [
@@ -0,0 +1,224 @@
+"""
+Shared Telegram getFile resolver for the media endpoints.
+
+Opening a media item needs the file's download path from the Bot API
+`getFile` method. Resolved paths stay valid for about an hour, so they are
+cached per process by media_file_id for TELEGRAM_FILE_CACHE_TTL seconds
+(bounded LRU). Concurrent lookups of the same file_id share one upstream
+call (single-flight), and all Bot API traffic - getFile and file
+downloads - goes through one pooled requests.Session, so repeated opens
+skip both the round-trip and the TLS handshake. Failures are not cached.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_BASE = "https://api.telegram.org"
+
+
+class TelegramFileError(Exception):
+    """getFile answered ok=false (unknown file_id, file too big, ...)."""
+
+    def __init__(self, description: Optional[str] = None):
+        super().__init__(description or "Telegram getFile failed")
+        self.description = description
+
+
+class _Flight:
+    """One in-progress getFile call that other threads can wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.file_path: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class TelegramFileResolver:
+    """TTL LRU of media_file_id -> Telegram file_path with single-flight."""
+
+    def __init__(
+        self,
+        maxsize: Optional[int] = None,
+        ttl: Optional[float] = None,
+        timeout: float = 10,
+    ):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self.timeout = timeout
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @property
+    def maxsize(self) -> int:
+        if self._maxsize is None:
+            from django.conf import settings
+
+            self._maxsize = settings.TELEGRAM_FILE_CACHE_SIZE
+        return self._maxsize
+
+    @property
+    def ttl(self) -> float:
+        if self._ttl is None:
+            from django.conf import settings
+
+            self._ttl = settings.TELEGRAM_FILE_CACHE_TTL
+        return self._ttl
+
+    @property
+    def session(self) -> requests.Session:
+        """Pooled keep-alive session for api.telegram.org."""
+        if self._session is None:
+            from django.conf import settings
+
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=1,
+                        pool_maxsize=settings.TELEGRAM_HTTP_POOL_SIZE,
+                    )
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    def resolve(self, file_id: str) -> str:
+        """
+        Telegram file_path for a file_id (cached).
+
+        Args:
+            file_id: Message.media_file_id
+
+        Returns:
+            str: Path for `file_url()`
+
+        Raises:
+            TelegramFileError: getFile answered ok=false
+            requests.RequestException: Network error / timeout
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(file_id)
+            if entry is not None and entry[1] >= now:
+                self._entries.move_to_end(file_id)
+                self.hits += 1
+                return entry[0]
+
+            flight = self._flights.get(file_id)
+            leader = flight is None
+            if leader:
+                flight = self._flights[file_id] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait(self.timeout * 2)
+            if flight.error is not None:
+                raise flight.error
+            if flight.file_path is None:
+                raise requests.Timeout(f"getFile {file_id} did not finish")
+            return flight.file_path
+
+        try:
+            flight.file_path = self._get_file(file_id)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if flight.file_path is not None:
+                    self._entries[file_id] = (
+                        flight.file_path,
+                        time.monotonic() + self.ttl,
+                    )
+                    self._entries.move_to_end(file_id)
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+                del self._flights[file_id]
+            flight.done.set()
+
+        return flight.file_path
+
+    def open(
+        self, file_id: str, headers: Optional[dict] = None, timeout: float = 30
+    ) -> Tuple[str, requests.Response]:
+        """
+        Start a streamed download of a file.
+
+        A cached path that has expired (404) is resolved once more.
+
+        Returns:
+            Tuple[str, requests.Response]: (file_path, streaming response)
+        """
+        for attempt in range(2):
+            file_path = self.resolve(file_id)
+            response = self.session.get(
+                self.file_url(file_path), headers=headers, timeout=timeout, stream=True
+            )
+            if response.status_code != 404 or attempt:
+                return file_path, response
+            response.close()
+            self.invalidate(file_id)
+
+    def file_url(self, file_path: str) -> str:
+        """Download URL of a resolved file_path."""
+        return f"{API_BASE}/file/bot{self._bot_token()}/{file_path}"
+
+    def invalidate(self, file_id: str) -> None:
+        """Drop a cached path (download answered 404 - path expired)."""
+        with self._lock:
+            self._entries.pop(file_id, None)
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+        self.hits = self.misses = self.coalesced = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters for this process.
+
+        Returns:
+            Dict[str, Any]: hits, misses, coalesced, hit_rate, size, maxsize
+        """
+        total = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (
+                round((self.hits + self.coalesced) / total, 3) if total else 0.0
+            ),
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+    def _bot_token(self) -> str:
+        from django.conf import settings
+
+        return settings.TELEGRAM_BOT_TOKEN
+
+    def _get_file(self, file_id: str) -> str:
+        response = self.session.get(
+            f"{API_BASE}/bot{self._bot_token()}/getFile",
+            params={"file_id": file_id},
+            timeout=self.timeout,
+        )
+        data = response.json()
+        if not data.get("ok"):
+            raise TelegramFileError(data.get("description"))
+        return data["result"]["file_path"]
+
+
+telegram_file_resolver = TelegramFileResolver()
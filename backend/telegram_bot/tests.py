@@ -1,3 +1,430 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Message, MessageHistory, TelegramUser
+from telegram_bot.identity_cache import group_identity_cache, user_identity_cache
+from telegram_bot.ingest import ingest_messages
+from telegram_bot.serializers import MessageListSerializer
+
+
+def payload(message_id, text="Salom", minute=0, **extra):
+    """Bot payload'i (default: -100 guruhidagi 1-user'ning text xabari)"""
+    data = {
+        "message_id": message_id,
+        "group_id": -100,
+        "group_name": "Test",
+        "sender_id": 1,
+        "sender_username": "ali",
+        "sender_first_name": "Ali",
+        "message_text": text,
+        "media_type": "text",
+        "telegram_created_at": f"2026-03-01T10:{minute:02d}:00+05:00",
+    }
+    data.update(extra)
+    return data
+
+
+class IngestTests(TestCase):
+    """ingest_messages: set-based saqlash natijalari bazada"""
+
+    def setUp(self):
+        user_identity_cache.clear()
+        group_identity_cache.clear()
+
+    def message(self, message_id):
+        return Message.objects.get(message_id=message_id)
+
+    def test_new_message_and_edit(self):
+        [result] = ingest_messages([payload(1, "Narxi qancha")])
+
+        self.assertEqual(result["status"], "success")
+        self.assertTrue(result["created"])
+        message = self.message(1)
+        self.assertEqual(message.text, "Narxi qancha")
+        self.assertEqual(message.user.username, "ali")
+        self.assertEqual(message.group.title, "Test")
+        self.assertFalse(message.is_edited)
+
+        [result] = ingest_messages(
+            [payload(1, "Narxi qancha?", is_edited=True, event_type="edited_message")]
+        )
+
+        self.assertFalse(result["created"])
+        self.assertTrue(result["is_edited"])
+        message = self.message(1)
+        self.assertEqual(message.text, "Narxi qancha?")
+        self.assertTrue(message.is_edited)
+        [history] = MessageHistory.objects.filter(message=message)
+        self.assertEqual(history.old_text, "Narxi qancha")
+        self.assertEqual(history.new_text, "Narxi qancha?")
+        self.assertEqual(history.edit_metadata["event_type"], "edited_message")
+
+    def test_new_message_and_edit_in_same_batch(self):
+        results = ingest_messages(
+            [payload(1, "Birinchi"), payload(1, "Ikkinchi", is_edited=True)]
+        )
+
+        self.assertEqual([r["created"] for r in results], [True, False])
+        self.assertEqual(Message.objects.count(), 1)
+        message = self.message(1)
+        self.assertEqual(message.text, "Ikkinchi")
+        self.assertTrue(message.is_edited)
+        [history] = MessageHistory.objects.filter(message=message)
+        self.assertEqual((history.old_text, history.new_text), ("Birinchi", "Ikkinchi"))
+
+    def test_reply_to_message_in_same_batch(self):
+        ingest_messages(
+            [
+                payload(1, "Savol", minute=0),
+                # O'z xabariga javob: reply_count'ga kiradi, first_reply_at'ga emas
+                payload(4, "Qo'shimcha", minute=1, reply_to_message_id=1),
+                payload(
+                    2,
+                    "Javob",
+                    minute=2,
+                    reply_to_message_id=1,
+                    sender_id=2,
+                    sender_username="vali",
+                ),
+                payload(3, "Rahmat", minute=3, reply_to_message_id=2),
+            ]
+        )
+
+        root, answer, thanks, self_reply = (self.message(i) for i in (1, 2, 3, 4))
+        self.assertEqual(answer.reply_to_id, root.pk)
+        self.assertEqual(thanks.reply_to_id, answer.pk)
+        self.assertEqual(
+            [m.thread_depth for m in (root, answer, thanks, self_reply)], [0, 1, 2, 1]
+        )
+        self.assertEqual([root.reply_count, answer.reply_count], [2, 1])
+        self.assertEqual(root.first_reply_at, answer.telegram_created_at)
+        self.assertEqual(answer.first_reply_at, thanks.telegram_created_at)
+        self.assertIsNone(thanks.first_reply_at)
+
+    def test_invalid_payloads_are_rejected_individually(self):
+        results = ingest_messages(
+            [
+                payload(1),
+                {"message_id": 2, "group_id": -100},
+                "not an object",
+                payload(3, telegram_created_at="kecha"),
+                payload(4),
+            ]
+        )
+
+        self.assertEqual(
+            [r["status"] for r in results],
+            ["success", "error", "error", "error", "success"],
+        )
+        self.assertEqual([r["index"] for r in results], [0, 1, 2, 3, 4])
+        self.assertEqual(results[1]["message_id"], 2)
+        self.assertIn("group_name", results[1]["message"])
+        self.assertEqual(
+            sorted(Message.objects.values_list("message_id", flat=True)), [1, 4]
+        )
+
+    def test_edit_keeps_stored_media_file(self):
+        photo = {
+            "media_type": "photo",
+            "media_file_id": "file-1",
+            "media_file_unique_id": "AgADphoto",
+        }
+        ingest_messages(
+            [payload(1, "Rasm", media_file_path="telegram/photos/a.jpg", **photo)]
+        )
+        self.assertTrue(self.message(1).local_file_present)
+
+        # Caption edit: bot faylni qayta yuklamaydi, path yuborilmaydi
+        ingest_messages([payload(1, "Yangi izoh", is_edited=True, **photo)])
+
+        message = self.message(1)
+        self.assertEqual(message.text, "Yangi izoh")
+        self.assertEqual(message.media_file_path, "telegram/photos/a.jpg")
+        self.assertTrue(message.local_file_present)
+
+        # Media almashtirildi: eski fayl endi bu xabarniki emas
+        ingest_messages(
+            [
+                payload(
+                    1,
+                    "Yangi rasm",
+                    is_edited=True,
+                    **dict(photo, media_file_unique_id="AgADother"),
+                )
+            ]
+        )
+
+        message = self.message(1)
+        self.assertIsNone(message.media_file_path)
+        self.assertFalse(message.local_file_present)
+
+    def test_identity_cache_hit_skips_user_and_group_queries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_messages([payload(1)])
+
+        with CaptureQueriesContext(connection) as hit:
+            with self.captureOnCommitCallbacks(execute=True):
+                ingest_messages([payload(2)])
+
+        identity_queries = [
+            q["sql"]
+            for q in hit.captured_queries
+            if '"telegram_users"' in q["sql"] or '"telegram_groups"' in q["sql"]
+        ]
+        self.assertEqual(identity_queries, [])
+        self.assertEqual(user_identity_cache.stats()["hits"], 1)
+        self.assertEqual(group_identity_cache.stats()["hits"], 1)
+
+        # Cache'siz: user va group uchun bittadan SELECT
+        user_identity_cache.clear()
+        group_identity_cache.clear()
+        with CaptureQueriesContext(connection) as miss:
+            ingest_messages([payload(3)])
+
+        self.assertEqual(len(miss.captured_queries) - len(hit.captured_queries), 2)
+
+    def test_changed_identity_is_written(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_messages([payload(1)])
+
+        ingest_messages([payload(2, sender_username="ali_new")])
+
+        self.assertEqual(user_identity_cache.stats()["hits"], 0)
+        self.assertEqual(TelegramUser.objects.get(telegram_id=1).username, "ali_new")
+        self.assertEqual(self.message(2).user.username, "ali_new")
+
+
+class WebhookBatchTests(TestCase):
+    """POST /api/telegram/webhook/batch/"""
+
+    url = "/api/telegram/webhook/batch/"
+
+    def setUp(self):
+        user_identity_cache.clear()
+        group_identity_cache.clear()
+
+    def post(self, data):
+        return self.client.post(self.url, data, content_type="application/json")
+
+    def test_mixed_batch_reports_per_item_results(self):
+        response = self.post(
+            {"messages": [payload(1), {"message_id": 2}, payload(3, minute=1)]}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body["count"], body["failed"]), (3, 1))
+        self.assertEqual(
+            [(r["index"], r["status"]) for r in body["results"]],
+            [(0, "success"), (1, "error"), (2, "success")],
+        )
+        self.assertEqual(
+            sorted(Message.objects.values_list("message_id", flat=True)), [1, 3]
+        )
+
+    def test_plain_list_body(self):
+        response = self.post([payload(1), payload(2)])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["failed"], 0)
+        self.assertEqual(Message.objects.count(), 2)
+
+    @override_settings(TELEGRAM_INGEST_MAX_BATCH_SIZE=2)
+    def test_batch_over_limit_is_rejected(self):
+        response = self.post({"messages": [payload(i) for i in range(1, 4)]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["status"], "error")
+        self.assertFalse(Message.objects.exists())
+
+    def test_body_without_message_list_is_rejected(self):
+        for body in ({"messages": payload(1)}, payload(1), {"messages": []}, '"text"'):
+            response = self.post(body)
+            self.assertEqual(response.status_code, 400, body)
+            self.assertEqual(response.json()["message"], "No messages provided")
+        self.assertFalse(Message.objects.exists())
+
+
+class TypeaheadTests(TestCase):
+    """Filtr typeahead'lari: counter'lardan o'qilgan xabarlar soni"""
+
+    def setUp(self):
+        user_identity_cache.clear()
+        group_identity_cache.clear()
+        cache.clear()
+        vali = {"sender_id": 2, "sender_username": "vali", "sender_first_name": "Vali"}
+        other = {"group_id": -200, "group_name": "Python Uzbekistan"}
+        ingest_messages(
+            [
+                payload(1),
+                payload(2),
+                payload(3, **vali),
+                payload(4, **vali, **other),
+                payload(5, **vali, **other),
+                payload(6, **vali, **other),
+            ]
+        )
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return [(row["id"], row["message_count"]) for row in response.json()]
+
+    def test_user_counts(self):
+        url = "/api/telegram/users/search/"
+
+        self.assertEqual(self.get(url), [(2, 4), (1, 2)])
+        # Nomi q bilan boshlangan user faolroqdan oldin
+        self.assertEqual(self.get(url, q="al"), [(1, 2), (2, 4)])
+        self.assertEqual(self.get(url, group_id=-100), [(1, 2), (2, 1)])
+        self.assertEqual(self.get(url, group_id=-200, q="v"), [(2, 3)])
+        self.assertEqual(self.get(url, group_id=-999), [])
+
+    def test_group_counts(self):
+        url = "/api/telegram/groups/search/"
+
+        self.assertEqual(self.get(url), [(-200, 3), (-100, 3)])
+        self.assertEqual(self.get(url, q="pyth"), [(-200, 3)])
+        self.assertEqual(self.get(url, q="uzb"), [(-200, 3)])
+        self.assertEqual(self.get(url, limit=1), [(-200, 3)])
+
+
+class MessageCursorTests(TestCase):
+    """/api/messages/ cursor rejimi va ?fields= tanlovi"""
+
+    url = "/api/messages/"
+
+    def setUp(self):
+        user_identity_cache.clear()
+        group_identity_cache.clear()
+        cache.clear()
+        ingest_messages([payload(i, f"Xabar {i}", minute=i) for i in range(1, 6)])
+
+    def get(self, url=None, **params):
+        response = self.client.get(url or self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_pages_are_keyset_ordered(self):
+        page = self.get(pagination="cursor", page_size=2)
+        self.assertNotIn("count", page)
+        texts = [row["text"] for row in page["results"]]
+
+        while page["next"]:
+            page = self.get(page["next"])
+            texts += [row["text"] for row in page["results"]]
+
+        self.assertEqual(texts, [f"Xabar {i}" for i in range(5, 0, -1)])
+
+    def test_default_mode_keeps_count(self):
+        page = self.get()
+
+        self.assertEqual(page["count"], 5)
+        self.assertIn("analysis", page["results"][0])
+
+    def test_fields_selects_columns(self):
+        page = self.get(pagination="cursor", fields="id, text,user_name")
+
+        self.assertEqual(set(page["results"][0]), {"id", "text", "user_name"})
+        self.assertEqual(page["results"][0]["user_name"], "Ali")
+
+    def test_unknown_fields_return_400(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                self.url, {"pagination": "cursor", "fields": "id,txt,analysis"}
+            )
+
+        self.assertEqual(response.status_code, 400)
+        body = response.json()
+        self.assertIn("txt, analysis", body["error"])
+        self.assertEqual(body["valid_fields"], MessageListSerializer.Meta.fields)
+
+
+class FakeTelegramResponse:
+    """requests.Response o'rnida: status, header'lar va bo'laklar"""
+
+    def __init__(self, status_code, body, headers):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start : start + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+@override_settings(TELEGRAM_BOT_TOKEN="token", MEDIA_PROXY_CHUNK_SIZE=4)
+class ProxyTeeTests(TestCase):
+    """proxy_telegram_file: butun fayl uzatilganda media store'ga yoziladi"""
+
+    BODY = b"0123456789"
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        ingest_messages(
+            [
+                payload(
+                    1,
+                    None,
+                    media_type="document",
+                    media_file_id="file-1",
+                    media_file_unique_id="AgADdoc",
+                    media_file_name="a.pdf",
+                )
+            ]
+        )
+        self.url = "/api/messages/1/proxy/"
+
+    def fetch(self, status_code, headers, **request_headers):
+        upstream = FakeTelegramResponse(status_code, self.BODY, headers)
+        with mock.patch(
+            "telegram_bot.views.telegram_file_resolver.open",
+            return_value=("documents/a.pdf", upstream),
+        ):
+            response = self.client.get(self.url, headers=request_headers)
+            body = b"".join(response.streaming_content)
+        self.assertTrue(upstream.closed)
+        return response, body
+
+    def stored_blob(self):
+        return Message.objects.select_related("media_blob").get().media_blob
+
+    def test_full_response_is_stored(self):
+        response, body = self.fetch(200, {"Content-Length": "10"})
+
+        self.assertEqual((response.status_code, body), (200, self.BODY))
+        self.assertEqual(self.stored_blob().file_size, 10)
+
+    def test_range_covering_whole_file_is_stored(self):
+        response, body = self.fetch(
+            206,
+            {"Content-Length": "10", "Content-Range": "bytes 0-9/10"},
+            Range="bytes=0-",
+        )
+
+        self.assertEqual((response.status_code, body), (206, self.BODY))
+        self.assertEqual(response["Content-Range"], "bytes 0-9/10")
+        self.assertEqual(self.stored_blob().file_size, 10)
+
+    def test_partial_range_is_not_stored(self):
+        for content_range in ("bytes 0-9/20", "bytes 5-14/15"):
+            response, _ = self.fetch(
+                206, {"Content-Length": "10", "Content-Range": content_range}
+            )
+            self.assertEqual(response.status_code, 206)
+            self.assertIsNone(self.stored_blob())
@@ -1,24 +1,39 @@
 # telegram_bot/views.py
 # ✅ FIXED IMPORTS
 
-import json
 import logging
 import os
-from datetime import datetime
+import re
+from datetime import datetime, time, timedelta
 
 import requests
 from django.conf import settings
-from django.db.models import Count
-from django.http import FileResponse, HttpResponse, JsonResponse
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
 # ✅ CORRECT IMPORT - from analytics, not telegram_bot
 from analytics.gemini_ai import analyze_sentiment_batch
-from core.models import Message, MessageHistory, TelegramGroup, TelegramUser
+from analytics.overview import ACTIVE_GROUP_MIN_MESSAGES, get_overview, total_groups
+from core.media_serving import media_content_type, serve_media_file
+from core.media_store import (
+    BlobWriter,
+    absolute_path,
+    attach_blob,
+    register_blob,
+    resolve_media_path,
+)
+from core.models import MediaBlob, Message, MessageHistory, TelegramGroup, TelegramUser
+from core.search import typeahead
+from telegram_bot.identity_cache import group_identity_cache, user_identity_cache
+from telegram_bot.ingest import ingest_message, ingest_messages, mark_deleted
 from telegram_bot.serializers import MessageSerializer
+from telegram_bot.telegram_files import TelegramFileError, telegram_file_resolver
 
 logger = logging.getLogger(__name__)
 
@@ -27,130 +42,174 @@ logger = logging.getLogger(__name__)
 def telegram_webhook(request):
     """Telegram bot'dan kelgan xabarlarni qabul qilish"""
     try:
-        data = request.data
-        event_type = data.get("event_type", "new_message")
-        is_edited = data.get("is_edited", False)
+        result = ingest_message(request.data)
 
-        logger.info(
-            f"📥 Webhook: event_type={event_type}, is_edited={is_edited}, message_id={data.get('message_id')}"
+        return Response(
+            {"status": "success", **result},
+            status=status.HTTP_200_OK,
         )
 
-        # User yaratish yoki yangilash
-        user, created = TelegramUser.objects.update_or_create(
-            telegram_id=data.get("sender_id"),
-            defaults={
-                "username": data.get("sender_username"),
-                "first_name": data.get("sender_first_name"),
-                "last_name": data.get("sender_last_name"),
-                "is_bot": data.get("is_bot", False),
-            },
+    except Exception as e:
+        logger.error(f"❌ Webhook xato: {str(e)}", exc_info=True)
+        return Response(
+            {"status": "error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST
         )
 
-        # Group yaratish yoki yangilash
-        group, created = TelegramGroup.objects.update_or_create(
-            telegram_id=data.get("group_id"),
-            defaults={
-                "title": data.get("group_name"),
-            },
-        )
 
-        # Reply to message topish
-        reply_to = None
-        if data.get("reply_to_message_id"):
-            try:
-                reply_to = Message.objects.get(
-                    message_id=data.get("reply_to_message_id"), group=group
-                )
-            except Message.DoesNotExist:
-                logger.warning(
-                    f"Reply to message topilmadi: {data.get('reply_to_message_id')}"
-                )
+@api_view(["POST"])
+def telegram_webhook_batch(request):
+    """Bot'dan kelgan xabarlar to'plamini bitta tranzaksiyada qabul qilish"""
+    try:
+        data = request.data
+        payloads = data.get("messages") if isinstance(data, dict) else data
 
-        # Telegram timestamps
-        telegram_created_at = datetime.fromisoformat(data.get("telegram_created_at"))
-        telegram_edited_at = None
-        if data.get("telegram_edited_at"):
-            telegram_edited_at = datetime.fromisoformat(data.get("telegram_edited_at"))
+        if not isinstance(payloads, list) or not payloads:
+            return Response(
+                {"status": "error", "message": "No messages provided"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        # Agar edit bo'lsa, eski textni saqlaymiz
-        old_text = None
-        if event_type == "edited_message" or is_edited:
-            try:
-                existing_message = Message.objects.get(
-                    message_id=data.get("message_id"), group=group
-                )
-                old_text = existing_message.text
-            except Message.DoesNotExist:
-                pass
-
-        # Message yaratish yoki yangilash
-        message, created = Message.objects.update_or_create(
-            message_id=data.get("message_id"),
-            group=group,
-            defaults={
-                "user": user,
-                "text": data.get("message_text"),
-                "media_type": data.get("media_type", "text"),
-                "media_file_id": data.get("media_file_id"),
-                "media_file_unique_id": data.get("media_file_unique_id"),
-                "media_file_size": data.get("media_file_size"),
-                "media_mime_type": data.get("media_mime_type"),
-                "media_file_path": data.get("media_file_path"),
-                "media_file_name": data.get("media_file_name"),
-                "reply_to_message_id": data.get("reply_to_message_id"),
-                "reply_to": reply_to,
-                "forward_from_user_id": data.get("forward_from_user_id"),
-                "forward_from_chat_id": data.get("forward_from_chat_id"),
-                "raw_json": json.loads(data.get("raw_json", "{}")),
-                "is_edited": is_edited or (event_type == "edited_message"),
-                "telegram_created_at": telegram_created_at,
-                "telegram_edited_at": telegram_edited_at,
+        max_batch_size = settings.TELEGRAM_INGEST_MAX_BATCH_SIZE
+        if len(payloads) > max_batch_size:
+            return Response(
+                {
+                    "status": "error",
+                    "message": f"Batch too large (max {max_batch_size})",
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = ingest_messages(payloads)
+        failed = sum(1 for r in results if r["status"] == "error")
+
+        logger.info(f"📦 Batch webhook: {len(payloads)} ta xabar, {failed} ta xato")
+
+        return Response(
+            {
+                "status": "success",
+                "count": len(payloads),
+                "failed": failed,
+                "results": results,
             },
+            status=status.HTTP_200_OK,
         )
 
-        # Edit history yaratish
-        if (event_type == "edited_message" or is_edited) and old_text is not None:
-            MessageHistory.objects.create(
-                message=message,
-                old_text=old_text,
-                new_text=data.get("message_text"),
-                edit_metadata={
-                    "edited_at": (
-                        telegram_edited_at.isoformat() if telegram_edited_at else None
-                    ),
-                    "event_type": event_type,
+    except Exception as e:
+        logger.error(f"❌ Batch webhook xato: {str(e)}", exc_info=True)
+        return Response(
+            {"status": "error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+@api_view(["PATCH"])
+def update_message_media(request):
+    """Bot media faylni yuklab bo'lgach fayl ma'lumotlarini xabarga yozish"""
+    try:
+        data = request.data
+        group_id = data.get("group_id")
+        message_id = data.get("message_id")
+        media_file_path = data.get("media_file_path")
+
+        if group_id is None or message_id is None or not media_file_path:
+            return Response(
+                {
+                    "status": "error",
+                    "message": "group_id, message_id and media_file_path are required",
                 },
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            logger.info(f"📝 Edit history saqlandi: {message.message_id}")
 
-        if created:
-            logger.info(f"✅ Yangi message saqlandi: {message.message_id}")
+        messages = list(
+            Message.objects.filter(group__telegram_id=group_id, message_id=message_id)
+        )
+
+        if not messages:
+            # Metadata hali yetib kelmagan bo'lishi mumkin - bot qayta urinadi
+            return Response(
+                {"status": "error", "message": "Message not found"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        file_unique_id = data.get("media_file_unique_id")
+        if file_unique_id:
+            # Content-addressed store: bitta fayl - bitta blob
+            blob = register_blob(
+                file_unique_id,
+                media_file_path,
+                file_name=data.get("media_file_name"),
+                file_size=data.get("media_file_size"),
+                sha256=data.get("media_sha256"),
+                mime_type=messages[0].media_mime_type,
+            )
+            attach_blob(messages, blob)
+            fields = {
+                "media_file_path": blob.file_path,
+                "media_file_name": blob.file_name,
+                "media_blob": blob.pk,
+            }
         else:
-            if event_type == "edited_message" or is_edited:
-                logger.info(
-                    f"✏️ Message tahrirlandi: {message.message_id}, is_edited={message.is_edited}"
-                )
-            else:
-                logger.info(f"♻️ Message yangilandi: {message.message_id}")
+            fields = {"media_file_path": media_file_path, "local_file_present": True}
+            if data.get("media_file_name"):
+                fields["media_file_name"] = data.get("media_file_name")
+            if data.get("media_file_size") is not None:
+                fields["media_file_size"] = data.get("media_file_size")
+
+            Message.objects.filter(pk__in=[m.pk for m in messages]).update(**fields)
+
+        logger.info(f"📎 Media saqlandi: {message_id} -> {media_file_path}")
 
         return Response(
-            {
-                "status": "success",
-                "message_id": message.message_id,
-                "created": created,
-                "event_type": event_type,
-                "is_edited": message.is_edited,
-            },
+            {"status": "success", "message_id": message_id, **fields},
             status=status.HTTP_200_OK,
         )
 
     except Exception as e:
-        logger.error(f"❌ Webhook xato: {str(e)}", exc_info=True)
+        logger.error(f"❌ Error updating message media: {e}")
         return Response(
             {"status": "error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST
         )
 
 
+@api_view(["GET"])
+def get_media_blob(request, file_unique_id):
+    """Media store'da fayl bormi? (bot yuklashdan oldin tekshiradi)"""
+    blob = MediaBlob.objects.filter(file_unique_id=file_unique_id).first()
+
+    if not blob or not os.path.exists(absolute_path(blob.file_path)):
+        return Response(
+            {"status": "error", "message": "Blob not found"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    return Response(
+        {
+            "status": "success",
+            "file_unique_id": blob.file_unique_id,
+            "media_file_path": blob.file_path,
+            "media_file_name": blob.file_name,
+            "media_file_size": blob.file_size,
+            "media_sha256": blob.sha256,
+            "ref_count": blob.ref_count,
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
+@api_view(["GET"])
+def ingest_stats(request):
+    """Ingest identity cache statistikasi (joriy process uchun)"""
+    return Response(
+        {
+            "status": "success",
+            "identity_cache": {
+                "users": user_identity_cache.stats(),
+                "groups": group_identity_cache.stats(),
+            },
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
 # telegram_bot/views.py da
 
 
@@ -202,8 +261,7 @@ def mark_message_deleted(request, message_id):
     """Xabarni o'chirilgan deb belgilash"""
     try:
         message = Message.objects.get(message_id=message_id)
-        message.is_deleted = True
-        message.save()
+        mark_deleted(Message.objects.filter(pk=message.pk))
 
         logger.info(f"🗑️ Message {message_id} o'chirilgan deb belgilandi")
 
@@ -240,9 +298,7 @@ def bulk_mark_deleted(request):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        updated = Message.objects.filter(message_id__in=message_ids).update(
-            is_deleted=True
-        )
+        updated = mark_deleted(Message.objects.filter(message_id__in=message_ids))
 
         logger.info(f"🗑️ {updated} ta message o'chirilgan deb belgilandi")
 
@@ -272,49 +328,35 @@ def get_telegram_file(request, message_id):
     """Download/serve media file"""
     try:
         logger.info(f"📥 File request for message_id={message_id}")
-        message = Message.objects.filter(message_id=message_id).order_by("-id").first()
+        message = (
+            Message.objects.select_related("media_blob")
+            .filter(message_id=message_id)
+            .order_by("-id")
+            .first()
+        )
 
         if not message:
             return JsonResponse({"error": "Xabar topilmadi"}, status=404)
 
-        # Check if has local file
-        has_file_path = hasattr(message, "media_file_path")
-
-        # METHOD 1: Serve from local file
-        if has_file_path and message.media_file_path:
-            if not os.path.isabs(message.media_file_path):
-                file_path = os.path.join(settings.MEDIA_ROOT, message.media_file_path)
-            else:
-                file_path = message.media_file_path
-
-            if os.path.exists(file_path):
-                logger.info(f"✅ Serving local file: {file_path}")
-
-                content_types = {
-                    "photo": "image/jpeg",
-                    "video": "video/mp4",
-                    "voice": "audio/ogg",
-                    "audio": "audio/mpeg",
-                    "document": "application/octet-stream",
-                    "sticker": "image/webp",
-                    "animation": "video/mp4",
-                }
+        # METHOD 1: Serve from local file (shared blob first)
+        file_path = resolve_media_path(message)
 
-                response = FileResponse(
-                    open(file_path, "rb"),
-                    content_type=content_types.get(
-                        message.media_type, "application/octet-stream"
-                    ),
-                )
+        if file_path:
+            logger.info(f"✅ Serving local file: {file_path}")
 
-                file_name = getattr(
-                    message, "media_file_name", None
-                ) or os.path.basename(file_path)
-                response["Content-Disposition"] = f'attachment; filename="{file_name}"'
-                response["Content-Length"] = os.path.getsize(file_path)
-                response["Access-Control-Allow-Origin"] = "*"
+            file_name = getattr(message, "media_file_name", None) or os.path.basename(
+                file_path
+            )
+            response = serve_media_file(
+                request,
+                file_path,
+                message,
+                file_name=file_name,
+                as_attachment=True,
+            )
+            response["Access-Control-Allow-Origin"] = "*"
 
-                return response
+            return response
 
         # METHOD 2: Get from Telegram API
         if message.media_file_id:
@@ -332,30 +374,22 @@ def get_telegram_file(request, message_id):
                     {"error": "TELEGRAM_BOT_TOKEN not configured"}, status=500
                 )
 
-            get_file_url = f"https://api.telegram.org/bot{bot_token}/getFile?file_id={message.media_file_id}"
-
             try:
-                response = requests.get(get_file_url, timeout=5)
-                data = response.json()
-
-                if data.get("ok"):
-                    file_path = data["result"]["file_path"]
-                    file_url = (
-                        f"https://api.telegram.org/file/bot{bot_token}/{file_path}"
-                    )
+                file_path = telegram_file_resolver.resolve(message.media_file_id)
+                file_url = telegram_file_resolver.file_url(file_path)
 
-                    return JsonResponse(
-                        {"status": "success", "file_url": file_url, "redirect": True}
-                    )
-                else:
-                    return JsonResponse(
-                        {
-                            "status": "error",
-                            "message": "Failed to get file from Telegram",
-                        },
-                        status=400,
-                    )
+                return JsonResponse(
+                    {"status": "success", "file_url": file_url, "redirect": True}
+                )
 
+            except TelegramFileError:
+                return JsonResponse(
+                    {
+                        "status": "error",
+                        "message": "Failed to get file from Telegram",
+                    },
+                    status=400,
+                )
             except requests.RequestException as e:
                 logger.error(f"❌ Telegram API error: {e}")
                 return JsonResponse(
@@ -374,65 +408,54 @@ def get_telegram_file(request, message_id):
 def get_telegram_media_url(request, message_id):
     """Get direct media URL"""
     try:
-        message = Message.objects.filter(message_id=message_id).order_by("-id").first()
+        message = (
+            Message.objects.select_related("media_blob")
+            .filter(message_id=message_id)
+            .order_by("-id")
+            .first()
+        )
 
         if not message:
             return JsonResponse({"error": "Xabar topilmadi"}, status=404)
 
-        has_file_path = hasattr(message, "media_file_path")
-
         # Try local file first
-        if has_file_path and message.media_file_path:
-            if not os.path.isabs(message.media_file_path):
-                file_path = os.path.join(settings.MEDIA_ROOT, message.media_file_path)
-            else:
-                file_path = message.media_file_path
-
-            if os.path.exists(file_path):
-                relative_path = os.path.relpath(file_path, settings.MEDIA_ROOT).replace(
-                    "\\", "/"
-                )
-                media_url = f"{settings.MEDIA_URL}{relative_path}"
-                host = request.get_host()
-                scheme = "https" if request.is_secure() else "http"
-                full_url = f"{scheme}://{host}{media_url}"
+        file_path = resolve_media_path(message)
+        if file_path:
+            relative_path = os.path.relpath(file_path, settings.MEDIA_ROOT).replace(
+                "\\", "/"
+            )
+            media_url = f"{settings.MEDIA_URL}{relative_path}"
+            host = request.get_host()
+            scheme = "https" if request.is_secure() else "http"
+            full_url = f"{scheme}://{host}{media_url}"
 
-                return JsonResponse(
-                    {
-                        "url": full_url,
-                        "media_type": message.media_type,
-                        "file_name": getattr(message, "media_file_name", None),
-                        "file_size": message.media_file_size,
-                        "source": "local",
-                    }
-                )
+            return JsonResponse(
+                {
+                    "url": full_url,
+                    "media_type": message.media_type,
+                    "file_name": getattr(message, "media_file_name", None),
+                    "file_size": message.media_file_size,
+                    "source": "local",
+                }
+            )
 
         # Try Telegram API
         if message.media_file_id and message.media_type != "sticker":
             bot_token = getattr(settings, "TELEGRAM_BOT_TOKEN", None)
             if bot_token:
-                get_file_url = f"https://api.telegram.org/bot{bot_token}/getFile?file_id={message.media_file_id}"
-
                 try:
-                    response = requests.get(get_file_url, timeout=5)
-                    data = response.json()
-
-                    if data.get("ok"):
-                        file_path = data["result"]["file_path"]
-                        file_url = (
-                            f"https://api.telegram.org/file/bot{bot_token}/{file_path}"
-                        )
-
-                        return JsonResponse(
-                            {
-                                "url": file_url,
-                                "media_type": message.media_type,
-                                "file_size": message.media_file_size,
-                                "source": "telegram",
-                            }
-                        )
-                except:
-                    pass
+                    file_path = telegram_file_resolver.resolve(message.media_file_id)
+
+                    return JsonResponse(
+                        {
+                            "url": telegram_file_resolver.file_url(file_path),
+                            "media_type": message.media_type,
+                            "file_size": message.media_file_size,
+                            "source": "telegram",
+                        }
+                    )
+                except (TelegramFileError, requests.RequestException) as e:
+                    logger.warning(f"⚠️ Telegram getFile failed: {e}")
 
         return JsonResponse({"error": "Media topilmadi"}, status=404)
 
@@ -440,15 +463,79 @@ def get_telegram_media_url(request, message_id):
         return JsonResponse({"error": str(e)}, status=500)
 
 
+# Butun faylni qamragan Range javobi: "bytes 0-(n-1)/n"
+WHOLE_FILE_RANGE_RE = re.compile(r"^bytes 0-(\d+)/(\d+)$")
+
+
+def _is_whole_file(file_response):
+    """200 yoki butun faylni qamragan 206 (store'ga yozish mumkin)"""
+    if file_response.status_code == 200:
+        return True
+    match = WHOLE_FILE_RANGE_RE.match(file_response.headers.get("Content-Range", ""))
+    return match is not None and int(match.group(1)) + 1 == int(match.group(2))
+
+
+def _stream_upstream(file_response, writer, file_unique_id):
+    """
+    Telegram javobini bo'laklab uzatish va (writer bo'lsa) store'ga yozish
+
+    Mijoz uzilsa generator yopiladi: upstream ulanish yopiladi, chala
+    fayl o'chiriladi.
+    """
+    completed = False
+    try:
+        for chunk in file_response.iter_content(
+            chunk_size=settings.MEDIA_PROXY_CHUNK_SIZE
+        ):
+            if writer is not None:
+                writer.write(chunk)
+            yield chunk
+        completed = True
+    finally:
+        file_response.close()
+        if writer is not None:
+            if completed:
+                _store_proxied_blob(writer, file_unique_id)
+            else:
+                writer.discard()
+
+
+def _store_proxied_blob(writer, file_unique_id):
+    """Yuklangan faylni blob sifatida saqlash va shu fayldagi xabarlarga ulash"""
+    try:
+        blob = writer.finish()
+        if blob is None:
+            return
+        messages = list(
+            Message.objects.filter(media_file_unique_id=file_unique_id).only(
+                "id", "media_blob_id"
+            )
+        )
+        attach_blob(messages, blob)
+        logger.info(f"📎 Proxied file stored: {file_unique_id} -> {blob.file_path}")
+    except Exception as e:
+        logger.exception(f"❌ Could not store proxied file {file_unique_id}: {e}")
+
+
 @api_view(["GET"])
 def proxy_telegram_file(request, message_id):
     """
     Proxy Telegram files through backend to solve CORS
+
+    Fayl bo'lak-bo'lak (MEDIA_PROXY_CHUNK_SIZE) uzatiladi - worker xotirasida
+    butun fayl saqlanmaydi. Range va Content-Length Telegram'ga/dan
+    o'tkaziladi. To'liq yuklangan fayl bir vaqtda media store'ga yoziladi,
+    keyingi so'rov diskdan beriladi.
     """
     try:
         logger.info(f"📥 Proxy request for message_id={message_id}")
 
-        message = Message.objects.filter(message_id=message_id).order_by("-id").first()
+        message = (
+            Message.objects.select_related("media_blob")
+            .filter(message_id=message_id)
+            .order_by("-id")
+            .first()
+        )
 
         if not message:
             return JsonResponse({"error": "Xabar topilmadi"}, status=404)
@@ -470,6 +557,17 @@ def proxy_telegram_file(request, message_id):
                 status=404,
             )
 
+        content_type = media_content_type(message)
+
+        # Oldin yuklangan (yoki proxy orqali saqlangan) fayl - diskdan
+        local_path = resolve_media_path(message)
+        if local_path:
+            logger.info(f"✅ Serving local file: {local_path}")
+            response = serve_media_file(request, local_path, message)
+            response["Access-Control-Allow-Origin"] = "*"
+            response["Cache-Control"] = "public, max-age=3600"
+            return response
+
         if not message.media_file_id:
             return JsonResponse(
                 {"error": "Media yo'q", "media_type": message.media_type}, status=404
@@ -481,51 +579,57 @@ def proxy_telegram_file(request, message_id):
                 {"error": "TELEGRAM_BOT_TOKEN not configured"}, status=500
             )
 
-        get_file_url = f"https://api.telegram.org/bot{bot_token}/getFile?file_id={message.media_file_id}"
-
-        logger.info(f"📡 Getting file info from Telegram...")
-        response = requests.get(get_file_url, timeout=10)
-        data = response.json()
+        # Content-Length mos kelishi uchun siqilmagan holda
+        upstream_headers = {"Accept-Encoding": "identity"}
+        if request.headers.get("Range"):
+            upstream_headers["Range"] = request.headers["Range"]
 
-        if not data.get("ok"):
+        try:
+            logger.info(f"📥 Downloading from Telegram...")
+            file_path, file_response = telegram_file_resolver.open(
+                message.media_file_id, upstream_headers
+            )
+        except TelegramFileError as e:
             return JsonResponse(
-                {
-                    "error": "Telegram API error",
-                    "telegram_error": data.get("description"),
-                },
+                {"error": "Telegram API error", "telegram_error": e.description},
                 status=400,
             )
 
-        file_path = data["result"]["file_path"]
-        file_url = f"https://api.telegram.org/file/bot{bot_token}/{file_path}"
+        if file_response.status_code == 416:
+            file_response.close()
+            response = HttpResponse(status=416)
+            if "Content-Range" in file_response.headers:
+                response["Content-Range"] = file_response.headers["Content-Range"]
+            return response
 
-        logger.info(f"📥 Downloading from Telegram...")
-        file_response = requests.get(file_url, timeout=30, stream=True)
-
-        if file_response.status_code != 200:
+        if file_response.status_code not in (200, 206):
+            file_response.close()
             return JsonResponse({"error": "Failed to download"}, status=500)
 
-        logger.info(f"✅ Proxying to client...")
+        # Faqat butun fayl store'ga yoziladi: 200 yoki "bytes=0-" kabi
+        # butun faylni qamragan 206 (brauzer video/audio uchun shunday so'raydi)
+        writer = None
+        if _is_whole_file(file_response) and message.media_file_unique_id:
+            content_length = file_response.headers.get("Content-Length")
+            writer = BlobWriter(
+                message.media_file_unique_id,
+                file_name=message.media_file_name or os.path.basename(file_path),
+                mime_type=message.media_mime_type,
+                expected_size=int(content_length) if content_length else None,
+            )
 
-        content_types = {
-            "photo": "image/jpeg",
-            "video": "video/mp4",
-            "voice": "audio/ogg",
-            "audio": "audio/mpeg",
-            "document": "application/octet-stream",
-            "sticker": "image/webp",
-            "animation": "video/mp4",
-        }
+        logger.info(f"✅ Streaming to client...")
 
-        response = HttpResponse(
-            file_response.content,
-            content_type=content_types.get(
-                message.media_type, "application/octet-stream"
-            ),
+        response = StreamingHttpResponse(
+            _stream_upstream(file_response, writer, message.media_file_unique_id),
+            status=file_response.status_code,
+            content_type=content_type,
         )
+        for header in ("Content-Length", "Content-Range", "Accept-Ranges"):
+            if header in file_response.headers:
+                response[header] = file_response.headers[header]
 
         response["Access-Control-Allow-Origin"] = "*"
-        response["Content-Length"] = len(file_response.content)
         response["Cache-Control"] = "public, max-age=3600"
 
         return response
@@ -571,56 +675,85 @@ def test_telegram_file(request, message_id):
 # Other functions...
 @api_view(["GET"])
 def group_comparison(request):
-    """Guruhlar bo'yicha solishtirish"""
-    try:
-        all_groups = TelegramGroup.objects.all()
-        result = []
-
-        for group in all_groups:
-            total_messages = Message.objects.filter(group=group).count()
-            if total_messages < 5:
-                continue
+    """
+    Guruhlar bo'yicha solishtirish
 
-            unique_users = (
-                Message.objects.filter(group=group).values("user_id").distinct().count()
-            )
-            deleted_messages = Message.objects.filter(
-                group=group, is_deleted=True
-            ).count()
-            edited_messages = Message.objects.filter(
-                group=group, is_edited=True
-            ).count()
-            avg_per_user = (
-                round(total_messages / unique_users, 1) if unique_users > 0 else 0
+    Barcha ko'rsatkichlar bitta GROUP BY so'rovida hisoblanadi (media turlari
+    conditional COUNT bilan), guruhlar soni bilan birga jami 2 ta so'rov.
+    Parametrlar: ?page=, ?page_size= (max 500), ?date_from=YYYY-MM-DD,
+    ?date_to=YYYY-MM-DD (mahalliy kunlar, ikkalasi ham kiradi)
+    """
+    try:
+        page_size = min(int(request.GET.get("page_size", 50)), 500)
+        page = max(int(request.GET.get("page", 1)), 1)
+
+        messages = Message.objects.all()
+        date_from = request.GET.get("date_from")
+        date_to = request.GET.get("date_to")
+        if date_from:
+            messages = messages.filter(telegram_created_at__gte=_day_start(date_from))
+        if date_to:
+            messages = messages.filter(
+                telegram_created_at__lt=_day_start(date_to) + timedelta(days=1)
             )
 
-            media_types = (
-                Message.objects.filter(group=group)
-                .values("media_type")
-                .annotate(count=Count("id"))
-                .order_by("-count")[:5]
+        media_types = [value for value, _ in Message.MEDIA_TYPES]
+        stats = (
+            messages.values("group_id", "group__telegram_id", "group__title")
+            .annotate(
+                message_count=Count("id"),
+                user_count=Count("user_id", distinct=True),
+                deleted_count=Count("id", filter=Q(is_deleted=True)),
+                edited_count=Count("id", filter=Q(is_edited=True)),
+                **{
+                    f"media_{media_type}": Count("id", filter=Q(media_type=media_type))
+                    for media_type in media_types
+                },
             )
+            .filter(message_count__gte=5)
+            .order_by("-message_count", "group_id")
+        )
 
-            group_id = getattr(group, "telegram_id", None) or group.id
-            group_name = getattr(group, "title", None) or f"Group {group_id}"
+        total_groups = stats.count()
+        start = (page - 1) * page_size
+
+        result = []
+        for row in stats[start : start + page_size]:
+            group_id = row["group__telegram_id"] or row["group_id"]
+            media_distribution = sorted(
+                (
+                    {"media_type": media_type, "count": row[f"media_{media_type}"]}
+                    for media_type in media_types
+                    if row[f"media_{media_type}"]
+                ),
+                key=lambda item: -item["count"],
+            )[:5]
 
             result.append(
                 {
                     "id": group_id,
-                    "name": group_name,
-                    "message_count": total_messages,
-                    "user_count": unique_users,
-                    "avg_messages_per_user": avg_per_user,
-                    "deleted_count": deleted_messages,
-                    "edited_count": edited_messages,
-                    "media_distribution": list(media_types),
+                    "name": row["group__title"] or f"Group {group_id}",
+                    "message_count": row["message_count"],
+                    "user_count": row["user_count"],
+                    "avg_messages_per_user": (
+                        round(row["message_count"] / row["user_count"], 1)
+                        if row["user_count"] > 0
+                        else 0
+                    ),
+                    "deleted_count": row["deleted_count"],
+                    "edited_count": row["edited_count"],
+                    "media_distribution": media_distribution,
                 }
             )
 
-        result = sorted(result, key=lambda x: x["message_count"], reverse=True)
-
         return Response(
-            {"status": "success", "total_groups": len(result), "groups": result}
+            {
+                "status": "success",
+                "total_groups": total_groups,
+                "page": page,
+                "page_size": page_size,
+                "groups": result,
+            }
         )
 
     except Exception as e:
@@ -628,27 +761,26 @@ def group_comparison(request):
         return Response({"status": "error", "message": str(e)}, status=400)
 
 
+def _day_start(value):
+    """YYYY-MM-DD -> mahalliy (TIME_ZONE) kun boshlanishi"""
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f"Invalid date: {value}")
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
 @api_view(["GET"])
 def overview_stats(request):
-    """Umumiy statistika"""
-    total_messages = Message.objects.count()
-    total_users = TelegramUser.objects.count()
-    total_groups = (
-        TelegramGroup.objects.annotate(msg_count=Count("messages"))
-        .filter(msg_count__gte=5)
-        .count()
-    )
-
-    deleted_messages = Message.objects.filter(is_deleted=True).count()
-    edited_messages = Message.objects.filter(is_edited=True).count()
+    """Umumiy statistika (keshlangan snapshot'dan)"""
+    snapshot = get_overview()
 
     return Response(
         {
-            "total_messages": total_messages,
-            "total_users": total_users,
-            "total_groups": total_groups,
-            "deleted_messages": deleted_messages,
-            "edited_messages": edited_messages,
+            "total_messages": snapshot["total_messages"],
+            "total_users": snapshot["total_users"],
+            "total_groups": total_groups(snapshot, ACTIVE_GROUP_MIN_MESSAGES),
+            "deleted_messages": snapshot["deleted_messages"],
+            "edited_messages": snapshot["edited_messages"],
         }
     )
 
@@ -666,3 +798,110 @@ def message_list(request):
     serializer = MessageSerializer(messages, many=True)
 
     return Response({"count": Message.objects.count(), "results": serializer.data})
+
+
+TYPEAHEAD_DEFAULT_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 50
+
+
+def _typeahead_limit(request):
+    """?limit= (1..TYPEAHEAD_MAX_LIMIT)"""
+    limit = int(request.GET.get("limit", TYPEAHEAD_DEFAULT_LIMIT))
+    return max(1, min(limit, TYPEAHEAD_MAX_LIMIT))
+
+
+@api_view(["GET"])
+def user_typeahead(request):
+    """
+    Filtr uchun foydalanuvchilarni qidirish
+    URL: /api/telegram/users/search/?q=ali&limit=10&group_id=-100123
+
+    Xabari bor foydalanuvchilar: avval nomi q bilan boshlanganlar, keyin
+    eng faollari. Xabarlar soni UserStats counter'idan o'qiladi; group_id
+    berilsa faqat shu guruhdagi xabarlar sanaladi (user, guruh bo'yicha
+    counter yo'q).
+    """
+    try:
+        limit = _typeahead_limit(request)
+        group_id = request.GET.get("group_id")
+
+        users = typeahead(TelegramUser.objects.all(), request.GET.get("q", ""))
+        if group_id:
+            group_pk = (
+                TelegramGroup.objects.filter(telegram_id=int(group_id))
+                .values_list("pk", flat=True)
+                .first()
+            )
+            group_messages = (
+                Message.objects.filter(group_id=group_pk, user_id=OuterRef("pk"))
+                .order_by()
+                .values("user_id")
+                .annotate(count=Count("id"))
+                .values("count")
+            )
+            users = users.annotate(message_count=Coalesce(Subquery(group_messages), 0))
+        else:
+            users = users.annotate(message_count=F("stats__message_count"))
+
+        users = users.filter(message_count__gt=0).order_by(
+            "match_rank", "-message_count", "search_name"
+        )[:limit]
+
+        return Response(
+            [
+                {
+                    "id": user.telegram_id,
+                    "username": user.username,
+                    "full_name": user.full_name,
+                    "message_count": user.message_count,
+                }
+                for user in users
+            ]
+        )
+
+    except ValueError as e:
+        return Response({"status": "error", "message": str(e)}, status=400)
+
+
+@api_view(["GET"])
+def group_typeahead(request):
+    """
+    Filtr uchun guruhlarni qidirish
+    URL: /api/telegram/groups/search/?q=python&limit=10
+
+    Xabarlar soni overview snapshot'idagi guruh counter'laridan olinadi
+    (messages jadvali sanalmaydi); saralash Python'da.
+    """
+    try:
+        limit = _typeahead_limit(request)
+        group_counts = get_overview()["group_counts"]
+
+        groups = [
+            group
+            for group in typeahead(
+                TelegramGroup.objects.only("id", "telegram_id", "title", "search_name"),
+                request.GET.get("q", ""),
+            )
+            if group_counts.get(group.pk, 0) > 0
+        ]
+        groups.sort(
+            key=lambda group: (
+                group.match_rank,
+                -group_counts[group.pk],
+                group.search_name,
+            )
+        )
+
+        return Response(
+            [
+                {
+                    "id": group.telegram_id,
+                    "title": group.title,
+                    "message_count": group_counts[group.pk],
+                }
+                for group in groups[:limit]
+            ]
+        )
+
+    except ValueError as e:
+        return Response({"status": "error", "message": str(e)}, status=400)
@@ -121,9 +121,14 @@ function Dashboard() {
     try {
       setLoading(true);
 
-      const messagesRes = await axios.get(
-        'http://localhost:8000/api/messages/?page_size=1000'
-      );
+      // ✅ Guruh va user typeahead'dan tanlangan Telegram id bo'yicha serverda
+      const messagesRes = await axios.get('http://localhost:8000/api/messages/', {
+        params: {
+          page_size: 1000,
+          group_id: currentFilters.group || undefined,
+          user_id: currentFilters.user || undefined,
+        },
+      });
 
       const messagesData = messagesRes.data.results || messagesRes.data;
       let allMessagesArray = Array.isArray(messagesData) ? messagesData : [];
@@ -132,26 +137,6 @@ function Dashboard() {
 
       let filteredMessages = allMessagesArray;
 
-      if (currentFilters.group) {
-        filteredMessages = filteredMessages.filter((msg) => {
-          const groupName = msg.group?.title || msg.group?.name || '';
-          return groupName === currentFilters.group;
-        });
-        console.log('🔍 After group filter:', filteredMessages.length);
-      }
-
-      if (currentFilters.user) {
-        filteredMessages = filteredMessages.filter((msg) => {
-          const userName =
-            msg.user?.full_name ||
-            msg.user?.first_name ||
-            msg.user?.username ||
-            '';
-          return userName === currentFilters.user;
-        });
-        console.log('🔍 After user filter:', filteredMessages.length);
-      }
-
       if (currentFilters.sentiment) {
         filteredMessages = filteredMessages.filter(
           (msg) => msg.sentiment === currentFilters.sentiment
@@ -10,11 +10,23 @@ import {
 } from 'lucide-react';
 import axios from 'axios';
 
+const GROUPS_URL = 'http://localhost:8000/api/telegram/groups/search/';
+const USERS_URL = 'http://localhost:8000/api/telegram/users/search/';
+const TYPEAHEAD_LIMIT = 50;
+const TYPEAHEAD_DELAY_MS = 300;
+
+// Server tartibi saqlanadi: avval nomi q bilan boshlanganlar, keyin faollari
+const toUserOptions = (items) =>
+  items.map((u) => ({ id: String(u.id), name: u.full_name || u.username }));
+
 function Filters({ darkMode, onFilterChange }) {
   const [isOpen, setIsOpen] = useState(false);
   const [groups, setGroups] = useState([]);
   const [users, setUsers] = useState([]);
-  const [allUsers, setAllUsers] = useState([]);
+  const [groupQuery, setGroupQuery] = useState('');
+  const [userQuery, setUserQuery] = useState('');
+  // Tanlangan guruh/user nomlari (badge'lar uchun; filtr id bilan ishlaydi)
+  const [labels, setLabels] = useState({ group: '', user: '' });
 
   const [filters, setFilters] = useState({
     user: '',
@@ -25,116 +37,58 @@ function Filters({ darkMode, onFilterChange }) {
     sentiment: '',
   });
 
-  // Load data on mount
+  // ✅ Typeahead: q yozilayotganda serverdan qidiriladi (debounce)
   useEffect(() => {
-    loadData();
-  }, []);
-
-  const loadData = async () => {
-    try {
-      const response = await axios.get(
-        'http://localhost:8000/api/messages/?page_size=1000'
-      );
-      const messages = response.data.results || response.data || [];
-
-      console.log('📦 Total messages loaded:', messages.length);
-
-      // ✅ Get unique groups from nested object
-      const groupSet = new Set();
-      messages.forEach((msg) => {
-        // ✅ Nested group.title
-        const groupName = msg.group?.title || msg.group?.name || msg.group_name;
-        if (groupName) {
-          groupSet.add(groupName);
-        }
-      });
-      const groupList = Array.from(groupSet).sort();
-      setGroups(groupList);
-      console.log('✅ Groups:', groupList);
-
-      // ✅ Get unique users from nested object
-      const userMap = new Map(); // username -> display name
-      messages.forEach((msg) => {
-        // ✅ Nested user.full_name, user.first_name, user.username
-        const userName =
-          msg.user?.full_name ||
-          msg.user?.first_name ||
-          msg.user?.username ||
-          msg.user_name;
-        const userId = msg.user?.username || msg.user?.id || userName; // unique key
-
-        if (userName && userId) {
-          userMap.set(userId, userName);
-        }
-      });
+    const timer = setTimeout(() => {
+      axios
+        .get(GROUPS_URL, {
+          params: { q: groupQuery, limit: TYPEAHEAD_LIMIT },
+        })
+        .then((res) => {
+          setGroups(
+            res.data.map((g) => ({ id: String(g.id), title: g.title }))
+          );
+          console.log('✅ Groups:', res.data.length);
+        })
+        .catch((err) => console.error('❌ Error loading groups:', err));
+    }, TYPEAHEAD_DELAY_MS);
+    return () => clearTimeout(timer);
+  }, [groupQuery]);
 
-      const userList = Array.from(userMap.entries())
-        .map(([id, name]) => ({
-          id,
-          name,
-        }))
-        .sort((a, b) => a.name.localeCompare(b.name));
-
-      setUsers(userList);
-      setAllUsers(userList);
-      console.log('✅ Users:', userList.length);
-    } catch (error) {
-      console.error('❌ Error loading data:', error);
-    }
-  };
+  // Guruh tanlansa faqat shu guruhda yozgan foydalanuvchilar
+  useEffect(() => {
+    const timer = setTimeout(() => {
+      const params = { q: userQuery, limit: TYPEAHEAD_LIMIT };
+      if (filters.group) {
+        params.group_id = filters.group;
+      }
+      axios
+        .get(USERS_URL, { params })
+        .then((res) => {
+          setUsers(toUserOptions(res.data));
+          console.log('👥 Users:', res.data.length);
+        })
+        .catch((err) => console.error('❌ Error loading users:', err));
+    }, TYPEAHEAD_DELAY_MS);
+    return () => clearTimeout(timer);
+  }, [userQuery, filters.group]);
 
   const handleChange = (key, value) => {
     const newFilters = { ...filters, [key]: value };
 
-    // If group changes, filter users
     if (key === 'group') {
-      if (value) {
-        // ✅ Filter users by group (client-side for now)
-        axios
-          .get(`http://localhost:8000/api/messages/?page_size=1000`)
-          .then((res) => {
-            const msgs = res.data.results || res.data;
-
-            // Filter messages by group
-            const filteredMsgs = msgs.filter((m) => {
-              const groupName = m.group?.title || m.group?.name || m.group_name;
-              return groupName === value;
-            });
+      const group = groups.find((g) => g.id === value);
+      setLabels({ group: group ? group.title : '', user: '' });
 
-            // Get unique users from filtered messages
-            const userMap = new Map();
-            filteredMsgs.forEach((m) => {
-              const userName =
-                m.user?.full_name ||
-                m.user?.first_name ||
-                m.user?.username ||
-                m.user_name;
-              const userId = m.user?.username || m.user?.id || userName;
-
-              if (userName && userId) {
-                userMap.set(userId, userName);
-              }
-            });
-
-            const filtered = Array.from(userMap.entries())
-              .map(([id, name]) => ({
-                id,
-                name,
-              }))
-              .sort((a, b) => a.name.localeCompare(b.name));
-
-            setUsers(filtered);
-            console.log('👥 Users in group:', filtered.length);
-          })
-          .catch((err) => console.error(err));
-      } else {
-        setUsers(allUsers);
-      }
-
-      // Reset user
+      // Reset user (user ro'yxati yangi guruh bo'yicha qayta yuklanadi)
       newFilters.user = '';
     }
 
+    if (key === 'user') {
+      const user = users.find((u) => u.id === value);
+      setLabels({ ...labels, user: user ? user.name : '' });
+    }
+
     setFilters(newFilters);
     onFilterChange(newFilters);
     console.log('🔍 Filters:', newFilters);
@@ -150,7 +104,9 @@ function Filters({ darkMode, onFilterChange }) {
       sentiment: '',
     };
     setFilters(empty);
-    setUsers(allUsers);
+    setLabels({ group: '', user: '' });
+    setGroupQuery('');
+    setUserQuery('');
     onFilterChange(empty);
   };
 
@@ -204,15 +160,25 @@ function Filters({ darkMode, onFilterChange }) {
             >
               <Hash className="w-4 h-4 inline" /> Guruh
             </label>
+            <input
+              type="text"
+              value={groupQuery}
+              onChange={(e) => setGroupQuery(e.target.value)}
+              placeholder="Guruhni qidirish..."
+              className={`w-full p-2 mb-2 rounded border ${darkMode ? 'bg-gray-700 text-white border-gray-600' : 'bg-white border-gray-300'}`}
+            />
             <select
               value={filters.group}
               onChange={(e) => handleChange('group', e.target.value)}
               className={`w-full p-2 rounded border ${darkMode ? 'bg-gray-700 text-white border-gray-600' : 'bg-white border-gray-300'}`}
             >
               <option value="">Barchasi ({groups.length})</option>
-              {groups.map((g, i) => (
-                <option key={i} value={g}>
-                  {g}
+              {filters.group && !groups.some((g) => g.id === filters.group) && (
+                <option value={filters.group}>{labels.group}</option>
+              )}
+              {groups.map((g) => (
+                <option key={g.id} value={g.id}>
+                  {g.title}
                 </option>
               ))}
             </select>
@@ -225,14 +191,24 @@ function Filters({ darkMode, onFilterChange }) {
             >
               <User className="w-4 h-4 inline" /> Foydalanuvchi
             </label>
+            <input
+              type="text"
+              value={userQuery}
+              onChange={(e) => setUserQuery(e.target.value)}
+              placeholder="Foydalanuvchini qidirish..."
+              className={`w-full p-2 mb-2 rounded border ${darkMode ? 'bg-gray-700 text-white border-gray-600' : 'bg-white border-gray-300'}`}
+            />
             <select
               value={filters.user}
               onChange={(e) => handleChange('user', e.target.value)}
               className={`w-full p-2 rounded border ${darkMode ? 'bg-gray-700 text-white border-gray-600' : 'bg-white border-gray-300'}`}
             >
               <option value="">Barchasi ({users.length})</option>
-              {users.map((u, i) => (
-                <option key={i} value={u.name}>
+              {filters.user && !users.some((u) => u.id === filters.user) && (
+                <option value={filters.user}>{labels.user}</option>
+              )}
+              {users.map((u) => (
+                <option key={u.id} value={u.id}>
                   {u.name}
                 </option>
               ))}
@@ -317,7 +293,7 @@ function Filters({ darkMode, onFilterChange }) {
                   : 'bg-green-100 text-green-700'
               }`}
             >
-              Guruh: {filters.group}
+              Guruh: {labels.group}
               <X
                 className="w-3 h-3 inline ml-2 cursor-pointer hover:opacity-70"
                 onClick={() => handleChange('group', '')}
@@ -332,7 +308,7 @@ function Filters({ darkMode, onFilterChange }) {
                   : 'bg-blue-100 text-blue-700'
               }`}
             >
-              User: {filters.user}
+              User: {labels.user}
               <X
                 className="w-3 h-3 inline ml-2 cursor-pointer hover:opacity-70"
                 onClick={() => handleChange('user', '')}
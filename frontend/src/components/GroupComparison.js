@@ -4,6 +4,7 @@ import axios from 'axios';
 
 function GroupComparison({ darkMode }) {
   const [groups, setGroups] = useState([]);
+  const [totalGroups, setTotalGroups] = useState(0);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
@@ -21,6 +22,7 @@ function GroupComparison({ darkMode }) {
 
       if (response.data.status === 'success') {
         setGroups(response.data.groups || []);
+        setTotalGroups(response.data.total_groups || 0);
       } else {
         setError("Ma'lumot yuklashda xatolik");
       }
@@ -107,7 +109,7 @@ function GroupComparison({ darkMode }) {
             darkMode ? 'bg-gray-700 text-gray-300' : 'bg-gray-100 text-gray-600'
           }`}
         >
-          {groups.length} ta guruh
+          {totalGroups} ta guruh
         </span>
       </div>
 
@@ -11,6 +11,8 @@ import {
 } from 'lucide-react';
 import axios from 'axios';
 
+const STREAMED_TYPES = ['video', 'animation', 'voice', 'audio', 'video_note'];
+
 function MediaViewer({ message, onClose }) {
   const [mediaUrl, setMediaUrl] = useState(null);
   const [loading, setLoading] = useState(true);
@@ -58,6 +60,13 @@ function MediaViewer({ message, onClose }) {
       const proxyUrl = `http://localhost:8000/api/messages/${message.message_id}/proxy/`;
       console.log('Fetching via proxy:', proxyUrl);
 
+      // ✅ Video/audio: player loads the URL itself (Range requests for
+      // seeking, ETag revalidation) instead of downloading a blob first
+      if (STREAMED_TYPES.includes(message.media_type)) {
+        setMediaUrl(proxyUrl);
+        return;
+      }
+
       const response = await axios.get(proxyUrl, {
         responseType: 'blob',
         timeout: 30000,
@@ -121,7 +130,7 @@ function MediaViewer({ message, onClose }) {
 
   useEffect(() => {
     return () => {
-      if (mediaUrl) {
+      if (mediaUrl && mediaUrl.startsWith('blob:')) {
         URL.revokeObjectURL(mediaUrl);
       }
     };